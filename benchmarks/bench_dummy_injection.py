@@ -0,0 +1,62 @@
+"""Dummy-function injection cost vs. decoy count.
+
+Placement compares the bulk merge of sorted insertion points with one list.insert per dummy
+on prebuilt functions; "inject" is the full DummyFunctionInjector run (templates, decoy calls).
+Usage: python benchmarks/bench_dummy_injection.py [--functions 20000] [--counts 5000,10000,20000,40000,80000]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obfuscations import ast_nodes as ast
+from obfuscations.dummy_function_obfuscator import DummyFunctionInjector, merge_insertions
+from bench_flat_ast import synthetic_function
+
+
+def timed(func):
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--functions", type=int, default=20000)
+    arg_parser.add_argument("--counts", default="5000,10000,20000,40000,80000")
+    args = arg_parser.parse_args()
+
+    base = [synthetic_function(i) for i in range(args.functions)]
+    print(f"{'decoys':>7} {'insert ms':>10} {'merge ms':>10} {'inject ms':>10} {'inject us/decoy':>16}")
+    for count in (int(c) for c in args.counts.split(',')):
+        random.seed(count)
+        prebuilt = [ast.FuncDefNode(ast.TypeNode("int"), f"d{i}", [], ast.CompoundStatementNode([]))
+                    for i in range(count)]
+
+        def insert_one_by_one():
+            declarations = list(base)
+            for dummy in prebuilt: declarations.insert(random.randint(0, len(declarations)), dummy)
+
+        def bulk_merge():
+            positions = sorted(random.randint(0, len(base)) for _ in range(count))
+            dummies = iter(prebuilt)
+            merge_insertions(base, positions, lambda: next(dummies))
+
+        def inject():
+            DummyFunctionInjector(decoy_call_rate=0.3).visit_ProgramNode(ast.ProgramNode(list(base)), count)
+
+        insert_time, merge_time, inject_time = timed(insert_one_by_one), timed(bulk_merge), timed(inject)
+        print(f"{count:>7} {insert_time * 1e3:>10.1f} {merge_time * 1e3:>10.1f} {inject_time * 1e3:>10.1f} "
+              f"{inject_time / count * 1e6:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Bulk-validates expression rewrite rules with the vectorized int32 equivalence checker.
+
+Checks the de-obfuscator's expression rules, the equivalent-expression obfuscator's rewrites
+and a few rules that are wrong under int32 wraparound, then reports throughput.
+Usage: python benchmarks/bench_equivalence_checker.py [--samples 200000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obfuscations import ast_nodes as ast
+from obfuscations.equivalence_checker import validate_rules, format_validation_report
+from deobfuscations.pattern_matcher import capture, BinaryOp, UnaryOp, Const, Rule
+from deobfuscations.expression_simplifier import EXPRESSION_RULES
+
+x, y = capture('x'), capture('y')
+
+
+def _neg(node): return ast.UnaryOpNode('-', node)
+
+
+LIBRARY = [
+    Rule("add_as_sub_negation", BinaryOp('+', x, y), lambda n, m: ast.BinaryOpNode('-', m['x'], _neg(m['y']))),
+    Rule("sub_as_add_negation", BinaryOp('-', x, y), lambda n, m: ast.BinaryOpNode('+', m['x'], _neg(m['y']))),
+    Rule("double_as_sum", BinaryOp('*', x, Const('2')), lambda n, m: ast.BinaryOpNode('+', m['x'], m['x'])),
+    Rule("negated_difference", UnaryOp('-', BinaryOp('-', x, y)), lambda n, m: ast.BinaryOpNode('-', m['y'], m['x'])),
+    Rule("lt_as_gt", BinaryOp('<', x, y), lambda n, m: ast.BinaryOpNode('>', m['y'], m['x'])),
+    # Wrong: they only hold without overflow or for some operands.
+    Rule("wrong_lt_as_difference", BinaryOp('<', x, y),
+         lambda n, m: ast.BinaryOpNode('<', ast.BinaryOpNode('-', m['x'], m['y']), ast.ConstantNode('int', '0'))),
+    Rule("wrong_halve_double", BinaryOp('*', BinaryOp('/', x, Const('2')), Const('2')), lambda n, m: m['x']),
+    Rule("wrong_double_not", UnaryOp('!', UnaryOp('!', x)), lambda n, m: m['x']),
+]
+
+
+def wide_sum_case(count=24):
+    """a0 + ... + a23 against its rewrite a0 + ... - -a23: more variables than the edge-value grid covers."""
+    terms = [ast.IdNode(f"a{i}") for i in range(count)]
+    prefix = terms[0]
+    for term in terms[1:-1]: prefix = ast.BinaryOpNode('+', prefix, term)
+    return (f"wide_sum_{count}_vars", ast.BinaryOpNode('+', prefix, terms[-1]),
+            ast.BinaryOpNode('-', prefix, _neg(terms[-1])))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--samples", type=int, default=200_000)
+    arg_parser.add_argument("--repeat", type=int, default=20, help="validation rounds for the timing")
+    args = arg_parser.parse_args()
+
+    rules = [*EXPRESSION_RULES.rules, *LIBRARY]
+    cases = [(rule.name, *rule.example()) for rule in rules] + [wide_sum_case()]
+    results = validate_rules(cases, samples=args.samples)
+    print(format_validation_report(results))
+
+    start = time.perf_counter()
+    for seed in range(args.repeat): validate_rules(cases, samples=args.samples, seed=seed)
+    elapsed = time.perf_counter() - start
+    checked = len(cases) * args.samples * args.repeat
+    print(f"\n{len(cases)} rules x {args.samples} assignments x {args.repeat} rounds in {elapsed:.2f}s "
+          f"({checked / elapsed / 1e6:.1f}M assignments/s)")
+
+
+if __name__ == "__main__":
+    main()
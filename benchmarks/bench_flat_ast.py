@@ -0,0 +1,100 @@
+"""Conversion cost and query speed of the struct-of-arrays FlatAST vs. walking the object tree.
+
+Builds a synthetic program directly from AST nodes (no parser needed).
+Usage: python benchmarks/bench_flat_ast.py [--functions 2000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obfuscations import ast_nodes as ast
+from obfuscations import flat_ast
+from deobfuscations.dead_code_remover import VariableUsageVisitor
+
+
+def synthetic_function(index):
+    int_type = ast.TypeNode("int")
+    body = [ast.VarDeclNode(int_type, "acc", ast.ConstantNode("int", "0")),
+            ast.VarDeclNode(int_type, "i", ast.ConstantNode("int", "0"))]
+    loop_body = [ast.ExprStatementNode(ast.AssignmentNode(
+        ast.IdNode("acc"), ast.BinaryOpNode("+", ast.IdNode("acc"), ast.BinaryOpNode("*", ast.IdNode("i"), ast.IdNode("n")))))]
+    if index:
+        loop_body.append(ast.ExprStatementNode(ast.AssignmentNode(
+            ast.IdNode("acc"), ast.FuncCallNode(ast.IdNode(f"f{index - 1}"), [ast.IdNode("acc")]))))
+    loop_body.append(ast.ExprStatementNode(ast.AssignmentNode(
+        ast.IdNode("i"), ast.BinaryOpNode("+", ast.IdNode("i"), ast.ConstantNode("int", "1")))))
+    body.append(ast.WhileNode(ast.BinaryOpNode("<", ast.IdNode("i"), ast.IdNode("n")),
+                              ast.CompoundStatementNode(loop_body)))
+    body.append(ast.ReturnNode(ast.IdNode("acc")))
+    return ast.FuncDefNode(int_type, f"f{index}", [ast.ParamNode(int_type, "n")], ast.CompoundStatementNode(body))
+
+
+class IdCounter:
+    """Object-tree baseline written like the repo's visitors."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.ids = []
+
+    def visit(self, node):
+        if node is None: return
+        if isinstance(node, ast.IdNode):
+            self.counts[node.name] += 1
+            self.ids.append(node)
+        for attr_name in dir(node):
+            if not attr_name.startswith('_') and attr_name != 'coord':
+                attr_value = getattr(node, attr_name)
+                if isinstance(attr_value, ast.Node): self.visit(attr_value)
+                elif isinstance(attr_value, list):
+                    for item in attr_value:
+                        if isinstance(item, ast.Node): self.visit(item)
+
+
+def best_time(func, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--functions", type=int, default=2000)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    program = ast.ProgramNode([synthetic_function(i) for i in range(args.functions)])
+    target = program.declarations[args.functions // 2]
+
+    convert_time, flat = best_time(lambda: flat_ast.flatten_ast(program), args.repeat)
+    usage_time, _ = best_time(lambda: VariableUsageVisitor().visit(program), args.repeat)
+    print(f"{len(flat)} nodes, {len(flat.strings)} interned strings, NumPy {'on' if flat_ast.np else 'off'}")
+    print(f"{'conversion (flatten_ast)':<40} {convert_time * 1e3:>10.2f} ms")
+    print(f"{'VariableUsageVisitor over object tree':<40} {usage_time * 1e3:>10.2f} ms")
+
+    def object_uses():
+        counter = IdCounter(); counter.visit(program); return dict(counter.counts)
+
+    def object_ids_in_function():
+        counter = IdCounter(); counter.visit(target); return counter.ids
+
+    queries = [("count uses per identifier", object_uses, flat.count_uses),
+               (f"IdNodes in function {target.name}", object_ids_in_function,
+                lambda: flat.ids_in_function(target.name))]
+    for label, object_query, flat_query in queries:
+        object_time, object_result = best_time(object_query, args.repeat)
+        flat_time, flat_result = best_time(flat_query, args.repeat)
+        same = (object_result == flat_result if isinstance(flat_result, dict)
+                else {id(n) for n in object_result} == {id(flat.nodes[i]) for i in flat_result})
+        print(f"{label:<40} object {object_time * 1e3:>9.2f} ms  flat {flat_time * 1e3:>9.3f} ms  "
+              f"{object_time / flat_time:>7.1f}x  {'ok' if same else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Seeds per minute the interpreter-based equivalence check gets through.
+
+Obfuscates a synthetic program (no parser needed) with one seed after another and compares
+each variant with the original on the closure-compiled interpreter.
+Usage: python benchmarks/bench_interpreter.py [--functions 4] [--n 20] [--seeds 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obfuscations import ast_nodes as ast
+from obfuscations.interpreter import compile_program, compare_programs
+from pipeline import obfuscate_ast
+
+
+def _int(value): return ast.ConstantNode("int", str(value))
+def _assign(name, expr): return ast.ExprStatementNode(ast.AssignmentNode(ast.IdNode(name), expr))
+def _add(left, right): return ast.BinaryOpNode("+", left, right)
+
+
+def _counting_loop(counter, limit, body):
+    return [_assign(counter, _int(0)),
+            ast.WhileNode(ast.BinaryOpNode("<", ast.IdNode(counter), limit),
+                          ast.CompoundStatementNode(body + [_assign(counter, _add(ast.IdNode(counter), _int(1)))]))]
+
+
+def synthetic_program(num_functions, n):
+    """f0 .. f{k-1}, each summing over an n-iteration loop, and a main printing their results
+    for n arguments."""
+    int_type, functions = ast.TypeNode("int"), []
+    for index in range(num_functions):
+        update = _assign("acc", ast.BinaryOpNode("%", _add(ast.BinaryOpNode("*", ast.IdNode("acc"), _int(index + 3)),
+                                                           ast.BinaryOpNode("-", ast.IdNode("x"), ast.IdNode("i"))),
+                                                 _int(1009)))
+        body = [ast.VarDeclNode(int_type, "acc", _int(index)), ast.VarDeclNode(int_type, "i")]
+        body += _counting_loop("i", _int(n), [update]) + [ast.ReturnNode(ast.IdNode("acc"))]
+        functions.append(ast.FuncDefNode(int_type, f"f{index}", [ast.ParamNode(int_type, "x")],
+                                         ast.CompoundStatementNode(body)))
+    calls = [_assign("total", _add(ast.IdNode("total"), ast.FuncCallNode(ast.IdNode(f"f{index}"), [ast.IdNode("j")])))
+             for index in range(num_functions)]
+    printf = ast.FuncCallNode(ast.IdNode("printf"), [ast.StringLiteralNode('"%d\\n"'), ast.IdNode("total")])
+    main = ast.FuncDefNode(int_type, "main", [], ast.CompoundStatementNode(
+        [ast.VarDeclNode(int_type, "total", _int(0)), ast.VarDeclNode(int_type, "j")] + _counting_loop("j", _int(n), calls)
+        + [ast.ExprStatementNode(printf), ast.ReturnNode(_int(0))]))
+    return ast.ProgramNode(functions + [main])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--functions", type=int, default=4)
+    arg_parser.add_argument("--n", type=int, default=20, help="iterations of every loop")
+    arg_parser.add_argument("--seeds", type=int, default=500)
+    args = arg_parser.parse_args()
+
+    program_ast = synthetic_program(args.functions, args.n)
+    start = time.perf_counter()
+    program = compile_program(program_ast)
+    compile_time = time.perf_counter() - start
+    start = time.perf_counter()
+    result = program.run()
+    run_time = time.perf_counter() - start
+    print(f"original: compiled in {compile_time * 1e3:.2f} ms, ran in {run_time * 1e3:.2f} ms, "
+          f"output {result.output.strip()!r}")
+
+    failed, transform_time, check_time = [], 0.0, 0.0
+    for seed in range(1, args.seeds + 1):
+        start = time.perf_counter()
+        variant = obfuscate_ast(ast.clone_ast(program_ast), seed=seed)
+        middle = time.perf_counter()
+        if not compare_programs(program, variant)["equivalent"]: failed.append(seed)
+        transform_time, check_time = transform_time + middle - start, check_time + time.perf_counter() - middle
+    total = transform_time + check_time
+    print(f"{args.seeds} seeds in {total:.2f}s ({args.seeds / total * 60:.0f} seeds/min): "
+          f"obfuscation {transform_time:.2f}s, compile + run + compare {check_time:.2f}s")
+    print(f"failed seeds: {failed or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Byte counts of obfuscated output with fully parenthesized vs. precedence-aware printing.
+
+Every minimal-parenthesis output is re-parsed and must print back to exactly the same
+fully parenthesized code as the AST it came from, i.e. it parses to the same expression trees.
+
+Usage: python benchmarks/bench_parens.py [files...] [--seeds 1-5]
+"""
+import argparse
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import parse_code, obfuscate_ast
+from obfuscations.c_generator_visitor import CCodeGenerator
+from verifier_main import parse_seed_spec
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("files", nargs="*", default=sorted(glob.glob(os.path.join(root, "input*.mc"))))
+    arg_parser.add_argument("--seeds", default="1-5")
+    args = arg_parser.parse_args()
+
+    total_full = total_minimal = mismatches = 0
+    print(f"{'file':<20} {'seed':>5} {'full bytes':>11} {'minimal bytes':>14} {'saved':>7}  round-trip")
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8') as f:
+            code = f.read()
+        for seed in parse_seed_spec(args.seeds):
+            obfuscated = obfuscate_ast(parse_code(code), seed=seed)
+            full_code = CCodeGenerator(minimal_parens=False).visit(obfuscated)
+            minimal_code = CCodeGenerator().visit(obfuscated)
+            reparsed_code = CCodeGenerator(minimal_parens=False).visit(parse_code(minimal_code))
+            same_ast = reparsed_code == full_code
+            mismatches += not same_ast
+            total_full, total_minimal = total_full + len(full_code), total_minimal + len(minimal_code)
+            print(f"{os.path.basename(path):<20} {seed:>5} {len(full_code):>11} {len(minimal_code):>14} "
+                  f"{1 - len(minimal_code) / len(full_code):>7.1%}  {'ok' if same_ast else 'MISMATCH'}")
+    if total_full:
+        print(f"{'total':<26} {total_full:>11} {total_minimal:>14} {1 - total_minimal / total_full:>7.1%}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Pattern-matcher throughput (nodes/s) as the number of rules grows.
+
+Compares one RuleSet traversal matching all rules with a traversal per rule.
+Usage: python benchmarks/bench_pattern_matcher.py [--functions 500] [--counts 1,10,50,100,250,500]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from obfuscations import ast_nodes as ast
+from deobfuscations.pattern_matcher import _, capture, BinaryOp, UnaryOp, Id, Const, Assign, Call, Rule, RuleSet
+from bench_flat_ast import synthetic_function
+
+OPS = ['+', '-', '*', '/', '%', '<', '>', '<=', '>=', '==', '!=', '&&', '||']
+
+
+def make_rules(count):
+    x = capture('x')
+    shapes = [
+        lambda k: BinaryOp(OPS[k % len(OPS)], Const(str(k)), x),
+        lambda k: BinaryOp(OPS[k % len(OPS)], x, UnaryOp('-', Id(f"v{k}"))),
+        lambda k: Assign(Id(f"v{k}"), BinaryOp('+', x, _)),
+        lambda k: UnaryOp('-', Const(str(k))),
+        lambda k: Call(Id(f"f{k}"), _),
+        lambda k: BinaryOp(OPS[k % len(OPS)], x, x),
+    ]
+    # Rule 0 actually matches the synthetic code (acc = acc + ...).
+    rules = [Rule("acc_update", Assign(Id('acc'), BinaryOp('+', Id('acc'), x)))]
+    rules += [Rule(f"r{k}", shapes[k % len(shapes)](k)) for k in range(1, count)]
+    return rules[:count]
+
+
+def count_nodes(node):
+    stack, total = [node], 0
+    while stack:
+        node = stack.pop()
+        total += 1
+        for field in ast.CHILD_FIELDS[node.__class__]:
+            value = getattr(node, field, None)
+            if isinstance(value, ast.Node): stack.append(value)
+            elif isinstance(value, list): stack.extend(value)
+    return total
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--functions", type=int, default=500)
+    arg_parser.add_argument("--counts", default="1,10,50,100,250,500")
+    args = arg_parser.parse_args()
+
+    program = ast.ProgramNode([synthetic_function(i) for i in range(args.functions)])
+    nodes = count_nodes(program)
+    print(f"{nodes} nodes")
+    print(f"{'rules':>6} {'matches':>8} {'one traversal nodes/s':>22} {'pass per rule nodes/s':>22}")
+    for count in (int(c) for c in args.counts.split(',')):
+        rules = make_rules(count)
+        rule_set = RuleSet(rules)
+        start = time.perf_counter()
+        matches = rule_set.find_all(program)
+        combined = time.perf_counter() - start
+
+        start = time.perf_counter()
+        separate_matches = sum(len(RuleSet([rule]).find_all(program)) for rule in rules)
+        separate = time.perf_counter() - start
+        assert separate_matches == len(matches)
+        print(f"{count:>6} {len(matches):>8} {nodes / combined:>22,.0f} {nodes / separate:>22,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compares the token-stream rename-only fast path with the full AST rename path.
+
+Usage: python benchmarks/bench_rename_only.py [files...] [--repeat N]
+Defaults to the input*.mc corpus in the repository root.
+"""
+import argparse
+import difflib
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import parse_code, rename_source, generate_code
+from obfuscations.rename_obfuscator import apply_renaming
+
+
+def ast_rename(code):
+    return generate_code(apply_renaming(parse_code(code)))
+
+
+def changed_lines(before, after):
+    diff = difflib.unified_diff(before.splitlines(), after.splitlines(), lineterm='', n=0)
+    return sum(1 for line in diff if line[:1] in '+-' and line[:3] not in ('+++', '---'))
+
+
+def best_time(func, code, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(code)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("files", nargs="*", default=sorted(glob.glob(os.path.join(root, "input*.mc"))))
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    print(f"{'file':<20} {'ast ms':>9} {'token ms':>9} {'speedup':>8} {'ast diff':>9} {'token diff':>11}")
+    for path in args.files:
+        with open(path, 'r', encoding='utf-8') as f:
+            code = f.read()
+        ast_time, token_time = best_time(ast_rename, code, args.repeat), best_time(rename_source, code, args.repeat)
+        print(f"{os.path.basename(path):<20} {ast_time * 1e3:>9.2f} {token_time * 1e3:>9.2f} "
+              f"{ast_time / token_time:>7.1f}x {changed_lines(code, ast_rename(code)):>9} "
+              f"{changed_lines(code, rename_source(code)):>11}")
+
+
+if __name__ == "__main__":
+    main()
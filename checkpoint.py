@@ -0,0 +1,115 @@
+"""Append-only checkpoint manifests for resumable batch runs.
+
+A manifest is a JSON-lines file: a header line, then one record per processed input written
+as soon as the input is done. Records are never rewritten; when an input appears more than
+once, the last record wins. A crash loses at most the records not flushed yet (and a torn
+last line, which is skipped on load), so a resumed run redoes only a handful of inputs.
+"""
+import hashlib
+import json
+import os
+import time
+
+MANIFEST_FORMAT = "minic-checkpoint"
+MANIFEST_VERSION = 1
+FLUSH_EVERY = 64
+FLUSH_INTERVAL = 2.0
+
+
+def content_hash(data):
+    return hashlib.sha256(data.encode('utf-8') if isinstance(data, str) else data).hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''): digest.update(block)
+    return digest.hexdigest()
+
+
+class CheckpointManifest:
+    """The latest record per input of a manifest file, plus an append handle for new records."""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self.file = None
+        self.unflushed = 0
+        self.last_flush = time.monotonic()
+
+    @classmethod
+    def load(cls, path):
+        manifest = cls(path)
+        if not os.path.exists(path): return manifest
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn write at the end of an interrupted run
+                if line_number == 0:
+                    if record.get("format") != MANIFEST_FORMAT: raise ValueError(f"{path} is not a checkpoint manifest.")
+                    if record.get("version", 0) > MANIFEST_VERSION:
+                        raise ValueError(f"Manifest version {record['version']} is newer than supported.")
+                    continue
+                manifest.records[record["input"]] = record
+        return manifest
+
+    def input_hash(self, input_path, full_path):
+        """Content hash of an input, and its (size, mtime_ns). The file is only read when its
+        size or modification time differ from the last record, which keeps unchanged trees fast."""
+        stat = os.stat(full_path)
+        fingerprint = [stat.st_size, stat.st_mtime_ns]
+        record = self.records.get(input_path)
+        if record is not None and record.get("stat") == fingerprint: return record["input_hash"], fingerprint
+        return file_hash(full_path), fingerprint
+
+    def is_complete(self, input_path, input_hash, settings, output_path):
+        """True if the last record of `input_path` finished with the same input and settings and its
+        output file is still there with the recorded size."""
+        record = self.records.get(input_path)
+        if record is None or record.get("status") != "ok": return False
+        if record.get("input_hash") != input_hash or record.get("settings") != settings: return False
+        return os.path.exists(output_path) and os.path.getsize(output_path) == record.get("output_size")
+
+    def open(self, resume=False):
+        """Starts appending; without `resume` the manifest is started over."""
+        if not resume: self.records = {}
+        new_file = not resume or not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        directory = os.path.dirname(self.path)
+        if directory: os.makedirs(directory, exist_ok=True)
+        if not new_file:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        self.file = open(self.path, 'w' if new_file else 'a', encoding='utf-8')
+        if new_file: self._write({"format": MANIFEST_FORMAT, "version": MANIFEST_VERSION})
+        elif torn: self.file.write("\n")  # end the torn line so the next record parses
+        return self
+
+    def append(self, record):
+        self.records[record["input"]] = record
+        self._write(record)
+        self.unflushed += 1
+        if self.unflushed >= FLUSH_EVERY or time.monotonic() - self.last_flush >= FLUSH_INTERVAL: self.flush()
+
+    def _write(self, record):
+        self.file.write(json.dumps(record, separators=(',', ':')) + "\n")
+
+    def flush(self):
+        if self.file is None: return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unflushed, self.last_flush = 0, time.monotonic()
+
+    def close(self):
+        if self.file is None: return
+        self.flush()
+        self.file.close()
+        self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
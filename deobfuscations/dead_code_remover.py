@@ -37,12 +37,56 @@ class VariableUsageVisitor:
             self.visit(node.body)
 
 
-def apply_dead_code_removal(ast_root: ast.ProgramNode):
-    # Pass 1: Find all declared and used variables
-    usage_visitor = VariableUsageVisitor()
-    usage_visitor.visit(ast_root)
+class VariableUsageCache:
+    """Per-function VariableUsageVisitor results, recomputed only for functions whose generation changed."""
+
+    def __init__(self):
+        self._entries = {}
+        self.recomputed = 0
+
+    def function_usage(self, func: ast.FuncDefNode):
+        entry = self._entries.get(id(func))
+        if entry is not None and entry[0] is func and entry[1] == func.generation:
+            return entry[2], entry[3]
+        usage_visitor = VariableUsageVisitor()
+        usage_visitor.visit(func)
+        self._entries[id(func)] = (func, func.generation, usage_visitor.used_vars, usage_visitor.declared_vars)
+        self.recomputed += 1
+        return usage_visitor.used_vars, usage_visitor.declared_vars
+
+    def program_usage(self, ast_root: ast.ProgramNode):
+        used_vars, declared_vars = set(), set()
+        live_ids = set()
+        for decl in ast_root.declarations:
+            if isinstance(decl, ast.FuncDefNode):
+                live_ids.add(id(decl))
+                func_used, func_declared = self.function_usage(decl)
+            else:
+                usage_visitor = VariableUsageVisitor()
+                usage_visitor.visit(decl)
+                func_used, func_declared = usage_visitor.used_vars, usage_visitor.declared_vars
+            used_vars |= func_used
+            declared_vars |= func_declared
+        # Forget functions that are no longer part of the program.
+        for stale_id in self._entries.keys() - live_ids: del self._entries[stale_id]
+        return used_vars, declared_vars
+
 
-    dead_vars = usage_visitor.declared_vars - usage_visitor.used_vars
+def get_usage_cache(ast_root: ast.ProgramNode):
+    """Returns the usage cache kept alongside this program, so repeated passes over it can share it."""
+    cache = getattr(ast_root, '_usage_cache', None)
+    if cache is None:
+        cache = ast_root._usage_cache = VariableUsageCache()
+    return cache
+
+
+def dead_code_removal_pass(ast_root: ast.ProgramNode):
+    """Removes unused variable declarations; returns the AST and the number of declarations removed."""
+    # Pass 1: Find all declared and used variables, re-walking only functions changed since the last run
+    used_vars, declared_vars = get_usage_cache(ast_root).program_usage(ast_root)
+
+    dead_vars = declared_vars - used_vars
+    removed = 0
 
     # Pass 2: Remove dead code from the AST
     new_declarations = []
@@ -56,13 +100,22 @@ def apply_dead_code_removal(ast_root: ast.ProgramNode):
                         # Skip dead variable declarations
                         continue
                     new_items.append(item)
+                if len(new_items) != len(decl.body.items):
+                    removed += len(decl.body.items) - len(new_items)
+                    ast.mark_changed(decl, decl.body)
                 decl.body.items = new_items
             new_declarations.append(decl)
         elif isinstance(decl, ast.VarDeclNode) and decl.name in dead_vars:
             # Skip global dead variable declarations
+            removed += 1
             continue
         else:
             new_declarations.append(decl)
 
     ast_root.declarations = new_declarations
-    return ast_root
\ No newline at end of file
+    return ast_root, removed
+
+
+def apply_dead_code_removal(ast_root: ast.ProgramNode):
+    ast_root, _ = dead_code_removal_pass(ast_root)
+    return ast_root
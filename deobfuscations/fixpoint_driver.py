@@ -0,0 +1,51 @@
+from obfuscations import ast_nodes as ast
+from deobfuscations.unused_function_remover import unused_function_removal_pass
+from deobfuscations.dead_code_remover import dead_code_removal_pass
+from deobfuscations.expression_simplifier import expression_simplification_pass
+from deobfuscations.flow_reconstructor import flow_reconstruction_pass
+
+# Cleanup passes in the order they run within one round. Each takes the AST and
+# returns (ast, number of changes made). Unreachable functions go first so the
+# other passes never walk them.
+CLEANUP_PASSES = {
+    "unused_function_removal": unused_function_removal_pass,
+    "dead_code_removal": dead_code_removal_pass,
+    "expression_simplification": expression_simplification_pass,
+    "control_flow_simplification": flow_reconstruction_pass,
+}
+
+DEFAULT_MAX_ITERATIONS = 10
+
+
+def run_until_fixpoint(ast_root: ast.ProgramNode, passes=None, max_iterations=DEFAULT_MAX_ITERATIONS, on_pass=None):
+    """Runs the cleanup passes round after round until none of them changes the AST.
+
+    A pass is skipped in a round when it reported no changes the last time it ran and
+    no other pass has changed the AST since, because it cannot make progress. Stops
+    after `max_iterations` rounds even if the passes have not converged. `on_pass(round, name)`
+    is called before each pass runs (the GUI reports progress and cancels from it).
+    Returns the AST and a stats dict with the rounds run and per-pass runs/changes.
+    """
+    passes = CLEANUP_PASSES if passes is None else passes
+    pending = set(passes)
+    stats = {name: {"runs": 0, "changes": 0} for name in passes}
+    iterations = 0
+    while pending and iterations < max_iterations:
+        iterations += 1
+        for name, pass_func in passes.items():
+            if name not in pending: continue
+            pending.discard(name)
+            if on_pass is not None: on_pass(iterations, name)
+            ast_root, changes = pass_func(ast_root)
+            stats[name]["runs"] += 1
+            stats[name]["changes"] += changes
+            if changes: pending.update(passes)
+    return ast_root, {"iterations": iterations, "converged": not pending, "passes": stats}
+
+
+def format_fixpoint_stats(stats):
+    status = "converged" if stats["converged"] else "stopped at the iteration cap"
+    lines = [f"Cleanup {status} after {stats['iterations']} round(s):"]
+    for name, pass_stats in stats["passes"].items():
+        lines.append(f"  {name}: {pass_stats['changes']} change(s) in {pass_stats['runs']} run(s)")
+    return "\n".join(lines)
@@ -7,6 +7,10 @@ class AdvancedFlowReconstructorVisitor:
     It looks for a while loop containing a state machine pattern and flattens it.
     """
 
+    def __init__(self):
+        self.changes = 0
+        self.current_function = None
+
     def visit(self, node):
         if node is None:
             return None
@@ -28,6 +32,12 @@ class AdvancedFlowReconstructorVisitor:
                         pass
         return node
 
+    def visit_FuncDefNode(self, node: ast.FuncDefNode):
+        outer_function, self.current_function = self.current_function, node
+        self.generic_visit(node)
+        self.current_function = outer_function
+        return node
+
     def visit_CompoundStatementNode(self, node: ast.CompoundStatementNode):
         new_items = []
         for item in node.items:
@@ -70,11 +80,20 @@ class AdvancedFlowReconstructorVisitor:
                     # In a real tool, this would be handled with more advanced analysis.
                     return self.generic_visit(node)
 
+            self.changes += 1
+            ast.mark_changed(self.current_function)
             return flattened_statements
 
         return self.generic_visit(node)
 
 
-def apply_flow_reconstruction(ast_root: ast.ProgramNode):
+def flow_reconstruction_pass(ast_root: ast.ProgramNode):
+    """Reconstructs control flow; returns the AST and the number of loops flattened."""
     reconstructor = AdvancedFlowReconstructorVisitor()
-    return reconstructor.visit(ast_root)
\ No newline at end of file
+    ast_root = reconstructor.visit(ast_root)
+    return ast_root, reconstructor.changes
+
+
+def apply_flow_reconstruction(ast_root: ast.ProgramNode):
+    ast_root, _ = flow_reconstruction_pass(ast_root)
+    return ast_root
\ No newline at end of file
@@ -0,0 +1,300 @@
+"""A small declarative pattern language over ast_nodes for de-obfuscation rules.
+
+    from deobfuscations.pattern_matcher import _, capture, BinaryOp, UnaryOp, Rule, RuleSet
+
+    x, y = capture('x'), capture('y')
+    rules = RuleSet([Rule("sub_of_negation", BinaryOp('-', x, UnaryOp('-', y)),
+                          lambda node, m: ast.BinaryOpNode('+', m['x'], m['y'], coord=node.coord))])
+    ast_root, changes = rules.rewrite(ast_root)
+
+A pattern field may be `_` (anything), a capture (binds the value; a name used twice must
+match structurally equal subtrees), a literal, a set of literals (any of them), a list of
+patterns (matched element-wise) or a nested pattern. Every pattern is compiled once into a
+Python closure, and rules are indexed by node class, operator and first operand, so each
+node is only tested against the rules that could possibly match it and all rules run in
+one traversal.
+"""
+import itertools
+
+from obfuscations import ast_nodes as ast
+
+
+class _Wildcard:
+    def __repr__(self): return '_'
+
+
+_ = _Wildcard()
+
+
+class Capture:
+    def __init__(self, name, pattern=_):
+        self.name = name
+        self.pattern = pattern
+
+    def __repr__(self):
+        return self.name if self.pattern is _ else f"capture({self.name!r}, {self.pattern!r})"
+
+
+def capture(name, pattern=_):
+    """A named hole; with `pattern`, the captured value must also match it."""
+    return Capture(name, pattern)
+
+
+class Pattern:
+    def __init__(self, node_class, **fields):
+        self.node_class = node_class
+        self.fields = fields
+
+    def __repr__(self):
+        args = ', '.join(f"{k}={v!r}" for k, v in self.fields.items() if v is not _)
+        return f"{self.node_class.__name__}({args})"
+
+
+def BinaryOp(op=_, left=_, right=_): return Pattern(ast.BinaryOpNode, op=op, left=left, right=right)
+def UnaryOp(op=_, expr=_): return Pattern(ast.UnaryOpNode, op=op, expr=expr)
+def Id(name=_): return Pattern(ast.IdNode, name=name)
+def Const(value=_, type=_): return Pattern(ast.ConstantNode, value=value, type=type)
+def Call(name_expr=_, args=_): return Pattern(ast.FuncCallNode, name_expr=name_expr, args=args)
+def Assign(lvalue=_, rvalue=_, op=_): return Pattern(ast.AssignmentNode, lvalue=lvalue, rvalue=rvalue, op=op)
+def ExprStmt(expr=_): return Pattern(ast.ExprStatementNode, expr=expr)
+def If(cond=_, if_true_body=_, if_false_body=_):
+    return Pattern(ast.IfNode, cond=cond, if_true_body=if_true_body, if_false_body=if_false_body)
+def While(cond=_, body=_): return Pattern(ast.WhileNode, cond=cond, body=body)
+def Return(expr=_): return Pattern(ast.ReturnNode, expr=expr)
+
+
+def same_tree(a, b):
+    """Structural equality of two AST values, ignoring coords and analysis state."""
+    if a.__class__ is not b.__class__: return False
+    if isinstance(a, list): return len(a) == len(b) and all(same_tree(x, y) for x, y in zip(a, b))
+    if not isinstance(a, ast.Node): return a == b
+    return all(same_tree(value, getattr(b, key, None)) for key, value in a.__dict__.items()
+               if not key.startswith('_') and key not in ('coord', 'generation', 'original_name'))
+
+
+def compile_pattern(pattern):
+    """Compiles a pattern into a closure match(value, bindings) -> bool that fills `bindings`."""
+    if pattern is _:
+        return lambda value, bindings: True
+    if isinstance(pattern, Capture):
+        name, inner = pattern.name, compile_pattern(pattern.pattern)
+
+        def match_capture(value, bindings):
+            if name in bindings: return same_tree(bindings[name], value)
+            if not inner(value, bindings): return False
+            bindings[name] = value
+            return True
+        return match_capture
+    if isinstance(pattern, Pattern):
+        node_class = pattern.node_class
+        field_matchers = [(field, compile_pattern(sub)) for field, sub in pattern.fields.items() if sub is not _]
+
+        def match_node(value, bindings):
+            if value.__class__ is not node_class: return False
+            for field, field_matcher in field_matchers:
+                if not field_matcher(getattr(value, field), bindings): return False
+            return True
+        return match_node
+    if isinstance(pattern, list):
+        item_matchers = [compile_pattern(sub) for sub in pattern]
+        return lambda value, bindings: (isinstance(value, list) and len(value) == len(item_matchers)
+                                        and all(m(v, bindings) for m, v in zip(item_matchers, value)))
+    if isinstance(pattern, (set, frozenset)):
+        return lambda value, bindings: value in pattern
+    return lambda value, bindings: value == pattern
+
+
+def instantiate(pattern):
+    """Builds a small tree the pattern matches: captures and wildcard operands become variables
+    (a capture used twice becomes the same variable), a set of literals yields its smallest one
+    and other wildcard fields (operators, constant types) are left None."""
+    fresh_names = (f"_v{i}" for i in itertools.count())
+
+    def build(sub, is_child):
+        if isinstance(sub, Capture):
+            return ast.IdNode(sub.name) if sub.pattern is _ else build(sub.pattern, is_child)
+        if sub is _: return ast.IdNode(next(fresh_names)) if is_child else None
+        if isinstance(sub, Pattern):
+            child_fields = ast.CHILD_FIELDS.get(sub.node_class, ())
+            return sub.node_class(**{field: build(value, field in child_fields) for field, value in sub.fields.items()})
+        if isinstance(sub, list): return [build(item, is_child) for item in sub]
+        if isinstance(sub, (set, frozenset)): return sorted(sub)[0]
+        return sub
+    return build(pattern, True)
+
+
+class Rule:
+    """`rewrite(node, bindings)` returns the replacement node, or None to leave the node alone."""
+
+    def __init__(self, name, pattern, rewrite=None):
+        self.name = name
+        self.pattern = pattern
+        self.rewrite = rewrite
+        self.matcher = compile_pattern(pattern)
+
+    def __repr__(self):
+        return f"Rule({self.name!r}, {self.pattern!r})"
+
+    def example(self):
+        """(instance of the pattern, its rewrite) for validating the rule; the rewrite may be None."""
+        original = instantiate(self.pattern)
+        # Rewrite a copy, so rewrites that reuse or mutate the matched nodes leave `original` intact.
+        copy, bindings = ast.clone_ast(original), {}
+        if not self.matcher(copy, bindings): raise ValueError(f"Rule {self.name!r}: its instance does not match")
+        return original, self.rewrite(copy, bindings) if self.rewrite else None
+
+
+_ANY = object()
+_LABEL_FIELDS = ('op', 'name', 'value')
+
+
+def _node_label(node):
+    """(class, operator/name/value) of a node: the keys the dispatch table discriminates on."""
+    for field in _LABEL_FIELDS:
+        if field in node.__dict__: return node.__class__, node.__dict__[field]
+    return node.__class__, None
+
+
+def _is_literal(value):
+    return not isinstance(value, (_Wildcard, Capture, Pattern, list, set, frozenset))
+
+
+def _first_child_field(node_class):
+    fields = ast.CHILD_FIELDS.get(node_class)
+    return fields[0] if fields else None
+
+
+def _pattern_keys(pattern):
+    """Dispatch keys (root operator, first-child label) a rule can match under; _ANY is a wildcard."""
+    op = pattern.fields.get('op', _)
+    ops = list(op) if isinstance(op, (set, frozenset)) else [op if _is_literal(op) else _ANY]
+    child = pattern.fields.get(_first_child_field(pattern.node_class), _)
+    if isinstance(child, Capture): child = child.pattern
+    child_key = _ANY
+    if isinstance(child, Pattern):
+        label_field = next((f for f in _LABEL_FIELDS if f in child.fields), None)
+        label = child.fields[label_field] if label_field else None
+        if _is_literal(label): child_key = (child.node_class, label)
+    return [(op_key, child_key) for op_key in ops]
+
+
+class _ClassTable:
+    """Rules for one node class, indexed by (root operator, label of the first child)."""
+
+    def __init__(self, first_child_field):
+        self.first_child_field = first_child_field
+        self.entries = {}
+        self.ops, self.children = set(), set()
+        self.merged = {}
+
+    def add(self, key, order, rule):
+        self.entries.setdefault(key, []).append((order, rule))
+        if key[0] is not _ANY: self.ops.add(key[0])
+        if key[1] is not _ANY: self.children.add(key[1])
+
+    def lookup(self, op_key, child_key):
+        key = (op_key, child_key)
+        rules = self.merged.get(key)
+        if rules is None:
+            # Everything that can match: the exact entry plus the entries wildcarding either key.
+            entries = {entry for op in {op_key, _ANY} for child in {child_key, _ANY}
+                       for entry in self.entries.get((op, child), ())}
+            rules = self.merged[key] = [rule for _order, rule in sorted(entries, key=lambda entry: entry[0])]
+        return rules
+
+
+class RuleSet:
+    """Rules compiled into a dispatch table keyed by node class, then by the node's operator and
+    the label (class plus operator, name or value) of its first child.
+
+    A rule is only tried on nodes whose keys agree with what its pattern fixes, so adding rules
+    for other operators or operands does not slow down matching of unrelated nodes. Rule order
+    is kept within each entry, and the first rule that matches (and rewrites) wins.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self._table = {}
+        for order, rule in enumerate(self.rules):
+            if not isinstance(rule.pattern, Pattern):
+                raise ValueError(f"Rule {rule.name!r}: the pattern root must be a node pattern")
+            node_class = rule.pattern.node_class
+            class_table = self._table.get(node_class)
+            if class_table is None:
+                class_table = self._table[node_class] = _ClassTable(_first_child_field(node_class))
+            for key in _pattern_keys(rule.pattern): class_table.add(key, order, rule)
+
+    def candidates(self, node):
+        class_table = self._table.get(node.__class__)
+        if class_table is None: return ()
+        op_key = node.__dict__.get('op', _ANY)
+        if op_key not in class_table.ops: op_key = _ANY
+        child_key = _ANY
+        if class_table.children:
+            child = getattr(node, class_table.first_child_field, None)
+            if isinstance(child, ast.Node):
+                child_key = _node_label(child)
+                if child_key not in class_table.children: child_key = _ANY
+        return class_table.lookup(op_key, child_key)
+
+    def match(self, node):
+        """Returns (rule, bindings) for the first rule matching `node`, or None."""
+        for rule in self.candidates(node):
+            bindings = {}
+            if rule.matcher(node, bindings): return rule, bindings
+        return None
+
+    def find_all(self, ast_root):
+        """All (node, rule, bindings) matches in the tree, found in a single traversal."""
+        found = []
+        stack = [ast_root]
+        while stack:
+            node = stack.pop()
+            for rule in self.candidates(node):
+                bindings = {}
+                if rule.matcher(node, bindings): found.append((node, rule, bindings))
+            stack.extend(_child_nodes(node))
+        return found
+
+    def rewrite(self, ast_root, max_rewrites_per_node=100):
+        """Rewrites the tree bottom-up in one traversal, re-matching each replacement until no rule
+        applies. Marks changed functions; returns the AST and the number of rewrites."""
+        self._changes = 0
+        ast_root = self._rewrite_node(ast_root, None, max_rewrites_per_node)
+        return ast_root, self._changes
+
+    def _rewrite_node(self, node, function, limit):
+        if isinstance(node, ast.FuncDefNode): function = node
+        for field in _child_fields(node):
+            value = getattr(node, field, None)
+            if isinstance(value, ast.Node):
+                setattr(node, field, self._rewrite_node(value, function, limit))
+            elif isinstance(value, list):
+                value[:] = [self._rewrite_node(item, function, limit) if isinstance(item, ast.Node) else item
+                            for item in value]
+        for _attempt in range(limit):
+            for rule in self.candidates(node):
+                bindings = {}
+                if rule.matcher(node, bindings) and rule.rewrite is not None:
+                    replacement = rule.rewrite(node, bindings)
+                    if replacement is not None: break
+            else:
+                return node
+            node = replacement
+            self._changes += 1
+            ast.mark_changed(function)
+        return node
+
+
+def _child_fields(node):
+    fields = ast.CHILD_FIELDS.get(node.__class__)
+    if fields is None:
+        fields = [k for k, v in node.__dict__.items() if not k.startswith('_') and isinstance(v, (ast.Node, list))]
+    return fields
+
+
+def _child_nodes(node):
+    for field in _child_fields(node):
+        value = getattr(node, field, None)
+        if isinstance(value, ast.Node): yield value
+        elif isinstance(value, list): yield from (item for item in value if isinstance(item, ast.Node))
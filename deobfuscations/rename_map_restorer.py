@@ -0,0 +1,35 @@
+from obfuscations import ast_nodes as ast
+
+NAMED_NODES = (ast.FuncDefNode, ast.ParamNode, ast.VarDeclNode, ast.IdNode)
+
+
+def restore_names_pass(ast_root: ast.ProgramNode, rename_map):
+    """Puts back the original names recorded in a RenameMap in one linear walk (explicit stack).
+
+    Obfuscated names are unique per declaration, so no scope analysis is needed: every name in
+    the map's index is replaced, anything else (dummy functions, library calls) is left alone.
+    Returns the AST and the number of names restored.
+    """
+    by_obfuscated, restored, changed = rename_map.by_obfuscated, 0, set()
+    stack = [(ast_root, ast_root)]
+    while stack:
+        node, owner = stack.pop()
+        if isinstance(node, ast.FuncDefNode): owner = node
+        if isinstance(node, NAMED_NODES):
+            entry = by_obfuscated.get(node.name)
+            if entry is not None:
+                node.name = entry.original
+                if isinstance(node, ast.FuncDefNode): node.original_name = entry.original
+                restored += 1
+                changed.add(owner)
+        for field in ast.CHILD_FIELDS.get(node.__class__, ()):
+            value = getattr(node, field, None)
+            if isinstance(value, ast.Node): stack.append((value, owner))
+            elif isinstance(value, list): stack.extend((item, owner) for item in value if isinstance(item, ast.Node))
+    if changed: ast.mark_changed(*changed)
+    return ast_root, restored
+
+
+def apply_rename_map(ast_root: ast.ProgramNode, rename_map):
+    ast_root, _ = restore_names_pass(ast_root, rename_map)
+    return ast_root
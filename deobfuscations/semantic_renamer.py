@@ -66,6 +66,7 @@ class SemanticRenamerVisitor:
             self.name_map[node.name] = new_name
             node.name = new_name
 
+        ast.mark_changed(node)
         # Visit function body and parameters
         if node.params:
             for param in node.params: self.visit(param)
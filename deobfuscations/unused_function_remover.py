@@ -0,0 +1,102 @@
+from obfuscations import ast_nodes as ast
+
+ENTRY_POINT = 'main'
+
+
+class FunctionReferenceVisitor:
+    """Collects the names referenced by IdNodes in a subtree and whether it makes indirect calls.
+
+    Every reference counts, not only direct calls, so a function whose name is passed around
+    as a value stays reachable from wherever the name appears.
+    """
+
+    def __init__(self):
+        self.referenced = set()
+        self.call_targets = set()
+        self.has_indirect_call = False
+
+    def visit(self, node):
+        if node is None: return
+        method_name = 'visit_' + node.__class__.__name__
+        visitor_method = getattr(self, method_name, self.generic_visit)
+        visitor_method(node)
+
+    def generic_visit(self, node):
+        for attr_name in dir(node):
+            if not attr_name.startswith('_') and attr_name != 'coord':
+                attr_value = getattr(node, attr_name)
+                if isinstance(attr_value, ast.Node):
+                    self.visit(attr_value)
+                elif isinstance(attr_value, list):
+                    for item in attr_value:
+                        if isinstance(item, ast.Node):
+                            self.visit(item)
+
+    def visit_IdNode(self, node: ast.IdNode):
+        self.referenced.add(node.name)
+
+    def visit_FuncCallNode(self, node: ast.FuncCallNode):
+        if isinstance(node.name_expr, ast.IdNode):
+            self.call_targets.add(node.name_expr.name)
+        else:
+            self.has_indirect_call = True
+        self.generic_visit(node)
+
+
+def build_call_graph(ast_root: ast.ProgramNode):
+    """Returns ({function name: FunctionReferenceVisitor of its body}, names referenced outside functions)."""
+    graph, global_refs = {}, set()
+    for decl in ast_root.declarations:
+        refs = FunctionReferenceVisitor()
+        refs.visit(decl.body if isinstance(decl, ast.FuncDefNode) else decl)
+        if isinstance(decl, ast.FuncDefNode):
+            graph[decl.name] = refs
+        else:
+            global_refs |= refs.referenced
+    return graph, global_refs
+
+
+def reachable_functions(graph, global_refs, entry=ENTRY_POINT):
+    """Worklist reachability over the reference graph, starting from `entry` and every function
+    named outside function bodies.
+
+    If a reachable function calls through something other than a plain name, any function
+    whose name is used as a value (not directly called) might be the target, so all of those
+    are kept as well.
+    """
+    address_taken = {name for refs in graph.values() for name in refs.referenced - refs.call_targets}
+    address_taken |= global_refs
+    reachable, worklist = set(), [name for name in [entry, *global_refs] if name in graph]
+    indirect_resolved = False
+    while worklist:
+        name = worklist.pop()
+        if name in reachable: continue
+        reachable.add(name)
+        refs = graph[name]
+        worklist.extend(callee for callee in refs.referenced if callee in graph and callee not in reachable)
+        if refs.has_indirect_call and not indirect_resolved:
+            indirect_resolved = True
+            worklist.extend(target for target in address_taken if target in graph and target not in reachable)
+    return reachable
+
+
+def unused_function_removal_pass(ast_root: ast.ProgramNode):
+    """Drops function definitions not reachable from main; returns the AST and the number removed.
+
+    Programs without a main (e.g. libraries) are left untouched.
+    """
+    graph, global_refs = build_call_graph(ast_root)
+    if ENTRY_POINT not in graph: return ast_root, 0
+    reachable = reachable_functions(graph, global_refs)
+    kept = [decl for decl in ast_root.declarations
+            if not isinstance(decl, ast.FuncDefNode) or decl.name in reachable]
+    removed = len(ast_root.declarations) - len(kept)
+    if removed:
+        ast_root.declarations = kept
+        ast.mark_changed(ast_root)
+    return ast_root, removed
+
+
+def apply_unused_function_removal(ast_root: ast.ProgramNode):
+    ast_root, _ = unused_function_removal_pass(ast_root)
+    return ast_root
@@ -1,35 +1,30 @@
 import tkinter as tk
 from tkinter import filedialog, ttk
+import argparse
 import os
 import sys
-import time
-import subprocess
+import statistics
 import tkinter.messagebox as messagebox
 
-from antlr4 import CommonTokenStream, InputStream
-from antlr4.error.ErrorListener import ErrorListener
-
-from grammer.MiniCLexer import MiniCLexer
-from grammer.MiniCParser import MiniCParser
-from obfuscations.ast_builder_visitor import ASTBuilderVisitor
+from pipeline import parse_processed_code
+from gui_worker import PipelineJob
+from gui_text import ChunkedTextView, PREVIEW_LIMIT_CHARS, preview_skipped_note
 from obfuscations.c_generator_visitor import CCodeGenerator
 from obfuscations.preprocessor import preprocess_code
 
 from deobfuscations.semantic_renamer import apply_semantic_renaming
+from deobfuscations.rename_map_restorer import apply_rename_map
+from obfuscations.rename_map import RenameMap
+from deobfuscations.unused_function_remover import apply_unused_function_removal
 from deobfuscations.dead_code_remover import apply_dead_code_removal
 from deobfuscations.expression_simplifier import apply_expression_simplification
 from deobfuscations.flow_reconstructor import apply_flow_reconstruction
+from deobfuscations.fixpoint_driver import CLEANUP_PASSES, DEFAULT_MAX_ITERATIONS, run_until_fixpoint, \
+    format_fixpoint_stats
+from obfuscations.interpreter import compare_programs, InterpreterError
+from verifier_main import find_c_compiler, compile_source, run_binary
 
-
-class MiniCErrorListener(ErrorListener):
-    """Custom error listener to capture syntax errors during parsing."""
-
-    def __init__(self, error_messages_list):
-        super().__init__()
-        self.error_messages = error_messages_list
-
-    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
-        self.error_messages.append(f"ERROR - Line {line}:{column} : {msg}")
+REPORT_RUNS = 5
 
 
 class DeobfuscatorGUI:
@@ -40,6 +35,7 @@ class DeobfuscatorGUI:
         self.root.title("Mini-C De-obfuscator")
         self.current_input_filepath = None
         self.current_input_filename = "obfuscated.mc"
+        self.job = None
 
         self._configure_styles()
         self._setup_gui_layout()
@@ -78,6 +74,10 @@ class DeobfuscatorGUI:
         self.output_entry = ttk.Entry(file_frame, width=60)
         self.output_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
         ttk.Button(file_frame, text="Save As...", command=self.action_select_output_file).grid(row=1, column=2, pady=5)
+        ttk.Label(file_frame, text="Rename Map:").grid(row=2, column=0, padx=(0, 5), pady=5, sticky="w")
+        self.rename_map_entry = ttk.Entry(file_frame, width=60)
+        self.rename_map_entry.grid(row=2, column=1, padx=5, pady=5, sticky="ew")
+        ttk.Button(file_frame, text="Browse...", command=self.action_select_rename_map).grid(row=2, column=2, pady=5)
 
         # De-obfuscation options frame
         options_frame = ttk.LabelFrame(main_app_frame, text="De-obfuscation Techniques", padding="10")
@@ -85,6 +85,7 @@ class DeobfuscatorGUI:
         self.deobf_options = {}
         self.techniques_map = {
             "name_restoration": ("Restore Names", True, apply_semantic_renaming),
+            "unused_function_removal": ("Remove Unreachable Functions", True, apply_unused_function_removal),
             "dead_code_removal": ("Remove Dead Code", True, apply_dead_code_removal),
             "expression_simplification": ("Simplify Expressions", True, apply_expression_simplification),
             "control_flow_simplification": ("Simplify Control Flow", True, apply_flow_reconstruction),
@@ -95,11 +96,14 @@ class DeobfuscatorGUI:
                                                                                              sticky="w", padx=5, pady=2)
 
         self.performance_option = tk.BooleanVar(value=True)
-        ttk.Checkbutton(options_frame, text="Generate Performance Report", variable=self.performance_option).grid(row=4,
+        ttk.Checkbutton(options_frame, text="Generate Performance Report", variable=self.performance_option).grid(row=len(self.techniques_map),
                                                                                                                   column=0,
                                                                                                                   sticky="w",
                                                                                                                   padx=5,
                                                                                                                   pady=2)
+        self.skip_preview_option = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Save Without Preview", variable=self.skip_preview_option).grid(
+            row=len(self.techniques_map) + 1, column=0, sticky="w", padx=5, pady=2)
 
         # Text areas for code display
         text_areas_frame = ttk.Frame(main_app_frame)
@@ -125,23 +129,26 @@ class DeobfuscatorGUI:
                                         state="disabled", bg="#f0f0f0")
         self.output_text_scrollbar = ttk.Scrollbar(output_text_frame, orient="vertical",
                                                    command=self.output_text_area.yview)
-        self.output_text_area["yscrollcommand"] = self.output_text_scrollbar.set
+        self.output_view = ChunkedTextView(self.output_text_area, self.output_text_scrollbar)
         self.output_text_scrollbar.grid(row=0, column=1, sticky="ns")
         self.output_text_area.grid(row=0, column=0, sticky="nsew")
 
         # Action buttons
         action_buttons_frame = ttk.Frame(main_app_frame, padding="10 0 0 0")
         action_buttons_frame.pack(fill=tk.X)
-        ttk.Button(action_buttons_frame, text="Run De-obfuscator", command=self.action_deobfuscate_code).pack(
-            side=tk.LEFT, padx=5)
+        self.run_button = ttk.Button(action_buttons_frame, text="Run De-obfuscator",
+                                     command=self.action_deobfuscate_code)
+        self.run_button.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(action_buttons_frame, text="Cancel", command=self.action_cancel,
+                                        state="disabled")
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
         ttk.Button(action_buttons_frame, text="Clear All", command=self.action_clear_all).pack(side=tk.LEFT, padx=5)
+        self.status_label = ttk.Label(action_buttons_frame, text="")
+        self.status_label.pack(side=tk.LEFT, padx=10)
 
     def _update_output_area(self, content, is_error=False):
-        """Updates the output text area with new content."""
-        self.output_text_area.config(state="normal", bg="white")
-        self.output_text_area.delete("1.0", tk.END)
-        self.output_text_area.insert(tk.END, content)
-        self.output_text_area.config(state="disabled", bg="#f0f0f0" if not is_error else "#ffe0e0")
+        """Updates the output text area with new content, loading long content chunk by chunk."""
+        self.output_view.set_content(content, "#f0f0f0" if not is_error else "#ffe0e0")
 
     def _generate_comparison_report(self, original_path, cleaned_path):
         """Generates a performance and file size comparison report."""
@@ -160,49 +167,51 @@ class DeobfuscatorGUI:
             report.append("\nError: Could not find one of the files for size comparison.")
 
         # 2. Compare Performance (Execution Time)
-        report.append("\n--- Execution Time Comparison (with GCC) ---")
+        report.append("\n--- Execution Time Comparison (with system C compiler) ---")
 
         def compile_and_run(file_path):
             exe_path = os.path.splitext(file_path)[0]
-            gcc_path = r'C:\mingw64\bin\gcc.exe'
+            if exe_path == file_path: exe_path += "_bin"
+            compiler = find_c_compiler()
+            if compiler is None:
+                return None, "No C compiler found (tried $CC, gcc and cc). Please install one to run this benchmark."
             try:
-                # Check if the gcc executable exists at the specified path
-                if not os.path.exists(gcc_path) and gcc_path != 'gcc':
-                    return None, f"GCC executable not found at: {gcc_path}"
-
-                # Compile the file, explicitly treating it as C code
-                subprocess.run([gcc_path, '-x', 'c', file_path, '-o', exe_path], check=True, capture_output=True,
-                               text=True)
-
-                # Run the executable and measure time
-                start_time = time.time()
-                result = subprocess.run([exe_path], check=True, capture_output=True, text=True)
-                end_time = time.time()
-
+                _, error = compile_source(compiler, file_path, exe_path)
+                if error: return None, error
+                result = run_binary(exe_path, REPORT_RUNS)
+                if result["error"]: return None, result["error"]
+                return statistics.median(result["times"]), result["stdout"].strip()
+            finally:
                 # Clean up the executable
-                os.remove(exe_path)
-
-                return end_time - start_time, result.stdout.strip()
-            except FileNotFoundError:
-                return None, "GCC compiler not found. Please install it to run this benchmark."
-            except subprocess.CalledProcessError as e:
-                return None, f"Compilation/Execution failed: {e.stderr}"
+                if os.path.exists(exe_path): os.remove(exe_path)
 
         orig_time, orig_output = compile_and_run(original_path)
         clean_time, clean_output = compile_and_run(cleaned_path)
 
         if orig_time is not None and clean_time is not None:
-            report.append(f"Original Code Runtime: {orig_time:.6f} seconds")
-            report.append(f"De-obfuscated Code Runtime: {clean_time:.6f} seconds")
+            report.append(f"Original Code Runtime: {orig_time:.6f} seconds (median of {REPORT_RUNS} runs)")
+            report.append(f"De-obfuscated Code Runtime: {clean_time:.6f} seconds (median of {REPORT_RUNS} runs)")
             report.append(f"\nOriginal Output:\n{orig_output}")
             report.append(f"\nDe-obfuscated Output:\n{clean_output}")
         else:
             report.append(orig_output if orig_output else clean_output)
 
-        # 3. Save the report to a file
-        report_path = os.path.join(os.path.dirname(cleaned_path), "deobfuscation_report.txt")
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write("\n".join(report))
+        # 3. Compare behaviour in-process, which works without a C compiler
+        report.append("\n--- Behaviour Check (Mini-C interpreter) ---")
+        try:
+            asts = []
+            for path in (original_path, cleaned_path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    asts.append(parse_processed_code(preprocess_code(f.read())))
+            comparison = compare_programs(*asts)
+            report.append(f"Output and return value match: {'Yes' if comparison['equivalent'] else 'No'}")
+            if not comparison["equivalent"]:
+                for label, key in (("Original", "original"), ("De-obfuscated", "transformed")):
+                    result = comparison[key]
+                    report.append(f"{label}: returned {result['return_value']}, error: {result['error'] or 'none'}, "
+                                  f"output:\n{result['output']}")
+        except (OSError, SyntaxError, ValueError, InterpreterError) as e:
+            report.append(f"Could not run the programs in the interpreter: {e}")
 
         return "\n".join(report)
 
@@ -245,63 +254,127 @@ class DeobfuscatorGUI:
             self.output_entry.delete(0, tk.END)
             self.output_entry.insert(0, filepath.replace("\\", "/"))
 
+    def action_select_rename_map(self):
+        """Lets the user pick the obfuscator's rename map, used instead of heuristic name restoration."""
+        filepath = filedialog.askopenfilename(title="Select Rename Map",
+                                              filetypes=[("Rename Maps", "*.json"), ("All Files", "*.*")])
+        if filepath:
+            self.rename_map_entry.delete(0, tk.END)
+            self.rename_map_entry.insert(0, filepath.replace("\\", "/"))
+
     def action_deobfuscate_code(self):
-        """Executes the de-obfuscation process on the input code."""
+        """Starts the de-obfuscation on a worker thread; progress and results come back via `root.after`."""
+        if self.job is not None: return
         input_code = self.input_text_area.get("1.0", tk.END).strip()
         output_fpath = self.output_entry.get().strip()
-        error_msgs_antlr = []
         if not input_code:
-            self._update_output_area("Error: Input code is empty.", True);
+            self._update_output_area("Error: Input code is empty.", True)
             return
         if not output_fpath:
-            self._update_output_area("Error: Output file path not set.", True);
+            self._update_output_area("Error: Output file path not set.", True)
             return
 
-        self.root.config(cursor="watch");
-        self.root.update_idletasks()
-        processed_code = ""
-        try:
-            processed_code = preprocess_code(input_code)
-            if not processed_code.strip():
-                raise ValueError("Code is empty after preprocessing.")
-            lexer = MiniCLexer(InputStream(processed_code))
-            lexer.removeErrorListeners();
-            err_listener = MiniCErrorListener(error_msgs_antlr);
-            lexer.addErrorListener(err_listener)
-            parser = MiniCParser(CommonTokenStream(lexer))
-            parser.removeErrorListeners();
-            parser.addErrorListener(err_listener)
-            parse_tree = parser.program()
-            if error_msgs_antlr:
-                raise SyntaxError("Parsing failed:\n" + "\n".join(error_msgs_antlr))
-            custom_ast = ASTBuilderVisitor().visit(parse_tree)
-            if custom_ast is None:
-                raise ValueError("AST construction failed.")
-
-            for key, (_, _, deobf_func) in self.techniques_map.items():
-                if self.deobf_options[key].get():
-                    custom_ast = deobf_func(custom_ast)
-            deobfuscated_c_code = CCodeGenerator().visit(custom_ast)
-
-            out_dir = os.path.dirname(output_fpath)
-            if out_dir and not os.path.exists(out_dir): os.makedirs(out_dir)
-            with open(output_fpath, 'w', encoding='utf-8') as f:
+        # Widgets and Tk variables are read here; the worker thread only gets plain values.
+        settings = {
+            "techniques": {key for key in self.techniques_map if self.deobf_options[key].get()},
+            "rename_map_path": self.rename_map_entry.get().strip(),
+            "performance_report": self.performance_option.get(),
+            "skip_preview": self.skip_preview_option.get(),
+            "original_path": self.current_input_filepath,
+        }
+        state = {"processed_code": "", "error_msgs": []}
+        self._set_running(True)
+        self.job = PipelineJob(lambda job: self._run_deobfuscation(input_code, output_fpath, settings, state, job))
+        self.job.start(self.root, self._show_progress, self._on_deobfuscation_done,
+                       lambda e, _traceback_text: self._on_deobfuscation_error(state, e), self._on_cancelled)
+
+    def _run_deobfuscation(self, input_code, output_fpath, settings, state, job):
+        """The de-obfuscation pipeline, run on the worker thread. Must not touch any widget."""
+        job.stage("Preprocessing")
+        state["processed_code"] = processed_code = preprocess_code(input_code)
+        if not processed_code.strip():
+            raise ValueError("Code is empty after preprocessing.")
+        job.stage("Parsing")
+        custom_ast = parse_processed_code(processed_code, state["error_msgs"])
+
+        techniques = settings["techniques"]
+        if "name_restoration" in techniques:
+            job.stage("Restoring names")
+            if settings["rename_map_path"]:
+                custom_ast = apply_rename_map(custom_ast, RenameMap.load(settings["rename_map_path"]))
+            else:
+                custom_ast = apply_semantic_renaming(custom_ast)
+        cleanup_passes = {key: pass_func for key, pass_func in CLEANUP_PASSES.items() if key in techniques}
+        custom_ast, fixpoint_stats = run_until_fixpoint(
+            custom_ast, cleanup_passes, on_pass=lambda round_, name: job.stage(f"Cleanup round {round_}: {name}"))
+
+        job.stage("Generating code")
+        deobfuscated_c_code = CCodeGenerator().visit(custom_ast)
+        out_dir = os.path.dirname(output_fpath)
+        if out_dir and not os.path.exists(out_dir): os.makedirs(out_dir)
+        report_content = None
+        if settings["performance_report"]:
+            job.stage("Generating performance report")
+            # The report compiles and runs the code from a file, so it gets a temporary copy: the
+            # output is only written after the last point where the run can still be cancelled.
+            base, ext = os.path.splitext(output_fpath)
+            report_input = f"{base}.report{ext}"
+            with open(report_input, 'w', encoding='utf-8') as f:
                 f.write(deobfuscated_c_code)
-
-            final_message = f"De-obfuscation successful! Saved to: {output_fpath}\n\n--- De-obfuscated Code ---\n{deobfuscated_c_code}"
-            if self.performance_option.get():
-                report_content = self._generate_comparison_report(self.current_input_filepath, output_fpath)
-                final_message += f"\n\n{report_content}"
-            self._update_output_area(final_message)
-
-        except Exception as e:
-            err_detail = f"Error: {e}\n"
-            if processed_code: err_detail += f"\nProcessed code before error:\n---\n{processed_code}\n---\n"
-            if error_msgs_antlr: err_detail += "\nANTLR Parse Errors:\n" + "\n".join(error_msgs_antlr) + "\n"
-            self._update_output_area(err_detail, True)
-            print(err_detail, file=sys.stderr)
-        finally:
-            self.root.config(cursor="")
+            try:
+                report_content = self._generate_comparison_report(settings["original_path"], report_input)
+            finally:
+                os.remove(report_input)
+
+        job.stage("Saving")
+        with open(output_fpath, 'w', encoding='utf-8') as f:
+            f.write(deobfuscated_c_code)
+        if report_content is not None:
+            with open(os.path.join(out_dir, "deobfuscation_report.txt"), 'w', encoding='utf-8') as f:
+                f.write(report_content)
+
+        if settings["skip_preview"] or len(deobfuscated_c_code) > PREVIEW_LIMIT_CHARS:
+            preview = preview_skipped_note(deobfuscated_c_code, output_fpath)
+        else:
+            preview = f"--- De-obfuscated Code ---\n{deobfuscated_c_code}"
+        final_message = f"De-obfuscation successful! Saved to: {output_fpath}\n\n{format_fixpoint_stats(fixpoint_stats)}" \
+                        f"\n\n{preview}"
+        if report_content is not None: final_message += f"\n\n{report_content}"
+        return final_message
+
+    def _set_running(self, running):
+        """Enables Cancel while a run is in progress and Run otherwise."""
+        self.run_button.config(state="disabled" if running else "normal")
+        self.cancel_button.config(state="normal" if running else "disabled")
+        if not running: self.job = None
+
+    def _show_progress(self, message):
+        self.status_label.config(text=message)
+
+    def _on_deobfuscation_done(self, message):
+        self._set_running(False)
+        self._show_progress("Done.")
+        self._update_output_area(message)
+
+    def _on_deobfuscation_error(self, state, e):
+        self._set_running(False)
+        self._show_progress("Failed.")
+        err_detail = f"Error: {e}\n"
+        if state["processed_code"]:
+            err_detail += f"\nProcessed code before error:\n---\n{state['processed_code']}\n---\n"
+        if state["error_msgs"]: err_detail += "\nANTLR Parse Errors:\n" + "\n".join(state["error_msgs"]) + "\n"
+        self._update_output_area(err_detail, True)
+        print(err_detail, file=sys.stderr)
+
+    def _on_cancelled(self):
+        self._set_running(False)
+        self._show_progress("Cancelled.")
+
+    def action_cancel(self):
+        """Asks the running job to stop before its next pass."""
+        if self.job is None: return
+        self.job.cancel()
+        self._show_progress("Cancelling after the current pass...")
 
     def action_clear_all(self):
         """Clears all input and output fields in the GUI."""
@@ -309,20 +382,53 @@ class DeobfuscatorGUI:
         self._update_output_area("")
         self.input_entry.delete(0, tk.END)
         self.output_entry.delete(0, tk.END)
+        self.rename_map_entry.delete(0, tk.END)
         self.current_input_filepath, self.current_input_filename = None, "obfuscated.mc"
 
 
+def build_cli_arg_parser():
+    """Builds the argument parser for command-line mode."""
+    arg_parser = argparse.ArgumentParser(prog="deobfuscator_main.py",
+                                         description="Mini-C de-obfuscator (CLI mode).")
+    arg_parser.add_argument("input_file")
+    arg_parser.add_argument("output_file", nargs="?", help="default: <input>_deobf<ext> in the current directory")
+    arg_parser.add_argument("--max-iterations", type=int, default=DEFAULT_MAX_ITERATIONS,
+                            help=f"maximum cleanup rounds (default: {DEFAULT_MAX_ITERATIONS})")
+    arg_parser.add_argument("--rename-map", metavar="PATH", default=None,
+                            help="rename map written by the obfuscator (main.py --rename-map); restores the "
+                                 "original names exactly instead of guessing them")
+    arg_parser.add_argument("--symbolicate", action="store_true",
+                            help="treat input_file as a log (e.g. a crash report) and replace the obfuscated "
+                                 "names in it using --rename-map; prints to stdout without output_file")
+    return arg_parser
+
+
+def run_symbolicate_mode(args):
+    """Rewrites the obfuscated names in a text file with their originals from the rename map."""
+    if not args.rename_map: print("Error: --symbolicate needs --rename-map.", file=sys.stderr); sys.exit(1)
+    try:
+        rename_map = RenameMap.load(args.rename_map)
+        with open(args.input_file, 'r', encoding='utf-8') as f:
+            text = rename_map.symbolicate(f.read())
+        if args.output_file:
+            with open(args.output_file, 'w', encoding='utf-8') as f:
+                f.write(text)
+        else:
+            sys.stdout.write(text)
+    except (OSError, ValueError) as e:
+        print(f"CLI Error (symbolicate): {e}", file=sys.stderr); sys.exit(1)
+
+
 def run_cli_mode():
     """Runs the de-obfuscator in command-line mode."""
-    if not (2 <= len(sys.argv) <= 3):
-        print("Usage: python deobfuscator_main.py <input_file> [output_file]");
-        sys.exit(1)
-    in_f, err_msgs_cli = sys.argv[1], []
+    args = build_cli_arg_parser().parse_args()
+    in_f, err_msgs_cli = args.input_file, []
     if not os.path.exists(in_f):
         print(f"Error: Input file '{in_f}' not found.", file=sys.stderr);
         sys.exit(1)
-    out_f = sys.argv[2] if len(
-        sys.argv) == 3 else f"{os.path.splitext(os.path.basename(in_f))[0]}_deobf{os.path.splitext(in_f)[1] or '.mc'}"
+    if args.symbolicate: run_symbolicate_mode(args); return
+    out_f = args.output_file or \
+        f"{os.path.splitext(os.path.basename(in_f))[0]}_deobf{os.path.splitext(in_f)[1] or '.mc'}"
     processed_cli_code = ""
     try:
         with open(in_f, 'r', encoding='utf-8') as f:
@@ -331,34 +437,21 @@ def run_cli_mode():
         # if not processed_code.strip():
         #     print("Error: Code empty after preprocessing.", file=sys.stderr);
         #     sys.exit(1)
-        lexer = MiniCLexer(InputStream(processed_cli_code));
-        lexer.removeErrorListeners();
-        cli_err_listener = MiniCErrorListener(err_msgs_cli);
-        lexer.addErrorListener(cli_err_listener)
-        parser = MiniCParser(CommonTokenStream(lexer));
-        parser.removeErrorListeners();
-        parser.addErrorListener(cli_err_listener)
-        parse_tree = parser.program()
-        if err_msgs_cli:
+        try:
+            custom_ast = parse_processed_code(processed_cli_code, err_msgs_cli)
+        except SyntaxError:
             print("Parse Errors (CLI):\n" + "\n".join(err_msgs_cli), file=sys.stderr);
             sys.exit(1)
-        custom_ast = ASTBuilderVisitor().visit(parse_tree)
-        if custom_ast is None:
-            print("Error: AST construction failed (CLI).", file=sys.stderr);
-            sys.exit(1)
-        techniques_cli = {
-            "name_restoration": apply_semantic_renaming,
-            "dead_code_removal": apply_dead_code_removal,
-            "expression_simplification": apply_expression_simplification,
-            "control_flow_simplification": apply_flow_reconstruction,
-        }
-        for name, func in techniques_cli.items(): custom_ast = func(custom_ast)
+        if args.rename_map: custom_ast = apply_rename_map(custom_ast, RenameMap.load(args.rename_map))
+        else: custom_ast = apply_semantic_renaming(custom_ast)
+        custom_ast, fixpoint_stats = run_until_fixpoint(custom_ast, max_iterations=args.max_iterations)
         deobfuscated_code = CCodeGenerator().visit(custom_ast)
         out_dir_cli = os.path.dirname(out_f)
         if out_dir_cli and not os.path.exists(out_dir_cli): os.makedirs(out_dir_cli)
         with open(out_f, 'w', encoding='utf-8') as f:
             f.write(deobfuscated_code)
         print(f"De-obfuscation successful (CLI)! Saved to: {out_f}")
+        print(format_fixpoint_stats(fixpoint_stats))
     except Exception as e:
         print(f"CLI Error: {e}", file=sys.stderr)
         if processed_cli_code: print(f"\nProcessed code before error:\n---\n{processed_cli_code}\n---", file=sys.stderr)
@@ -0,0 +1,57 @@
+import tkinter as tk
+
+PREVIEW_CHUNK_LINES = 2000
+# Outputs larger than this (in characters) are saved without being shown at all.
+PREVIEW_LIMIT_CHARS = 2_000_000
+_LOAD_MORE_AT = 0.9
+
+
+class ChunkedTextView:
+    """Shows long read-only text in a Text widget a chunk of lines at a time.
+
+    Tk lays out everything inserted into a Text widget, so one multi-MB insert freezes the
+    window and makes scrolling stutter. Only the first chunk is inserted up front; the next
+    one is appended whenever the view scrolls close to the end of what is loaded.
+    """
+
+    def __init__(self, text_widget, scrollbar, chunk_lines=PREVIEW_CHUNK_LINES):
+        self.text = text_widget
+        self.scrollbar = scrollbar
+        self.chunk_lines = chunk_lines
+        self.lines = []
+        self.shown = 0
+        self.load_pending = False
+        text_widget["yscrollcommand"] = self._on_scroll
+
+    def set_content(self, content, bg):
+        self.lines = content.splitlines(keepends=True)
+        self.shown = 0
+        self.text.config(state="normal", bg="white")
+        self.text.delete("1.0", tk.END)
+        self._append_chunk()
+        self.text.config(state="disabled", bg=bg)
+
+    def _append_chunk(self):
+        chunk = self.lines[self.shown:self.shown + self.chunk_lines]
+        self.shown += len(chunk)
+        self.text.insert(tk.END, "".join(chunk))
+
+    def _load_more(self):
+        self.load_pending = False
+        if self.shown >= len(self.lines): return
+        state = self.text.cget("state")
+        self.text.config(state="normal")
+        self._append_chunk()
+        self.text.config(state=state)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= _LOAD_MORE_AT and self.shown < len(self.lines) and not self.load_pending:
+            # Not from inside the scroll callback: inserting here would re-enter it.
+            self.load_pending = True
+            self.text.after_idle(self._load_more)
+
+
+def preview_skipped_note(code, output_fpath):
+    lines = code.count("\n") + 1
+    return f"--- Preview skipped ---\nThe output has {len(code):,} characters ({lines:,} lines); see {output_fpath}."
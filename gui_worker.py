@@ -0,0 +1,61 @@
+import queue
+import threading
+import traceback
+
+POLL_INTERVAL_MS = 50
+
+
+class PipelineCancelled(Exception):
+    pass
+
+
+class PipelineJob:
+    """Runs `work(job)` on a daemon thread and hands its progress to the Tk thread.
+
+    The work function calls `job.stage(message)` before each step; that posts the message
+    to a queue and raises PipelineCancelled once `cancel()` has been called, so a run stops
+    at the next pass boundary. Tk widgets are only touched from the main thread: `poll`
+    drains the queue via `root.after` and calls `on_progress(message)` for each stage, then
+    exactly one of `on_done(result)`, `on_error(exception, traceback_text)` or `on_cancel()`.
+    """
+
+    def __init__(self, work):
+        self.work = work
+        self.messages = queue.Queue()
+        self.cancel_requested = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self, root, on_progress, on_done, on_error, on_cancel):
+        self.thread.start()
+        root.after(POLL_INTERVAL_MS, self.poll, root, on_progress, on_done, on_error, on_cancel)
+        return self
+
+    def cancel(self):
+        self.cancel_requested.set()
+
+    def stage(self, message):
+        if self.cancel_requested.is_set(): raise PipelineCancelled()
+        self.messages.put(("progress", message))
+
+    def _run(self):
+        try:
+            self.messages.put(("done", self.work(self)))
+        except PipelineCancelled:
+            self.messages.put(("cancelled", None))
+        except Exception as e:
+            self.messages.put(("error", (e, traceback.format_exc())))
+
+    def poll(self, root, on_progress, on_done, on_error, on_cancel):
+        while True:
+            try:
+                kind, payload = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                on_progress(payload)
+                continue
+            if kind == "done": on_done(payload)
+            elif kind == "error": on_error(*payload)
+            else: on_cancel()
+            return
+        root.after(POLL_INTERVAL_MS, self.poll, root, on_progress, on_done, on_error, on_cancel)
@@ -1,35 +1,31 @@
 import tkinter as tk
 from tkinter import filedialog, ttk
+import argparse
+import functools
 import os
 import sys
 
 
-from antlr4 import CommonTokenStream, InputStream
-from antlr4.error.ErrorListener import ErrorListener
-
-from grammer.MiniCLexer import MiniCLexer
-from grammer.MiniCParser import MiniCParser
-
-
+from pipeline import parse_processed_code, rename_source, obfuscate_variants
+from gui_worker import PipelineJob
+from project import obfuscate_project, format_project_report, MANIFEST_NAME
+from sharding import parse_shard_spec, merge_shard_manifests, format_merge_report
+from gui_text import ChunkedTextView, PREVIEW_LIMIT_CHARS, preview_skipped_note
 from obfuscations.preprocessor import preprocess_code
-from obfuscations.ast_nodes import ProgramNode
-from obfuscations.ast_builder_visitor import ASTBuilderVisitor
 from obfuscations.c_generator_visitor import CCodeGenerator
 
 from obfuscations.rename_obfuscator import apply_renaming
-from obfuscations.dead_code_obfuscator import apply_dead_code_insertion
+from obfuscations.dead_code_obfuscator import apply_dead_code_insertion, DEFAULT_DEAD_CODE_RATE
 from obfuscations.equivalent_expr_obfuscator import apply_equivalent_expression
 from obfuscations.dummy_function_obfuscator import apply_dummy_function_insertion
-from obfuscations.opaque_predicate_obfuscator import apply_opaque_predicates
-
-
-class MiniCErrorListener(ErrorListener):
-    def __init__(self, error_messages_list):
-        super().__init__()
-        self.error_messages = error_messages_list
-
-    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
-        self.error_messages.append(f"ERROR - Line {line}:{column} : {msg}")
+from obfuscations.opaque_predicate_obfuscator import apply_opaque_predicates, DEFAULT_OPAQUE_PREDICATE_RATE
+from obfuscations.insertion_policy import InsertionPolicy
+from obfuscations.execution_profile import ExecutionProfile, DEFAULT_HOT_FRACTION
+from obfuscations.overhead_estimator import estimate_overhead, format_overhead_report
+from obfuscations.streaming import obfuscate_stream
+from obfuscations.minifier import minify_ast, format_minify_report
+from obfuscations.rename_map import RenameMap
+from obfuscations.source_map import generate_with_source_map
 
 
 class ObfuscatorGUI:
@@ -38,6 +34,7 @@ class ObfuscatorGUI:
         self.root.title("Mini-C Obfuscator")
         self.current_input_filepath = None
         self.current_input_filename = "input.mc"
+        self.job = None
 
         style = ttk.Style()
         try:
@@ -82,6 +79,9 @@ class ObfuscatorGUI:
             self.obf_options[key] = tk.BooleanVar(value=default_val)
             ttk.Checkbutton(options_frame, text=text, variable=self.obf_options[key]).grid(row=i, column=0, sticky="w",
                                                                                            padx=5, pady=2)
+        self.skip_preview_option = tk.BooleanVar(value=False)
+        ttk.Checkbutton(options_frame, text="Save Without Preview", variable=self.skip_preview_option).grid(
+            row=len(self.techniques_map), column=0, sticky="w", padx=5, pady=2)
 
         text_areas_frame = ttk.Frame(main_app_frame)
         text_areas_frame.pack(fill=tk.BOTH, expand=True)
@@ -108,21 +108,23 @@ class ObfuscatorGUI:
                                         state="disabled", bg="#f0f0f0")
         self.output_text_scrollbar = ttk.Scrollbar(output_text_frame, orient="vertical",
                                                    command=self.output_text_area.yview);
-        self.output_text_area["yscrollcommand"] = self.output_text_scrollbar.set
+        self.output_view = ChunkedTextView(self.output_text_area, self.output_text_scrollbar)
         self.output_text_scrollbar.grid(row=0, column=1, sticky="ns");
         self.output_text_area.grid(row=0, column=0, sticky="nsew")
 
         action_buttons_frame = ttk.Frame(main_app_frame, padding="10 0 0 0")
         action_buttons_frame.pack(fill=tk.X)
-        ttk.Button(action_buttons_frame, text="Run Obfuscator", command=self.action_obfuscate_code).pack(side=tk.LEFT,
-                                                                                                         padx=5)
+        self.run_button = ttk.Button(action_buttons_frame, text="Run Obfuscator", command=self.action_obfuscate_code)
+        self.run_button.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(action_buttons_frame, text="Cancel", command=self.action_cancel,
+                                        state="disabled")
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
         ttk.Button(action_buttons_frame, text="Clear All", command=self.action_clear_all).pack(side=tk.LEFT, padx=5)
+        self.status_label = ttk.Label(action_buttons_frame, text="")
+        self.status_label.pack(side=tk.LEFT, padx=10)
 
     def _update_output_area(self, content, is_error=False):
-        self.output_text_area.config(state="normal", bg="white")
-        self.output_text_area.delete("1.0", tk.END)
-        self.output_text_area.insert(tk.END, content)
-        self.output_text_area.config(state="disabled", bg="#f0f0f0" if not is_error else "#ffe0e0")
+        self.output_view.set_content(content, "#f0f0f0" if not is_error else "#ffe0e0")
 
     def action_load_file(self):
         filepath = filedialog.askopenfilename(title="Select Mini-C File",
@@ -160,107 +162,340 @@ class ObfuscatorGUI:
         if filepath: self.output_entry.delete(0, tk.END); self.output_entry.insert(0, filepath.replace("\\", "/"))
 
     def action_obfuscate_code(self):
+        if self.job is not None: return
         input_code = self.input_text_area.get("1.0", tk.END).strip()
         output_fpath = self.output_entry.get().strip()
-        error_msgs_antlr = []
 
         if not input_code: self._update_output_area("Error: Input code is empty.", True); return
         if not output_fpath: self._update_output_area("Error: Output file path not set.", True); return
 
-        self.root.config(cursor="watch");
-        self.root.update_idletasks()
-        processed_code = ""
-        try:
-            processed_code = preprocess_code(input_code)
-            if not processed_code.strip(): raise ValueError("Code is empty after preprocessing.")
+        # Widgets and Tk variables are read here; the worker thread only gets plain values.
+        selected = [(label, obf_func) for key, (label, _, obf_func) in self.techniques_map.items()
+                    if self.obf_options[key].get()]
+        skip_preview = self.skip_preview_option.get()
+        state = {"processed_code": "", "error_msgs": []}
+        self._set_running(True)
+        self.job = PipelineJob(functools.partial(self._run_obfuscation, input_code, output_fpath, selected,
+                                                 skip_preview, state))
+        self.job.start(self.root, self._show_progress, self._on_obfuscation_done,
+                       functools.partial(self._on_obfuscation_error, state), self._on_cancelled)
+
+    def _run_obfuscation(self, input_code, output_fpath, selected, skip_preview, state, job):
+        """The pipeline, run on the worker thread. Must not touch any widget."""
+        total = len(selected) + 3
+        job.stage(f"[1/{total}] Preprocessing")
+        state["processed_code"] = processed_code = preprocess_code(input_code)
+        if not processed_code.strip(): raise ValueError("Code is empty after preprocessing.")
+        job.stage(f"[2/{total}] Parsing")
+        custom_ast = parse_processed_code(processed_code, state["error_msgs"])
+
+        for step, (label, obf_func) in enumerate(selected, 3):
+            job.stage(f"[{step}/{total}] {label}")
+            custom_ast = obf_func(custom_ast)
+
+        job.stage(f"[{total}/{total}] Generating and saving code")
+        obfuscated_c_code = CCodeGenerator().visit(custom_ast)
+        out_dir = os.path.dirname(output_fpath)
+        if out_dir and not os.path.exists(out_dir): os.makedirs(out_dir)
+        with open(output_fpath, 'w', encoding='utf-8') as f:
+            f.write(obfuscated_c_code)
+
+        display_path = output_fpath.replace("\\", "/")
+        overhead_report = format_overhead_report(estimate_overhead(custom_ast))
+        if skip_preview or len(obfuscated_c_code) > PREVIEW_LIMIT_CHARS:
+            preview = preview_skipped_note(obfuscated_c_code, display_path)
+        else:
+            preview = f"--- Obfuscated Code ---\n{obfuscated_c_code}"
+        return f"Obfuscation successful! Saved to: {display_path}\n\n{overhead_report}\n\n{preview}"
+
+    def _set_running(self, running):
+        self.run_button.config(state="disabled" if running else "normal")
+        self.cancel_button.config(state="normal" if running else "disabled")
+        if not running: self.job = None
+
+    def _show_progress(self, message):
+        self.status_label.config(text=message)
+
+    def _on_obfuscation_done(self, message):
+        self._set_running(False)
+        self._show_progress("Done.")
+        self._update_output_area(message)
+
+    def _on_obfuscation_error(self, state, e, _traceback_text):
+        self._set_running(False)
+        self._show_progress("Failed.")
+        err_detail = f"Error: {e}\n"
+        if state["processed_code"]:
+            err_detail += f"\nProcessed code before error:\n---\n{state['processed_code']}\n---\n"
+        if state["error_msgs"]: err_detail += "\nANTLR Parse Errors:\n" + "\n".join(state["error_msgs"]) + "\n"
+        self._update_output_area(err_detail, True)
+        print(err_detail, file=sys.stderr)
+
+    def _on_cancelled(self):
+        self._set_running(False)
+        self._show_progress("Cancelled.")
+
+    def action_cancel(self):
+        if self.job is None: return
+        self.job.cancel()
+        self._show_progress("Cancelling after the current pass...")
 
-            lexer = MiniCLexer(InputStream(processed_code))
-            lexer.removeErrorListeners();
-            err_listener = MiniCErrorListener(error_msgs_antlr);
-            lexer.addErrorListener(err_listener)
-            parser = MiniCParser(CommonTokenStream(lexer))
-            parser.removeErrorListeners();
-            parser.addErrorListener(err_listener)
-            parse_tree = parser.program()
+    def action_clear_all(self):
+        self.input_text_area.delete("1.0", tk.END)
+        self._update_output_area("")
+        self.input_entry.delete(0, tk.END);
+        self.output_entry.delete(0, tk.END)
+        self.current_input_filepath, self.current_input_filename = None, "input.mc"
 
-            if error_msgs_antlr: raise SyntaxError("Parsing failed:\n" + "\n".join(error_msgs_antlr))
 
-            custom_ast = ASTBuilderVisitor().visit(parse_tree)
-            if custom_ast is None or not isinstance(custom_ast, ProgramNode): raise ValueError(
-                "AST construction failed.")
+def build_cli_arg_parser():
+    arg_parser = argparse.ArgumentParser(prog="main.py", description="Mini-C obfuscator (CLI mode).")
+    arg_parser.add_argument("input_file")
+    arg_parser.add_argument("output_file", nargs="?", help="default: <input>_obf<ext> in the current directory")
+    arg_parser.add_argument("--stream", action="store_true",
+                            help="parse, obfuscate and write one top-level declaration at a time "
+                                 "(bounded memory for very large inputs)")
+    arg_parser.add_argument("--rename-only", action="store_true",
+                            help="only rename identifiers, rewriting them in place in the token stream "
+                                 "(keeps all other formatting and comments)")
+    arg_parser.add_argument("--minify", action="store_true",
+                            help="give the most referenced symbols the shortest names and write "
+                                 "whitespace-minimal code")
+    arg_parser.add_argument("--variants", type=int, metavar="N", default=None,
+                            help="parse once and write N differently seeded variants (seeds 1..N) as "
+                                 "<output>_v<seed><ext>")
+    arg_parser.add_argument("--project", action="store_true",
+                            help="input_file and output_file are directories: obfuscate every .mc/.c file in "
+                                 "the tree, renaming shared functions and globals the same way in every file")
+    arg_parser.add_argument("--seed", type=int, default=None,
+                            help="random seed for --project runs (0 when omitted): it seeds the global rename "
+                                 "table and, xor-ed with a hash of the path, each file's passes, so project "
+                                 "runs are reproducible")
+    arg_parser.add_argument("--manifest", metavar="PATH", default=None,
+                            help="checkpoint manifest of a --project run (default: .minic-checkpoint.jsonl in "
+                                 "the output directory)")
+    arg_parser.add_argument("--resume", action="store_true",
+                            help="continue a --project run from its manifest, skipping files whose input and "
+                                 "settings are unchanged since they were last written")
+    arg_parser.add_argument("--shard", metavar="I/N", default=None,
+                            help="only write the files of shard I of N of a --project run (files are spread by "
+                                 "size and path hash; every shard computes the same split) into a per-shard "
+                                 "manifest")
+    arg_parser.add_argument("--merge-shards", action="store_true",
+                            help="input_file is the output directory of a sharded --project run: merge the "
+                                 "shard manifests into its project manifest and report per-pass timings")
+    arg_parser.add_argument("--jobs", type=int, default=None,
+                            help="worker processes for --variants and --project (default: one per CPU)")
+    arg_parser.add_argument("--rename-map", metavar="PATH", default=None,
+                            help="write the renames made (original name, function and scope per obfuscated "
+                                 "name) as JSON, for exact de-obfuscation and crash-log symbolication")
+    arg_parser.add_argument("--source-map", metavar="PATH", default=None,
+                            help="write a v3-style source map from output positions to original lines and "
+                                 "columns (inserted code maps to nothing)")
+    arg_parser.add_argument("--check-rewrites", action="store_true",
+                            help="debug: check every equivalent-expression rewrite on random int32 inputs "
+                                 "and stop at the first one that changes the value (needs NumPy)")
+    dummy_group = arg_parser.add_argument_group("dummy functions")
+    dummy_group.add_argument("--dummy-functions", type=int, metavar="N", default=1,
+                             help="number of dummy functions to inject (default: 1)")
+    dummy_group.add_argument("--decoy-calls", type=float, metavar="RATE", default=0.0,
+                             help="chance that a dummy function calls an earlier dummy (default: 0)")
+    policy_group = arg_parser.add_argument_group("dead code / opaque predicate insertion")
+    policy_group.add_argument("--loop-rates", metavar="F0,F1,...", default=None,
+                              help="insertion-rate factors per loop depth relative to the normal rate, "
+                                   "the last one applying to deeper loops (e.g. 1,0.25,0)")
+    policy_group.add_argument("--hoist-from-loops", action="store_true",
+                              help="place insertions that fire inside loops before the outermost loop instead")
+    policy_group.add_argument("--only-functions", metavar="NAMES", default=None,
+                              help="comma-separated functions that may receive insertions")
+    policy_group.add_argument("--skip-functions", metavar="NAMES", default=None,
+                              help="comma-separated functions that never receive insertions")
+    profile_group = arg_parser.add_argument_group("profile-guided obfuscation")
+    profile_group.add_argument("--profile", metavar="PATH", default=None,
+                               help="execution counts (lines '<function> <count>' or '<line> <count>', or a gcov "
+                                    ".gcov report): hot code gets little or no dead code, opaque predicates and "
+                                    "expression rewrites, code that never ran gets more")
+    profile_group.add_argument("--hot-fraction", type=float, default=DEFAULT_HOT_FRACTION,
+                               help="counts at or above this fraction of the largest count get no runtime-affecting "
+                                    f"insertions (default: {DEFAULT_HOT_FRACTION})")
+    return arg_parser
+
+
+def _split_names(value):
+    return [n.strip() for n in value.split(',') if n.strip()] if value else None
+
+
+def build_insertion_policy(base_rate, args, profile=None):
+    factors = [float(f) for f in args.loop_rates.split(',')] if args.loop_rates else [1.0]
+    return InsertionPolicy(base_rate, hoist_from_loops=args.hoist_from_loops,
+                           allow_functions=_split_names(args.only_functions),
+                           deny_functions=_split_names(args.skip_functions), profile=profile).scaled(factors)
+
+
+def build_cli_techniques(args, rename_map=None, profile=None):
+    dead_code_policy = build_insertion_policy([DEFAULT_DEAD_CODE_RATE], args, profile)
+    opaque_policy = build_insertion_policy([DEFAULT_OPAQUE_PREDICATE_RATE], args, profile)
+    return {
+        "rename": functools.partial(apply_renaming, rename_map=rename_map),
+        "dead_code": functools.partial(apply_dead_code_insertion, policy=dead_code_policy),
+        "equivalent_expression": functools.partial(apply_equivalent_expression, debug=args.check_rewrites,
+                                                   profile=profile),
+        "dummy_function": functools.partial(apply_dummy_function_insertion, num_to_insert=args.dummy_functions,
+                                            decoy_call_rate=args.decoy_calls),
+        "opaque_predicate": functools.partial(apply_opaque_predicates, policy=opaque_policy),
+    }
+
+
+def run_stream_mode(in_f, out_f, techniques_cli, args):
+    try:
+        out_dir_cli = os.path.dirname(out_f)
+        if out_dir_cli and not os.path.exists(out_dir_cli): os.makedirs(out_dir_cli)
+        stats = obfuscate_stream(in_f, out_f, parse_processed_code, techniques_cli,
+                                 num_dummy_functions=args.dummy_functions, decoy_call_rate=args.decoy_calls)
+    except Exception as e:
+        print(f"CLI Error (streaming): {e}", file=sys.stderr); sys.exit(1)
+    print(f"Obfuscation successful (CLI, streaming)! Saved to: {out_f}")
+    print(f"{stats['declarations']} declarations, {stats['dummy_functions']} dummy functions, "
+          f"largest declaration {stats['largest_declaration']} characters")
 
-            for key, (_, _, obf_func) in self.techniques_map.items():
-                if self.obf_options[key].get(): custom_ast = obf_func(custom_ast)
 
-            obfuscated_c_code = CCodeGenerator().visit(custom_ast)
+def run_rename_only_mode(in_f, out_f):
+    err_msgs_cli = []
+    try:
+        with open(in_f, 'r', encoding='utf-8') as f:
+            renamed_code = rename_source(f.read(), error_msgs=err_msgs_cli)
+        out_dir_cli = os.path.dirname(out_f)
+        if out_dir_cli and not os.path.exists(out_dir_cli): os.makedirs(out_dir_cli)
+        with open(out_f, 'w', encoding='utf-8') as f:
+            f.write(renamed_code)
+    except SyntaxError:
+        print("Lexer Errors (CLI):\n" + "\n".join(err_msgs_cli), file=sys.stderr); sys.exit(1)
+    except Exception as e:
+        print(f"CLI Error (rename-only): {e}", file=sys.stderr); sys.exit(1)
+    print(f"Renaming successful (CLI)! Saved to: {out_f}")
 
-            out_dir = os.path.dirname(output_fpath)
-            if out_dir and not os.path.exists(out_dir): os.makedirs(out_dir)
-            with open(output_fpath, 'w', encoding='utf-8') as f:
-                f.write(obfuscated_c_code)
 
-            display_path = output_fpath.replace("\\", "/")
-            self._update_output_area(
-                f"Obfuscation successful! Saved to: {display_path}\n\n--- Obfuscated Code ---\n{obfuscated_c_code}")
-        except Exception as e:
-            err_detail = f"Error: {e}\n"
-            if processed_code: err_detail += f"\nProcessed code before error:\n---\n{processed_code}\n---\n"
-            if error_msgs_antlr: err_detail += "\nANTLR Parse Errors:\n" + "\n".join(error_msgs_antlr) + "\n"
-            self._update_output_area(err_detail, True)
-            print(err_detail, file=sys.stderr)
-        finally:
-            self.root.config(cursor="")
+def run_variants_mode(in_f, out_f, techniques_cli, count, jobs):
+    err_msgs_cli = []
+    out_base, out_ext = os.path.splitext(out_f)
+    try:
+        with open(in_f, 'r', encoding='utf-8') as f:
+            processed_cli_code = preprocess_code(f.read())
+        if not processed_cli_code.strip(): print("Error: Code empty after preprocessing.", file=sys.stderr); sys.exit(1)
+        custom_ast = parse_processed_code(processed_cli_code, err_msgs_cli)
+        out_dir_cli = os.path.dirname(out_f)
+        if out_dir_cli and not os.path.exists(out_dir_cli): os.makedirs(out_dir_cli)
+        for seed, variant_code in obfuscate_variants(custom_ast, range(1, count + 1), techniques_cli, jobs):
+            variant_path = f"{out_base}_v{seed}{out_ext or '.mc'}"
+            with open(variant_path, 'w', encoding='utf-8') as f:
+                f.write(variant_code)
+            print(f"Variant {seed}: {variant_path}")
+    except SyntaxError:
+        print("Parse Errors (CLI):\n" + "\n".join(err_msgs_cli), file=sys.stderr); sys.exit(1)
+    except Exception as e:
+        print(f"CLI Error (variants): {e}", file=sys.stderr); sys.exit(1)
+    print(f"Obfuscation successful (CLI)! {count} variants written.")
 
-    def action_clear_all(self):
-        self.input_text_area.delete("1.0", tk.END)
-        self._update_output_area("")
-        self.input_entry.delete(0, tk.END);
-        self.output_entry.delete(0, tk.END)
-        self.current_input_filepath, self.current_input_filename = None, "input.mc"
+
+def run_project_mode(in_dir, out_dir, techniques_cli, args):
+    # Flags that change what the passes produce; outputs made with other values are not reused.
+    options = {name: getattr(args, name) for name in ("dummy_functions", "decoy_calls", "loop_rates", "hoist_from_loops",
+                                                      "only_functions", "skip_functions", "check_rewrites")}
+    try:
+        shard = parse_shard_spec(args.shard) if args.shard else None
+        stats = obfuscate_project(in_dir, out_dir, techniques_cli, seed=args.seed, jobs=args.jobs,
+                                  manifest_path=args.manifest, resume=args.resume, options=options, shard=shard)
+    except (OSError, SyntaxError, ValueError) as e:
+        print(f"CLI Error (project): {e}", file=sys.stderr); sys.exit(1)
+    print(f"Obfuscation {'finished with errors' if stats['failed'] else 'successful'} (CLI, project)! "
+          f"Saved to: {out_dir}")
+    print(format_project_report(stats))
+    if stats["failed"]: sys.exit(1)
+
+
+def run_merge_shards_mode(out_dir, manifest_path):
+    manifest_path = manifest_path or os.path.join(out_dir, MANIFEST_NAME)
+    try:
+        stats = merge_shard_manifests(out_dir, manifest_path)
+    except (OSError, ValueError) as e:
+        print(f"CLI Error (merge): {e}", file=sys.stderr); sys.exit(1)
+    print(format_merge_report(stats, manifest_path))
+    if stats["missing"] or stats["mismatched"] or stats["statuses"].get("failed"): sys.exit(1)
 
 
 def run_cli_mode():
-    if not (2 <= len(sys.argv) <= 3): print("Usage: python Main.py <input_file> [output_file]"); sys.exit(1)
-    in_f, err_msgs_cli = sys.argv[1], []
+    args = build_cli_arg_parser().parse_args()
+    in_f, err_msgs_cli = args.input_file, []
     if not os.path.exists(in_f): print(f"Error: Input file '{in_f}' not found.", file=sys.stderr); sys.exit(1)
 
-    out_f = sys.argv[2] if len(
-        sys.argv) == 3 else f"{os.path.splitext(os.path.basename(in_f))[0]}_obf{os.path.splitext(in_f)[1] or '.mc'}"
+    out_f = args.output_file or \
+        f"{os.path.splitext(os.path.basename(in_f))[0]}_obf{os.path.splitext(in_f)[1] or '.mc'}"
+    if args.rename_map and (args.rename_only or args.stream or args.variants or args.minify):
+        print("Error: --rename-map only works for a single regular (not minified) output.", file=sys.stderr)
+        sys.exit(1)
+    output_modes = [flag for flag, value in (("--stream", args.stream), ("--rename-only", args.rename_only),
+                                             ("--variants", args.variants), ("--minify", args.minify)) if value]
+    if len(output_modes) > 1:
+        print(f"Error: {' and '.join(output_modes)} cannot be combined.", file=sys.stderr); sys.exit(1)
+    if args.source_map and (args.rename_only or args.stream or args.variants or args.minify):
+        print("Error: --source-map only works for a single regular (not minified) output.", file=sys.stderr)
+        sys.exit(1)
+    if args.merge_shards: run_merge_shards_mode(in_f, args.manifest); return
+    if (args.resume or args.manifest or args.shard) and not args.project:
+        print("Error: --resume, --manifest and --shard only apply to --project runs.", file=sys.stderr); sys.exit(1)
+    if args.project and (args.rename_only or args.stream or args.variants or args.minify or args.rename_map
+                         or args.source_map or not args.output_file):
+        print("Error: --project needs an output directory and works with the regular passes only.", file=sys.stderr)
+        sys.exit(1)
+    if args.profile and (args.rename_only or args.stream or args.variants or args.project):
+        print("Error: --profile only works for a single regular output.", file=sys.stderr); sys.exit(1)
+    if args.rename_only: run_rename_only_mode(in_f, out_f); return
+    rename_map = RenameMap() if args.rename_map else None
+    try:
+        profile = ExecutionProfile.load(args.profile, args.hot_fraction) if args.profile else None
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot read profile: {e}", file=sys.stderr); sys.exit(1)
+    techniques_cli = build_cli_techniques(args, rename_map, profile)
+    if args.stream: run_stream_mode(in_f, out_f, techniques_cli, args); return
+    if args.variants: run_variants_mode(in_f, out_f, techniques_cli, args.variants, args.jobs); return
+    if args.project: run_project_mode(in_f, out_f, techniques_cli, args); return
+
     processed_cli_code = ""
     try:
         with open(in_f, 'r', encoding='utf-8') as f:
             code_to_obf = f.read()
-        processed_cli_code = preprocess_code(code_to_obf)
+        line_map = [] if args.source_map or profile else None
+        processed_cli_code = preprocess_code(code_to_obf, line_map)
+        # Profile line counts refer to the original file, coords to the preprocessed text.
+        if profile: profile.line_map = line_map
         if not processed_cli_code.strip(): print("Error: Code empty after preprocessing.", file=sys.stderr); sys.exit(1)
 
-        lexer = MiniCLexer(InputStream(processed_cli_code))
-        lexer.removeErrorListeners();
-        cli_err_listener = MiniCErrorListener(err_msgs_cli);
-        lexer.addErrorListener(cli_err_listener)
-        parser = MiniCParser(CommonTokenStream(lexer))
-        parser.removeErrorListeners();
-        parser.addErrorListener(cli_err_listener)
-        parse_tree = parser.program()
-        if err_msgs_cli: print("Parse Errors (CLI):\n" + "\n".join(err_msgs_cli), file=sys.stderr); sys.exit(1)
-
-        custom_ast = ASTBuilderVisitor().visit(parse_tree)
-        if custom_ast is None or not isinstance(custom_ast, ProgramNode): print("Error: AST construction failed (CLI).",
-                                                                                file=sys.stderr); sys.exit(1)
-
-        techniques_cli = {
-            "rename": apply_renaming, "dead_code": apply_dead_code_insertion,
-            "equivalent_expression": apply_equivalent_expression,
-            "dummy_function": apply_dummy_function_insertion,
-            "opaque_predicate": apply_opaque_predicates,
-        }
+        try:
+            custom_ast = parse_processed_code(processed_cli_code, err_msgs_cli)
+        except SyntaxError:
+            print("Parse Errors (CLI):\n" + "\n".join(err_msgs_cli), file=sys.stderr); sys.exit(1)
+
         for name, func in techniques_cli.items(): custom_ast = func(custom_ast)
 
-        obfuscated_code = CCodeGenerator().visit(custom_ast)
+        minify_stats, source_map = None, None
+        if args.minify: obfuscated_code, minify_stats = minify_ast(custom_ast)
+        elif args.source_map:
+            obfuscated_code, source_map = generate_with_source_map(custom_ast, os.path.basename(out_f),
+                                                                   os.path.basename(in_f), line_map)
+        else: obfuscated_code = CCodeGenerator().visit(custom_ast)
         out_dir_cli = os.path.dirname(out_f)
         if out_dir_cli and not os.path.exists(out_dir_cli): os.makedirs(out_dir_cli)
         with open(out_f, 'w', encoding='utf-8') as f:
             f.write(obfuscated_code)
         print(f"Obfuscation successful (CLI)! Saved to: {out_f.replace("\\", "/")}")
+        if rename_map is not None:
+            rename_map.save(args.rename_map)
+            print(f"Rename map ({len(rename_map)} names) saved to: {args.rename_map}")
+        if source_map is not None:
+            source_map.save(args.source_map)
+            print(f"Source map ({len(source_map.segments)} segments) saved to: {args.source_map}")
+        print(format_overhead_report(estimate_overhead(custom_ast, profile)))
+        if minify_stats: print(format_minify_report(minify_stats))
     except Exception as e:
         print(f"CLI Error: {e}", file=sys.stderr)
         if processed_cli_code: print(f"\nProcessed code before error:\n---\n{processed_cli_code}\n---", file=sys.stderr)
@@ -0,0 +1,44 @@
+from grammer.MiniCListener import MiniCListener
+from grammer.MiniCParser import MiniCParser
+from obfuscations.ast_builder_visitor import ASTBuilderVisitor, get_coord
+from obfuscations.ast_nodes import ProgramNode
+
+
+class StreamingASTBuilderListener(MiniCListener):
+    """Parse listener that converts every top-level declaration into AST nodes as soon as the
+    parser exits it, then detaches its parse tree from the program context.
+
+    Only the parse tree of the declaration currently being parsed is ever alive, instead of
+    the whole program's tree plus the AST built from it.
+    """
+
+    def __init__(self, parser: MiniCParser):
+        self.parser = parser
+        self.declarations = []
+        self.converter = ASTBuilderVisitor()
+
+    def exitExternalDeclaration(self, ctx: MiniCParser.ExternalDeclarationContext):
+        # Once a syntax error was reported the parse fails anyway; converting the partial
+        # trees error recovery leaves behind would only mask the real error.
+        if self.parser.getNumberOfSyntaxErrors() == 0:
+            visited_decl = self.converter.visit(ctx)
+            if isinstance(visited_decl, list):
+                self.declarations.extend(d for d in visited_decl if d is not None)
+            elif visited_decl:
+                self.declarations.append(visited_decl)
+
+        parent = ctx.parentCtx
+        if parent is not None and parent.children and parent.children[-1] is ctx:
+            parent.removeLastChild()
+        ctx.children = None
+
+
+def build_ast_while_parsing(parser: MiniCParser):
+    """Parses a whole program with `parser`, building the ProgramNode during the parse."""
+    listener = StreamingASTBuilderListener(parser)
+    parser.addParseListener(listener)
+    try:
+        program_ctx = parser.program()
+    finally:
+        parser.removeParseListener(listener)
+    return ProgramNode(declarations=listener.declarations, coord=get_coord(program_ctx))
@@ -1,8 +1,24 @@
+import itertools
+
+_generations = itertools.count(1)
+
+
+def mark_changed(*nodes):
+    """Stamps nodes (typically the FuncDefNode/CompoundStatementNode a pass mutated) with a fresh
+    generation, so analyses caching per-node results know to recompute them."""
+    generation = next(_generations)
+    for node in nodes:
+        if node is not None: node.generation = generation
+
+
 class Node:
+    generation = 0
+
     def __init__(self, coord=None):
         self.coord = coord
     def __repr__(self):
-        attrs = [f"{k}={v!r}" for k, v in self.__dict__.items() if not k.startswith('_') and k != 'coord']
+        attrs = [f"{k}={v!r}" for k, v in self.__dict__.items()
+                 if not k.startswith('_') and k not in ('coord', 'generation')]
         return f"{self.__class__.__name__}({', '.join(attrs)})"
 
 class ProgramNode(Node):
@@ -15,6 +31,7 @@ class FuncDefNode(Node):
         super().__init__(coord)
         self.return_type = return_type
         self.name = name
+        self.original_name = name
         self.params = params
         self.body = body
 
@@ -116,4 +133,55 @@ class ForNode(StatementNode):
 class ReturnNode(StatementNode):
     def __init__(self, expr=None, coord=None):
         super().__init__(coord)
-        self.expr = expr
\ No newline at end of file
+        self.expr = expr
+
+
+# Child fields per node class, in source order.
+CHILD_FIELDS = {
+    ProgramNode: ('declarations',),
+    FuncDefNode: ('return_type', 'params', 'body'),
+    ParamNode: ('type_node',),
+    VarDeclNode: ('type_node', 'initializer'),
+    TypeNode: (),
+    CompoundStatementNode: ('items',),
+    IdNode: (),
+    ConstantNode: (),
+    StringLiteralNode: (),
+    BinaryOpNode: ('left', 'right'),
+    UnaryOpNode: ('expr',),
+    FuncCallNode: ('name_expr', 'args'),
+    AssignmentNode: ('lvalue', 'rvalue'),
+    ExprStatementNode: ('expr',),
+    IfNode: ('cond', 'if_true_body', 'if_false_body'),
+    WhileNode: ('cond', 'body'),
+    ForNode: ('init', 'cond', 'update', 'body'),
+    ReturnNode: ('expr',),
+}
+
+
+def clone_ast(node):
+    """Structural copy of an AST, several times faster than copy.deepcopy.
+
+    Only the child fields listed in CHILD_FIELDS are copied recursively; leaf values (names,
+    coords) are immutable and shared. Private `_` attributes of the ProgramNode (where analysis
+    caches such as `_usage_cache` live) are left behind; those of other nodes are copied as
+    they are. Nodes shared within the tree (e.g. one TypeNode for `int a, b;`) become separate
+    copies.
+    """
+    cls = node.__class__
+    attrs = node.__dict__.copy()
+    child_fields = CHILD_FIELDS.get(cls)
+    if child_fields is None:  # node class without a table entry: copy every Node/list attribute
+        child_fields = tuple(k for k, v in attrs.items() if isinstance(v, (Node, list)))
+    for field in child_fields:
+        value = attrs.get(field)
+        if value is None: continue
+        if value.__class__ is list:
+            attrs[field] = [clone_ast(item) if isinstance(item, Node) else item for item in value]
+        else:
+            attrs[field] = clone_ast(value)
+    if cls is ProgramNode:
+        for key in [k for k in attrs if k.startswith('_')]: del attrs[key]
+    copy = object.__new__(cls)
+    copy.__dict__ = attrs
+    return copy
@@ -4,11 +4,46 @@ from obfuscations.ast_nodes import (
     AssignmentNode, ExprStatementNode, IfNode, WhileNode, ForNode, ReturnNode, Node
 )
 
+# Binding strength of Mini-C expressions, loosest first; all binary operators are left-associative.
+ASSIGNMENT_PRECEDENCE = 1
+BINARY_PRECEDENCE = {
+    '||': 2,
+    '&&': 3,
+    '==': 4, '!=': 4,
+    '<': 5, '>': 5, '<=': 5, '>=': 5,
+    '+': 6, '-': 6,
+    '*': 7, '/': 7, '%': 7,
+}
+UNARY_PRECEDENCE = 8
+POSTFIX_PRECEDENCE = 9
+
+
+def expression_precedence(node):
+    if isinstance(node, AssignmentNode): return ASSIGNMENT_PRECEDENCE
+    if isinstance(node, BinaryOpNode): return BINARY_PRECEDENCE.get(node.op, ASSIGNMENT_PRECEDENCE)
+    if isinstance(node, UnaryOpNode): return UNARY_PRECEDENCE
+    if isinstance(node, ConstantNode) and str(node.value).startswith('-'): return UNARY_PRECEDENCE
+    return POSTFIX_PRECEDENCE
+
+
+def binary_operand_precedences(node):
+    """Minimum precedences of the left and right operand of a BinaryOpNode.
+
+    Operators missing from BINARY_PRECEDENCE (e.g. '&', '<<') count as binding loosest, and
+    their operands are parenthesized unless they are unary or primary expressions.
+    """
+    precedence = BINARY_PRECEDENCE.get(node.op)
+    if precedence is None: return UNARY_PRECEDENCE, UNARY_PRECEDENCE
+    # Left-associative: an equal-precedence right operand still needs parentheses (a - (b - c)).
+    return precedence, precedence + 1
+
 
 class CCodeGenerator:
-    def __init__(self):
+    def __init__(self, minimal_parens=True):
         self.indent_level = 0
         self.is_global_scope = True
+        # When False every binary expression is parenthesized, as older versions did.
+        self.minimal_parens = minimal_parens
 
     def _indent(self):
         return "    " * self.indent_level
@@ -72,20 +107,33 @@ class CCodeGenerator:
         code += self._indent() + "}"
         return code
 
+    def _operand(self, node, min_precedence):
+        """Code for `node` used where an expression binding at least `min_precedence` is required."""
+        code = self.visit(node)
+        return f"({code})" if expression_precedence(node) < min_precedence else code
+
     def visit_BinaryOpNode(self, node: BinaryOpNode):
-        return f"({self.visit(node.left)} {node.op} {self.visit(node.right)})"
+        if not self.minimal_parens: return f"({self.visit(node.left)} {node.op} {self.visit(node.right)})"
+        left, right = binary_operand_precedences(node)
+        return f"{self._operand(node.left, left)} {node.op} {self._operand(node.right, right)}"
 
     def visit_UnaryOpNode(self, node: UnaryOpNode):
-        expr_code = self.visit(node.expr)
-        if isinstance(node.expr, BinaryOpNode): expr_code = f"({expr_code})"
+        if self.minimal_parens:
+            expr_code = self._operand(node.expr, UNARY_PRECEDENCE)
+        else:
+            expr_code = self.visit(node.expr)
+            if isinstance(node.expr, BinaryOpNode): expr_code = f"({expr_code})"
+        # Keep "- -x" and "& &x" from being read back as "--x" / "&&x".
+        if node.op[-1:] in "+-&" and expr_code.startswith(node.op[-1]): expr_code = " " + expr_code
         return f"{node.op}{expr_code}"
 
     def visit_FuncCallNode(self, node: FuncCallNode):
-        args_str = ", ".join(self.visit(arg) for arg in node.args)
-        return f"{self.visit(node.name_expr)}({args_str})"
+        args_str = ", ".join(self._operand(arg, ASSIGNMENT_PRECEDENCE) for arg in node.args)
+        return f"{self._operand(node.name_expr, POSTFIX_PRECEDENCE)}({args_str})"
 
     def visit_AssignmentNode(self, node: AssignmentNode):
-        return f"{self.visit(node.lvalue)} {node.op} {self.visit(node.rvalue)}"
+        # Right-associative: only the right-hand side may itself be an assignment.
+        return f"{self._operand(node.lvalue, ASSIGNMENT_PRECEDENCE + 1)} {node.op} {self.visit(node.rvalue)}"
 
     def visit_ExprStatementNode(self, node: ExprStatementNode):
         return f"{self.visit(node.expr)};" if node.expr else ";"
@@ -123,7 +171,7 @@ class CCodeGenerator:
         init_str = ""
         if isinstance(node.init, VarDeclNode):
             original_is_global, self.is_global_scope = self.is_global_scope, False
-            init_str = self.visit(node.init).rstrip(';')
+            init_str = self.visit(node.init).strip().rstrip(';')
             self.is_global_scope = original_is_global
         elif node.init:
             init_str = self.visit(node.init)
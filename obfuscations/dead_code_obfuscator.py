@@ -1,9 +1,16 @@
 import random
 from obfuscations import ast_nodes as ast
+from obfuscations.insertion_policy import InsertionPolicy
+
+DEFAULT_DEAD_CODE_RATE = 0.3
 
 class DeadCodeInserterVisitor:
-    def __init__(self):
+    def __init__(self, policy=None):
         self.dead_var_counter = 0
+        self.policy = policy or InsertionPolicy((DEFAULT_DEAD_CODE_RATE,))
+        self.current_function = None
+        self.loop_depth = 0
+        self.hoisted = []
 
     def _generate_dead_var_name(self):
         self.dead_var_counter += 1
@@ -38,17 +45,47 @@ class DeadCodeInserterVisitor:
                     except AttributeError: pass
         return node
 
+    def visit_FuncDefNode(self, node: ast.FuncDefNode):
+        outer_function, self.current_function = self.current_function, node
+        self.generic_visit(node)
+        self.current_function = outer_function
+        return node
+
+    def visit_WhileNode(self, node: ast.WhileNode):
+        self.loop_depth += 1
+        self.generic_visit(node)
+        self.loop_depth -= 1
+        return node
+
+    def visit_ForNode(self, node: ast.ForNode):
+        self.loop_depth += 1
+        self.generic_visit(node)
+        self.loop_depth -= 1
+        return node
+
     def visit_CompoundStatementNode(self, node: ast.CompoundStatementNode):
+        # Blocks outside every loop collect the declarations hoisted out of the loops they contain.
+        is_hoist_target = self.loop_depth == 0
+        if is_hoist_target: self.hoisted.append([])
         new_items = []
         for item in node.items:
             visited_item = self.visit(item)
             if isinstance(visited_item, list): new_items.extend(v for v in visited_item if v is not None)
             elif visited_item is not None: new_items.append(visited_item)
         node.items = new_items
-        if random.random() < 0.3:
-            node.items.insert(0, self._create_dead_variable_declaration())
+        if self.policy.should_insert(self.current_function, self.loop_depth, node):
+            dead_decl = self._create_dead_variable_declaration()
+            if self.policy.should_hoist(self.loop_depth) and self.hoisted: self.hoisted[-1].append(dead_decl)
+            else:
+                node.items.insert(0, dead_decl)
+                ast.mark_changed(node, self.current_function)
+        if is_hoist_target:
+            hoisted_decls = self.hoisted.pop()
+            if hoisted_decls:
+                node.items[0:0] = hoisted_decls
+                ast.mark_changed(node, self.current_function)
         return node
 
-def apply_dead_code_insertion(ast_root: ast.ProgramNode):
-    inserter = DeadCodeInserterVisitor()
+def apply_dead_code_insertion(ast_root: ast.ProgramNode, policy=None):
+    inserter = DeadCodeInserterVisitor(policy)
     return inserter.visit(ast_root)
\ No newline at end of file
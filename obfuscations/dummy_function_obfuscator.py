@@ -3,22 +3,92 @@ import string
 from obfuscations import ast_nodes as ast
 
 
+def _int(value): return ast.ConstantNode("int", str(value))
+
+
+def _assign(name, expr): return ast.ExprStatementNode(expr=ast.AssignmentNode(ast.IdNode(name), expr))
+
+
+def _binop(op, left, right): return ast.BinaryOpNode(op, left, right)
+
+
 class DummyFunctionInjector:
-    def __init__(self):
+    def __init__(self, decoy_call_rate=0.0, name_prefix="dummy_fn_"):
         self.dummy_func_counter = 0
+        # Project mode gives every file its own prefix so dummies never clash at link time.
+        self.name_prefix = name_prefix
         self.dummy_var_counter = 0
+        # Chance that a dummy calls one of the dummies placed before it, so decoys form a call graph.
+        self.decoy_call_rate = decoy_call_rate
+        self.body_templates = [self._tpl_scaled_branch, self._tpl_counting_loop, self._tpl_for_parity,
+                               self._tpl_char_check, self._tpl_modular_mix, self._tpl_param_mix]
 
     def _generate_dummy_func_name(self):
         self.dummy_func_counter += 1;
         suffix = ''.join(random.choices(string.ascii_lowercase, k=3))
-        return f"dummy_fn_{suffix}{self.dummy_func_counter}"
+        return f"{self.name_prefix}{suffix}{self.dummy_func_counter}"
 
     def _generate_dummy_var_name(self):
         self.dummy_var_counter += 1;
         suffix = ''.join(random.choices(string.ascii_lowercase, k=2))
         return f"dv_{suffix}{self.dummy_var_counter}"
 
-    def _create_dummy_function(self):
+    # Body templates: each returns statements updating the int accumulator `acc`.
+
+    def _tpl_scaled_branch(self, acc, params):
+        if_cond = _binop('>', ast.IdNode(acc), _int(random.randint(1, 10)))
+        scale = _assign(acc, _binop('*', ast.IdNode(acc), _int(random.randint(2, 5))))
+        body = ast.CompoundStatementNode(items=[scale])
+        return [ast.IfNode(cond=if_cond, if_true_body=body)]
+
+    def _tpl_counting_loop(self, acc, params):
+        counter = self._generate_dummy_var_name()
+        loop_body = ast.CompoundStatementNode(items=[
+            _assign(acc, _binop('+', ast.IdNode(acc), _binop('*', ast.IdNode(counter), _int(random.randint(1, 9))))),
+            _assign(counter, _binop('+', ast.IdNode(counter), _int(1))),
+        ])
+        return [ast.VarDeclNode(ast.TypeNode("int"), counter, _int(0)),
+                ast.WhileNode(_binop('<', ast.IdNode(counter), _int(random.randint(2, 12))), loop_body)]
+
+    def _tpl_for_parity(self, acc, params):
+        counter, modulus = self._generate_dummy_var_name(), random.randint(2, 4)
+        is_multiple = _binop('==', _binop('%', ast.IdNode(counter), _int(modulus)), _int(0))
+        subtract = _assign(acc, _binop('-', ast.IdNode(acc), ast.IdNode(counter)))
+        add = _assign(acc, _binop('+', ast.IdNode(acc), _int(modulus)))
+        branch = ast.IfNode(cond=is_multiple, if_true_body=ast.CompoundStatementNode([subtract]),
+                            if_false_body=ast.CompoundStatementNode([add]))
+        return [ast.ForNode(ast.VarDeclNode(ast.TypeNode("int"), counter, _int(0)),
+                            _binop('<', ast.IdNode(counter), _int(random.randint(3, 10))),
+                            ast.AssignmentNode(ast.IdNode(counter), _binop('+', ast.IdNode(counter), _int(1))),
+                            ast.CompoundStatementNode([branch]))]
+
+    def _tpl_char_check(self, acc, params):
+        char_var = self._generate_dummy_var_name()
+        letter, other = random.sample(string.ascii_lowercase, 2)
+        cond = _binop('||', _binop('==', ast.IdNode(char_var), ast.ConstantNode("char", f"'{other}'")),
+                      _binop('>', ast.IdNode(acc), _int(random.randint(10, 200))))
+        update = _assign(acc, _binop('+', _binop('/', ast.IdNode(acc), _int(random.randint(2, 7))), _int(1)))
+        return [ast.VarDeclNode(ast.TypeNode("char"), char_var, ast.ConstantNode("char", f"'{letter}'")),
+                ast.IfNode(cond=cond, if_true_body=ast.CompoundStatementNode([update]))]
+
+    def _tpl_modular_mix(self, acc, params):
+        mixed = _binop('+', _binop('*', ast.IdNode(acc), _int(random.randint(3, 31))), _int(random.randint(1, 97)))
+        return [_assign(acc, _binop('%', mixed, _int(random.choice((97, 101, 251, 1009)))))]
+
+    def _tpl_param_mix(self, acc, params):
+        int_params = [p.name for p in params if p.type_node.name == "int"]
+        if not int_params: return self._tpl_modular_mix(acc, params)
+        return [_assign(acc, _binop(random.choice('+-'), ast.IdNode(acc),
+                                    _binop('*', ast.IdNode(random.choice(int_params)), _int(random.randint(2, 9)))))]
+
+    def _decoy_call(self, callee: ast.FuncDefNode):
+        args = [_int(random.randint(0, 50)) if p.type_node.name == "int"
+                else ast.ConstantNode("char", f"'{random.choice(string.ascii_lowercase)}'") for p in callee.params]
+        return ast.FuncCallNode(ast.IdNode(callee.name), args)
+
+    def _create_dummy_function(self, callees=()):
+        """Builds one dummy function from 1-3 random body templates. With decoy calls enabled it
+        may call one of `callees`, which must all be placed before it in the program."""
         func_name, return_type = self._generate_dummy_func_name(), ast.TypeNode(name="int")
         params = []
         if random.choice([True, False]): params.append(
@@ -28,17 +98,11 @@ class DummyFunctionInjector:
 
         body_items = []
         var_a = self._generate_dummy_var_name()
-        body_items.append(
-            ast.VarDeclNode(ast.TypeNode("int"), var_a, ast.ConstantNode("int", str(random.randint(1, 100)))))
-        var_b = self._generate_dummy_var_name()
-        body_items.append(ast.VarDeclNode(ast.TypeNode("char"), var_b,
-                                          ast.ConstantNode("char", f"'{random.choice(string.ascii_lowercase)}'")))
-
-        if_cond = ast.BinaryOpNode('>', ast.IdNode(var_a), ast.ConstantNode("int", str(random.randint(1, 10))))
-        assign_if = ast.AssignmentNode(ast.IdNode(var_a),
-                                       ast.BinaryOpNode('*', ast.IdNode(var_a), ast.ConstantNode("int", "2")))
-        if_true_body = ast.CompoundStatementNode(items=[ast.ExprStatementNode(expr=assign_if)])
-        body_items.append(ast.IfNode(cond=if_cond, if_true_body=if_true_body))
+        body_items.append(ast.VarDeclNode(ast.TypeNode("int"), var_a, _int(random.randint(1, 100))))
+        for template in random.sample(self.body_templates, random.randint(1, 3)):
+            body_items.extend(template(var_a, params))
+        if callees and random.random() < self.decoy_call_rate:
+            body_items.append(_assign(var_a, _binop('+', ast.IdNode(var_a), self._decoy_call(random.choice(callees)))))
 
         ret_expr = ast.IdNode(var_a)
         if params and params[0].name: ret_expr = ast.BinaryOpNode("+", ret_expr, ast.IdNode(params[0].name))
@@ -47,11 +111,33 @@ class DummyFunctionInjector:
         return ast.FuncDefNode(return_type, func_name, params, ast.CompoundStatementNode(body_items))
 
     def visit_ProgramNode(self, node: ast.ProgramNode, num_to_insert=1):
-        for _ in range(num_to_insert):
-            node.declarations.insert(random.randint(0, len(node.declarations)), self._create_dummy_function())
+        # Draw all insertion points up front and merge them in one pass; inserting one at a
+        # time would be O(n) per dummy.
+        positions = sorted(random.randint(0, len(node.declarations)) for _ in range(num_to_insert))
+        dummies = []
+
+        def create_dummy():
+            dummies.append(self._create_dummy_function(dummies))
+            return dummies[-1]
+
+        node.declarations = merge_insertions(node.declarations, positions, create_dummy)
+        ast.mark_changed(node)
         return node
 
 
-def apply_dummy_function_insertion(ast_root: ast.ProgramNode, num_to_insert=1):
+def merge_insertions(items, positions, create):
+    """Returns a new list with `create()` inserted before items[p] for every p in the sorted
+    `positions` (p == len(items) appends). Linear in len(items) + len(positions)."""
+    merged, next_position = [], 0
+    for index in range(len(items) + 1):
+        while next_position < len(positions) and positions[next_position] == index:
+            merged.append(create())
+            next_position += 1
+        if index < len(items): merged.append(items[index])
+    return merged
+
+
+def apply_dummy_function_insertion(ast_root: ast.ProgramNode, num_to_insert=1, decoy_call_rate=0.0,
+                                   name_prefix="dummy_fn_"):
     if num_to_insert <= 0: return ast_root
-    return DummyFunctionInjector().visit_ProgramNode(ast_root, num_to_insert=num_to_insert)
\ No newline at end of file
+    return DummyFunctionInjector(decoy_call_rate, name_prefix).visit_ProgramNode(ast_root, num_to_insert=num_to_insert)
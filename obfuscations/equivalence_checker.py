@@ -0,0 +1,173 @@
+import numpy as np
+
+from obfuscations import ast_nodes as ast
+from obfuscations.c_generator_visitor import CCodeGenerator
+from obfuscations.interpreter import constant_value
+
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+DEFAULT_SAMPLES = 200_000
+EDGE_VALUES = (0, 1, -1, 2, -2, INT32_MIN, INT32_MIN + 1, INT32_MAX, INT32_MAX - 1)
+
+
+class UnsupportedExpression(ValueError):
+    pass
+
+
+def _call_key(node: ast.FuncCallNode):
+    return CCodeGenerator().visit(node)
+
+
+def free_variables(node, names=None):
+    """Names of the IdNodes an expression reads, in first-use order. A function call counts as
+    one free variable named by its source text, i.e. equal calls are assumed to return equal values."""
+    names = [] if names is None else names
+    if isinstance(node, (ast.IdNode, ast.FuncCallNode)):
+        name = node.name if isinstance(node, ast.IdNode) else _call_key(node)
+        if name not in names: names.append(name)
+    elif isinstance(node, ast.Node):
+        for field in ast.CHILD_FIELDS.get(node.__class__, ()):
+            value = getattr(node, field, None)
+            for child in value if isinstance(value, list) else [value]:
+                if isinstance(child, ast.Node): free_variables(child, names)
+    return names
+
+
+class VectorEvaluator:
+    """Evaluates an expression for many variable assignments at once with int32 wraparound
+    arithmetic (like `gcc -fwrapv`). Each result is a (values, defined) pair of arrays;
+    `defined` is False in lanes where C leaves the result undefined (division by zero,
+    INT_MIN / -1), taking && / || short-circuiting into account."""
+
+    def __init__(self, env):
+        self.env = env
+        self.size = len(next(iter(env.values()))) if env else 1
+
+    def visit(self, node):
+        method_name = 'visit_' + node.__class__.__name__
+        visitor_method = getattr(self, method_name, None)
+        if visitor_method is None: raise UnsupportedExpression(f"cannot evaluate {node.__class__.__name__}")
+        return visitor_method(node)
+
+    def _all_defined(self):
+        return np.ones(self.size, dtype=bool)
+
+    def visit_IdNode(self, node: ast.IdNode):
+        return self.env[node.name], self._all_defined()
+
+    def visit_FuncCallNode(self, node: ast.FuncCallNode):
+        return self.env[_call_key(node)], self._all_defined()
+
+    def visit_ConstantNode(self, node: ast.ConstantNode):
+        value = constant_value(node)
+        return np.full(self.size, value, dtype=np.int64).astype(np.int32), self._all_defined()
+
+    def visit_UnaryOpNode(self, node: ast.UnaryOpNode):
+        values, defined = self.visit(node.expr)
+        if node.op == '-': return -values, defined
+        if node.op == '+': return values, defined
+        if node.op == '!': return (values == 0).astype(np.int32), defined
+        if node.op == '~': return ~values, defined
+        raise UnsupportedExpression(f"unary operator {node.op}")
+
+    def visit_BinaryOpNode(self, node: ast.BinaryOpNode):
+        left, left_defined = self.visit(node.left)
+        right, right_defined = self.visit(node.right)
+        op = node.op
+        if op == '&&':
+            left_true = left != 0
+            return (left_true & (right != 0)).astype(np.int32), left_defined & (~left_true | right_defined)
+        if op == '||':
+            left_true = left != 0
+            return (left_true | (right != 0)).astype(np.int32), left_defined & (left_true | right_defined)
+        defined = left_defined & right_defined
+        if op == '+': return left + right, defined
+        if op == '-': return left - right, defined
+        if op == '*': return left * right, defined
+        if op in ('/', '%'):
+            valid = (right != 0) & ~((left == INT32_MIN) & (right == -1))
+            safe_right = np.where(valid, right, 1)
+            safe_left = np.where(valid, left, 0).astype(np.int64)
+            quotient = np.trunc(safe_left / safe_right).astype(np.int64)  # C truncates toward zero
+            result = quotient if op == '/' else safe_left - quotient * safe_right
+            return result.astype(np.int32), defined & valid
+        comparisons = {'<': np.less, '>': np.greater, '<=': np.less_equal, '>=': np.greater_equal,
+                       '==': np.equal, '!=': np.not_equal}
+        if op in comparisons: return comparisons[op](left, right).astype(np.int32), defined
+        raise UnsupportedExpression(f"binary operator {op}")
+
+
+def random_assignments(names, samples=DEFAULT_SAMPLES, seed=0):
+    """int32 test vectors per variable: all edge-value combinations first (as far as they fit),
+    then a mix of small values and values drawn from the whole int32 range. Variables beyond
+    those the grid can cycle through within `samples` get random values only."""
+    rng = np.random.default_rng(seed)
+    env = {}
+    edges = np.array(EDGE_VALUES, dtype=np.int32)
+    grid = min(samples, len(edges) ** len(names))
+    for position, name in enumerate(names):
+        full = rng.integers(INT32_MIN, INT32_MAX, size=samples, endpoint=True, dtype=np.int64).astype(np.int32)
+        small = rng.integers(-64, 64, size=samples, dtype=np.int32)
+        values = np.where(rng.random(samples) < 0.5, small, full)
+        # Grid of edge values: variable k cycles through EDGE_VALUES with period len(EDGE_VALUES) ** k.
+        period = len(edges) ** position
+        if period < grid: values[:grid] = edges[(np.arange(grid) // period) % len(edges)]
+        env[name] = values
+    return env
+
+
+class EquivalenceResult:
+    def __init__(self, equivalent, checked, counterexamples):
+        self.equivalent = equivalent
+        self.checked = checked
+        self.counterexamples = counterexamples
+
+    def __bool__(self):
+        return self.equivalent
+
+    def __repr__(self):
+        return f"EquivalenceResult(equivalent={self.equivalent}, checked={self.checked}, " \
+               f"counterexamples={self.counterexamples!r})"
+
+
+def check_equivalence(original, rewritten, samples=DEFAULT_SAMPLES, seed=0, max_counterexamples=5):
+    """Compares two expressions on `samples` random int32 assignments to their free variables.
+
+    Lanes where the original is undefined are skipped; a rewrite that is undefined where the
+    original is not counts as a difference. Each counterexample is a dict with the variable
+    values and both results.
+    """
+    names = free_variables(original)
+    for name in free_variables(rewritten):
+        if name not in names: names.append(name)
+    env = random_assignments(names, samples, seed)
+    original_values, original_defined = VectorEvaluator(env).visit(original)
+    rewritten_values, rewritten_defined = VectorEvaluator(env).visit(rewritten)
+    differs = original_defined & (~rewritten_defined | (original_values != rewritten_values))
+    counterexamples = []
+    for lane in np.flatnonzero(differs)[:max_counterexamples]:
+        example = {name: int(env[name][lane]) for name in names}
+        example['original'] = int(original_values[lane])
+        example['rewritten'] = int(rewritten_values[lane]) if rewritten_defined[lane] else 'undefined'
+        counterexamples.append(example)
+    return EquivalenceResult(not differs.any(), int(original_defined.sum()), counterexamples)
+
+
+def validate_rules(rules, samples=DEFAULT_SAMPLES, seed=0):
+    """Bulk-checks a rule library given as (name, original expression, rewritten expression)
+    triples; returns [(name, EquivalenceResult)] with UnsupportedExpression reported as None."""
+    results = []
+    for name, original, rewritten in rules:
+        try:
+            results.append((name, check_equivalence(original, rewritten, samples, seed)))
+        except UnsupportedExpression:
+            results.append((name, None))
+    return results
+
+
+def format_validation_report(results):
+    lines = []
+    for name, result in results:
+        if result is None: lines.append(f"  {name}: unsupported expression")
+        elif result: lines.append(f"  {name}: ok ({result.checked} assignments)")
+        else: lines.append(f"  {name}: NOT EQUIVALENT, e.g. {result.counterexamples[0]}")
+    return "\n".join(lines)
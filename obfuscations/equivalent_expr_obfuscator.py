@@ -1,7 +1,21 @@
 import random
 from obfuscations import ast_nodes as ast
+from obfuscations.c_generator_visitor import CCodeGenerator
+
+# Assignments tried per rewrite when checking rewrites in debug mode.
+DEBUG_CHECK_SAMPLES = 4096
+REWRITE_RATE = 0.5
+
 
 class EquivalentExpressionVisitor:
+    def __init__(self, debug=False, profile=None):
+        self.current_function = None
+        # An ExecutionProfile scales the rewrite rate by how often each expression runs.
+        self.profile = profile
+        # In debug mode every rewrite is checked against a copy of the original expression on
+        # random int32 inputs (needs NumPy); a mismatch raises AssertionError.
+        self.debug = debug
+
     def visit(self, node):
         if node is None: return None
         method_name = 'visit_' + node.__class__.__name__
@@ -25,18 +39,41 @@ class EquivalentExpressionVisitor:
                     except AttributeError: pass
         return node
 
+    def visit_FuncDefNode(self, node: ast.FuncDefNode):
+        outer_function, self.current_function = self.current_function, node
+        self.generic_visit(node)
+        self.current_function = outer_function
+        return node
+
     def visit_BinaryOpNode(self, node: ast.BinaryOpNode):
         node.left = self.visit(node.left)
         node.right = self.visit(node.right)
-        if random.random() < 0.5:
-            if node.op == '+' and not (isinstance(node.right, ast.UnaryOpNode) and node.right.op == '-'):
-                negated_right = ast.UnaryOpNode(op='-', expr=node.right, coord=node.right.coord)
-                node.op, node.right = '-', negated_right
-            elif node.op == '-' and not (isinstance(node.right, ast.UnaryOpNode) and node.right.op == '-'):
-                negated_right = ast.UnaryOpNode(op='-', expr=node.right, coord=node.right.coord)
-                node.op, node.right = '+', negated_right
+        if random.random() < self._rewrite_rate(node) and node.op in ('+', '-') \
+                and not (isinstance(node.right, ast.UnaryOpNode) and node.right.op == '-'):
+            # a + b -> a - (-b) and a - b -> a + (-b)
+            original = ast.clone_ast(node) if self.debug else None
+            negated_right = ast.UnaryOpNode(op='-', expr=node.right, coord=node.right.coord)
+            node.op, node.right = '-' if node.op == '+' else '+', negated_right
+            ast.mark_changed(self.current_function)
+            if self.debug: self._check_rewrite(original, node)
         return node
 
-def apply_equivalent_expression(ast_root: ast.ProgramNode):
-    transformer = EquivalentExpressionVisitor()
+    def _rewrite_rate(self, node):
+        if self.profile is None: return REWRITE_RATE
+        factor = self.profile.factor(self.profile.expression_count(node, self.current_function))
+        return REWRITE_RATE if factor is None else min(1.0, REWRITE_RATE * factor)
+
+    def _check_rewrite(self, original, rewritten):
+        from obfuscations.equivalence_checker import check_equivalence, UnsupportedExpression
+        try:
+            result = check_equivalence(original, rewritten, samples=DEBUG_CHECK_SAMPLES)
+        except UnsupportedExpression:
+            return
+        if not result:
+            generator = CCodeGenerator()
+            raise AssertionError(f"Rewrite of '{generator.visit(original)}' into '{generator.visit(rewritten)}' "
+                                 f"is not equivalent, e.g. {result.counterexamples[0]}")
+
+def apply_equivalent_expression(ast_root: ast.ProgramNode, debug=False, profile=None):
+    transformer = EquivalentExpressionVisitor(debug, profile)
     return transformer.visit(ast_root)
\ No newline at end of file
@@ -0,0 +1,91 @@
+import math
+import re
+
+from obfuscations import ast_nodes as ast
+
+# Counts at or above this fraction of the largest count (and at least MIN_HOT_COUNT) are hot:
+# they get no runtime-affecting insertions.
+DEFAULT_HOT_FRACTION = 0.01
+MIN_HOT_COUNT = 100
+# Rate multiplier for code the profile saw never executed.
+COLD_FACTOR = 2.0
+
+# gcov output: "<count>:<line>:<source>", the count being "#####"/"=====" for zero and "-" for
+# lines without code; "function <name> called <count> ..." lines come with `gcov -b`.
+_GCOV_LINE = re.compile(r'^\s*(?:(\d+)\*?|#####|=====|(-))\s*:\s*(\d+)\s*:')
+_GCOV_FUNCTION = re.compile(r'^function (\S+) called (\d+)')
+_GCOV_DETAIL_LINES = {'branch', 'call', 'unconditional', 'function'}
+
+
+class ExecutionProfile:
+    """Execution counts per function and per source line, used to scale obfuscation rates.
+
+    Lines of a profile file are "<function name> <count>" or "<line number> <count>" (blank
+    lines and # comments are ignored); gcov's .gcov reports are read as they are. Counts are
+    keyed by lines of the original file: set `line_map` (as filled by preprocess_code) to
+    translate the coords of the parsed program.
+
+    A count maps to a rate factor: 0 for hot code (see DEFAULT_HOT_FRACTION),
+    COLD_FACTOR for code that never ran, and a log-scale ramp from 1 down to 0 in between.
+    """
+
+    def __init__(self, function_counts=None, line_counts=None, hot_fraction=DEFAULT_HOT_FRACTION, line_map=None):
+        self.function_counts = dict(function_counts or {})
+        self.line_counts = dict(line_counts or {})
+        self.line_map = line_map
+        counts = list(self.function_counts.values()) + list(self.line_counts.values())
+        self.hot_count = max(max(counts, default=0) * hot_fraction, MIN_HOT_COUNT)
+
+    @classmethod
+    def load(cls, path, hot_fraction=DEFAULT_HOT_FRACTION):
+        function_counts, line_counts = {}, {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                # gcov lines first: their "#####" counts and source text must not be read as comments.
+                gcov = _GCOV_LINE.match(line)
+                if gcov:
+                    if not gcov.group(2): line_counts[int(gcov.group(3))] = int(gcov.group(1) or 0)
+                    continue
+                if ':' in line.split('#', 1)[0]: continue  # other gcov lines, e.g. "-: 0:Source:..."
+                function = _GCOV_FUNCTION.match(line)
+                if function:
+                    function_counts[function.group(1)] = int(function.group(2))
+                    continue
+                fields = line.split('#', 1)[0].split()
+                if not fields or fields[0] in _GCOV_DETAIL_LINES: continue
+                if len(fields) != 2 or not fields[1].isdigit():
+                    raise ValueError(f"{path}:{line_number}: expected '<function or line> <count>'.")
+                if fields[0].isdigit(): line_counts[int(fields[0])] = int(fields[1])
+                else: function_counts[fields[0]] = int(fields[1])
+        return cls(function_counts, line_counts, hot_fraction)
+
+    def line_count(self, coord):
+        if coord is None: return None
+        line = coord[0]
+        if self.line_map and 0 < line <= len(self.line_map): line = self.line_map[line - 1]
+        return self.line_counts.get(line)
+
+    def function_count(self, func_node):
+        if func_node is None: return None
+        for name in (func_node.original_name, func_node.name):
+            if name in self.function_counts: return self.function_counts[name]
+        return self.line_count(func_node.coord)
+
+    def block_count(self, block, func_node):
+        """How often the start of `block` runs: the count of its first statement with a counted
+        line, else that of the function."""
+        for item in block.items:
+            count = self.line_count(item.coord) if isinstance(item, ast.Node) else None
+            if count is not None: return count
+        return self.function_count(func_node)
+
+    def expression_count(self, node, func_node):
+        count = self.line_count(node.coord)
+        return count if count is not None else self.function_count(func_node)
+
+    def factor(self, count):
+        """Rate multiplier for code run `count` times; None without data (keep the static rate)."""
+        if count is None: return None
+        if count <= 0: return COLD_FACTOR
+        if count >= self.hot_count: return 0.0
+        return 1.0 - math.log1p(count) / math.log1p(self.hot_count)
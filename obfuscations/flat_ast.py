@@ -0,0 +1,144 @@
+from array import array
+from collections import Counter
+
+from obfuscations import ast_nodes as ast
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the array-based queries work without it.
+    np = None
+
+# Child fields per node kind, in source order.
+CHILD_FIELDS = {cls.__name__: fields for cls, fields in ast.CHILD_FIELDS.items()}
+NODE_KINDS = tuple(CHILD_FIELDS)
+KIND_IDS = {name: kind_id for kind_id, name in enumerate(NODE_KINDS)}
+
+# Which attribute is interned into the string table for each kind.
+TEXT_FIELDS = {
+    'FuncDefNode': 'name', 'ParamNode': 'name', 'VarDeclNode': 'name', 'TypeNode': 'name', 'IdNode': 'name',
+    'ConstantNode': 'value', 'StringLiteralNode': 'value',
+    'BinaryOpNode': 'op', 'UnaryOpNode': 'op', 'AssignmentNode': 'op',
+}
+
+NO_NODE = -1
+
+
+def _children(node):
+    for field in CHILD_FIELDS[node.__class__.__name__]:
+        value = getattr(node, field, None)
+        if isinstance(value, ast.Node):
+            yield value
+        elif isinstance(value, list):
+            yield from (item for item in value if isinstance(item, ast.Node))
+
+
+class FlatAST:
+    """Struct-of-arrays snapshot of an AST for read-only analyses.
+
+    Nodes are numbered in pre-order, so the subtree of node `i` is exactly the index range
+    `i .. subtree_end[i] - 1`. Per node there is a kind id (`kind`, see NODE_KINDS), the
+    `parent`, `first_child` and `next_sibling` indices (NO_NODE when absent) and `text`, an id
+    into the interned `strings` table holding the node's name, constant value or operator.
+    `nodes` keeps the original objects so results can be mapped back.
+    """
+
+    def __init__(self):
+        self.kind = array('B')
+        self.parent = array('i')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.subtree_end = array('i')
+        self.text = array('i')
+        self.strings = []
+        self.string_ids = {}
+        self.nodes = []
+
+    def __len__(self):
+        return len(self.kind)
+
+    def intern(self, value):
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def numpy_views(self):
+        """Zero-copy NumPy views of the index arrays (None without NumPy)."""
+        if np is None: return None
+        return {name: np.frombuffer(getattr(self, name), dtype=np.uint8 if name == 'kind' else np.intc)
+                for name in ('kind', 'parent', 'first_child', 'next_sibling', 'subtree_end', 'text')}
+
+    # --- Queries -------------------------------------------------------------------------
+
+    def indices_of_kind(self, kind_name, start=0, end=None):
+        kind_id, end = KIND_IDS[kind_name], len(self.kind) if end is None else end
+        if np is not None:
+            return (np.flatnonzero(self.numpy_views()['kind'][start:end] == kind_id) + start).tolist()
+        kinds = self.kind
+        return [i for i in range(start, end) if kinds[i] == kind_id]
+
+    def children(self, index):
+        child = self.first_child[index]
+        while child != NO_NODE:
+            yield child
+            child = self.next_sibling[child]
+
+    def function_index(self, func_name):
+        """Index of the top-level definition of `func_name`, found by walking the root's children."""
+        name_id, func_kind = self.string_ids.get(func_name), KIND_IDS['FuncDefNode']
+        for i in self.children(0):
+            if self.kind[i] == func_kind and self.text[i] == name_id: return i
+        return NO_NODE
+
+    def ids_in_function(self, func_name):
+        """Indices of all IdNodes inside function `func_name` (a subtree range scan)."""
+        func_index = self.function_index(func_name)
+        if func_index == NO_NODE: return []
+        return self.indices_of_kind('IdNode', func_index, self.subtree_end[func_index])
+
+    def count_uses(self):
+        """Maps each identifier to the number of IdNodes referencing it."""
+        id_kind = KIND_IDS['IdNode']
+        if np is not None:
+            views = self.numpy_views()
+            counts = np.bincount(views['text'][views['kind'] == id_kind], minlength=len(self.strings))
+            return {self.strings[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+        kinds, texts = self.kind, self.text
+        counts = Counter(texts[i] for i in range(len(kinds)) if kinds[i] == id_kind)
+        return {self.strings[string_id]: count for string_id, count in counts.items()}
+
+
+def flatten_ast(ast_root: ast.Node):
+    """Converts an AST into a FlatAST with an explicit-stack pre-order walk."""
+    flat = FlatAST()
+    kind, parent, first_child, next_sibling = flat.kind, flat.parent, flat.first_child, flat.next_sibling
+    subtree_end, text, nodes = flat.subtree_end, flat.text, flat.nodes
+    last_child = []
+    # Stack entries: (node, parent index) to enter, or (None, index) to close that node's subtree.
+    stack = [(ast_root, NO_NODE)]
+    while stack:
+        node, parent_index = stack.pop()
+        if node is None:
+            subtree_end[parent_index] = len(kind)
+            continue
+        index = len(kind)
+        class_name = node.__class__.__name__
+        kind.append(KIND_IDS[class_name])
+        parent.append(parent_index)
+        first_child.append(NO_NODE)
+        next_sibling.append(NO_NODE)
+        subtree_end.append(NO_NODE)
+        text_field = TEXT_FIELDS.get(class_name)
+        text.append(flat.intern(str(getattr(node, text_field))) if text_field else NO_NODE)
+        nodes.append(node)
+        last_child.append(NO_NODE)
+        if parent_index != NO_NODE:
+            previous = last_child[parent_index]
+            if previous == NO_NODE: first_child[parent_index] = index
+            else: next_sibling[previous] = index
+            last_child[parent_index] = index
+
+        stack.append((None, index))
+        stack.extend((child, index) for child in reversed(list(_children(node))))
+    return flat
@@ -0,0 +1,47 @@
+import random
+
+
+class InsertionPolicy:
+    """Decides how often a block receives an inserted construct, based on its function and loop depth.
+
+    depth_rates[d] is the insertion probability for a block nested d loops deep; the last
+    entry applies to all deeper blocks. With hoist_from_loops, insertions that fire inside
+    a loop body are placed in the block enclosing the outermost loop instead, keeping the
+    code just as cluttered without executing the insert on every iteration.
+    allow_functions/deny_functions restrict insertions by (original) function name.
+    With an ExecutionProfile, blocks it has counts for use depth_rates[0] scaled by the
+    profile's factor instead of the loop-depth guess (capped at 1).
+    """
+
+    def __init__(self, depth_rates=(0.3,), hoist_from_loops=False, allow_functions=None, deny_functions=None,
+                 profile=None):
+        if not depth_rates: raise ValueError("depth_rates needs at least one entry.")
+        self.depth_rates = tuple(depth_rates)
+        self.hoist_from_loops = hoist_from_loops
+        self.allow_functions = set(allow_functions) if allow_functions is not None else None
+        self.deny_functions = set(deny_functions or ())
+        self.profile = profile
+
+    def scaled(self, factors):
+        """Returns a copy whose per-depth rates are depth_rates[0] multiplied by each factor."""
+        return InsertionPolicy([self.depth_rates[0] * f for f in factors], self.hoist_from_loops,
+                               self.allow_functions, self.deny_functions, self.profile)
+
+    def allows_function(self, func_node):
+        if func_node is None: return True
+        names = {func_node.name, func_node.original_name}
+        if names & self.deny_functions: return False
+        return self.allow_functions is None or bool(names & self.allow_functions)
+
+    def rate_for(self, func_node, loop_depth, block=None):
+        if not self.allows_function(func_node): return 0.0
+        if self.profile is not None and block is not None:
+            factor = self.profile.factor(self.profile.block_count(block, func_node))
+            if factor is not None: return min(1.0, self.depth_rates[0] * factor)
+        return self.depth_rates[min(loop_depth, len(self.depth_rates) - 1)]
+
+    def should_insert(self, func_node, loop_depth, block=None):
+        return random.random() < self.rate_for(func_node, loop_depth, block)
+
+    def should_hoist(self, loop_depth):
+        return self.hoist_from_loops and loop_depth > 0
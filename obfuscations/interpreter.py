@@ -0,0 +1,440 @@
+"""In-process executor for Mini-C ASTs, used to check transformations without a C compiler.
+
+Each FuncDefNode is compiled once into nested Python closures: variables are resolved to slot
+indices at compile time and live in a per-call frame list, so running a program does no name
+lookups or per-node dispatch. Arithmetic is int32 with wraparound, `char` variables wrap to a
+signed byte, and `printf`, `putchar`, `puts` and `getchar` (always EOF) are built in.
+
+    program = compile_program(ast_root)
+    result = program.run()            # ExecutionResult(output, return_value, error)
+    report = compare_programs(original_ast, transformed_ast)
+"""
+import re
+import sys
+import threading
+
+from obfuscations import ast_nodes as ast
+
+ENTRY_POINT = 'main'
+DEFAULT_MAX_STEPS = 10_000_000
+DEFAULT_MAX_CALL_DEPTH = 10_000
+# Runs happen on a thread with this much stack, so the raised Python recursion limit is safe.
+RUN_STACK_SIZE = 512 * 1024 * 1024
+SIGN32, MASK32 = 0x80000000, 0xFFFFFFFF
+CHAR_ESCAPES = {'n': 10, 't': 9, 'r': 13, '\\': 92, "'": 39, '"': 34, '?': 63, 'a': 7, 'b': 8, 'f': 12, 'v': 11}
+_ESCAPE_SEQUENCE = re.compile(r'\\(x[0-9a-fA-F]+|[0-7]{1,3}|.)')
+_FORMAT_SPEC = re.compile(r'%([-+ #0]*)(\d+|\*)?(?:\.(\d*|\*))?(?:hh|h|ll|l|j|z|t|L)?([diouxXcs%])')
+
+
+class InterpreterError(Exception):
+    pass
+
+
+def wrap32(value): return ((value + SIGN32) & MASK32) - SIGN32
+def wrap8(value): return ((value + 128) & 0xFF) - 128
+
+
+def _escape_value(body):
+    if body[0] == 'x': return int(body[1:], 16)
+    if body[0].isdigit(): return int(body, 8)
+    return CHAR_ESCAPES.get(body, ord(body))
+
+
+def constant_value(node: ast.ConstantNode):
+    """Integer value of an int, char or bool constant as written in the source."""
+    text = str(node.value)
+    if text in ('true', 'false'): return int(text == 'true')
+    if node.type == 'char' or text.startswith("'"):
+        body = text[1:-1]
+        return _escape_value(body[1:]) if body.startswith('\\') else ord(body)
+    digits = text.rstrip('uUlL')
+    if len(digits) > 1 and digits[0] == '0' and digits[1].isdigit(): return wrap32(int(digits, 8))
+    return wrap32(int(digits, 0))
+
+
+def string_value(node: ast.StringLiteralNode):
+    return _ESCAPE_SEQUENCE.sub(lambda m: chr(_escape_value(m.group(1))), node.value[1:-1])
+
+
+def format_printf(fmt, args):
+    """C printf formatting of int/str arguments."""
+    args = iter(args)
+
+    def convert(match):
+        flags, width, precision, conversion = match.groups()
+        if conversion == '%': return '%'
+        if width == '*': width = str(next(args))
+        if precision == '*': precision = str(next(args))
+        spec = '%' + flags.replace('#', '') + (width or '') + ('' if precision is None else '.' + (precision or '0'))
+        value = next(args)
+        if conversion in 'di': return (spec + 'd') % value
+        if conversion == 'c': return (spec + 'c') % chr(value & 0xFF)
+        if conversion == 's': return (spec + 's') % value
+        if conversion == 'u': return (spec + 'd') % (value & MASK32)
+        prefix = {'o': '0', 'x': '0x', 'X': '0X'}[conversion] if '#' in flags and value else ''
+        return prefix + (spec + conversion) % (value & MASK32)
+    try:
+        return _FORMAT_SPEC.sub(convert, fmt)
+    except StopIteration:
+        raise InterpreterError(f"printf: too few arguments for {fmt!r}") from None
+
+
+def _coercion(type_node):
+    name = type_node.name if type_node is not None else 'int'
+    if name == 'char': return wrap8
+    if name == 'bool': return lambda value: 1 if value else 0
+    return None
+
+
+class ExecutionResult:
+    def __init__(self, output, return_value, error=None):
+        self.output = output
+        self.return_value = return_value
+        self.error = error
+
+    def as_dict(self):
+        return {"output": self.output, "return_value": self.return_value, "error": self.error}
+
+    def __eq__(self, other):
+        return isinstance(other, ExecutionResult) and self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return f"ExecutionResult(output={self.output!r}, return_value={self.return_value!r}, error={self.error!r})"
+
+
+class _Function:
+    """A compiled function; `invoke` is filled in once its body is compiled, so calls compiled
+    earlier (including recursive ones) bind to this object rather than to the body."""
+
+    def __init__(self, name):
+        self.name = name
+        self.invoke = None
+
+
+class FunctionCompiler:
+    """Compiles one function body (or the global initializers) into closures taking the frame."""
+
+    def __init__(self, program, func_def=None):
+        self.program = program
+        self.scopes = [{}] if func_def is not None else []
+        self.num_slots = 0
+        self.slot_coercions = {}
+        self.nesting = 0
+
+    def declare(self, name, coerce=None):
+        slot = self.scopes[-1][name] = self.num_slots
+        self.num_slots += 1
+        if coerce is not None: self.slot_coercions[slot] = coerce
+        return slot
+
+    def resolve(self, name):
+        """('local', slot) or ('global', slot) for a variable name."""
+        for scope in reversed(self.scopes):
+            if name in scope: return 'local', scope[name]
+        if name in self.program.global_slots: return 'global', self.program.global_slots[name]
+        raise InterpreterError(f"'{name}' is not a variable")
+
+    def visit(self, node):
+        method_name = 'visit_' + node.__class__.__name__
+        visitor_method = getattr(self, method_name, None)
+        if visitor_method is None: raise InterpreterError(f"cannot execute {node.__class__.__name__}")
+        # Closures nest like the nodes, so this bounds the Python frames one call of the function uses.
+        self.nesting += 1
+        self.program.max_nesting = max(self.program.max_nesting, self.nesting)
+        try:
+            return visitor_method(node)
+        finally:
+            self.nesting -= 1
+
+    # --- Functions and statements: closures return None, or a 1-tuple holding the return value.
+
+    def compile_function(self, node: ast.FuncDefNode):
+        steps, depth_left = self.program.steps, self.program.depth_left
+        params = []
+        for param in node.params:
+            if param.name: params.append((self.declare(param.name, _coercion(param.type_node)), _coercion(param.type_node)))
+        body = self.visit(node.body)
+        coerce_result = _coercion(node.return_type)
+        num_slots, name = self.num_slots, node.name
+
+        def invoke(args):
+            steps[0] -= 1
+            if steps[0] < 0: raise InterpreterError("step limit exceeded")
+            # Counted here rather than left to RecursionError, whose depth would depend on how
+            # deeply each function's statements nest. Not restored on errors: run() resets it.
+            depth_left[0] -= 1
+            if depth_left[0] < 0: raise InterpreterError("stack overflow")
+            if len(args) != len(params): raise InterpreterError(f"{name}() called with {len(args)} arguments")
+            frame = [0] * num_slots
+            for (slot, coerce), value in zip(params, args): frame[slot] = coerce(value) if coerce else value
+            result = body(frame)
+            depth_left[0] += 1
+            if result is None: return 0
+            return coerce_result(result[0]) if coerce_result else result[0]
+        return invoke
+
+    def visit_CompoundStatementNode(self, node: ast.CompoundStatementNode):
+        self.scopes.append({})
+        statements = tuple(self.visit(item) for item in node.items if item is not None)
+        self.scopes.pop()
+
+        def block(frame):
+            for statement in statements:
+                result = statement(frame)
+                if result is not None: return result
+        return block
+
+    def visit_VarDeclNode(self, node: ast.VarDeclNode):
+        initializer = self.visit(node.initializer) if node.initializer is not None else None
+        coerce = _coercion(node.type_node)
+        slot = self.declare(node.name, coerce)
+        if initializer is None:
+            def declare(frame): frame[slot] = 0
+        elif coerce is None:
+            def declare(frame): frame[slot] = initializer(frame)
+        else:
+            def declare(frame): frame[slot] = coerce(initializer(frame))
+        return declare
+
+    def visit_ExprStatementNode(self, node: ast.ExprStatementNode):
+        if node.expr is None: return lambda frame: None
+        expr = self.visit(node.expr)
+
+        def statement(frame): expr(frame)
+        return statement
+
+    def visit_IfNode(self, node: ast.IfNode):
+        cond, if_true = self.visit(node.cond), self.visit(node.if_true_body)
+        if_false = self.visit(node.if_false_body) if node.if_false_body is not None else None
+        if if_false is None:
+            return lambda frame: if_true(frame) if cond(frame) else None
+        return lambda frame: if_true(frame) if cond(frame) else if_false(frame)
+
+    def visit_WhileNode(self, node: ast.WhileNode):
+        cond, body, steps = self.visit(node.cond), self.visit(node.body), self.program.steps
+
+        def loop(frame):
+            while cond(frame):
+                steps[0] -= 1
+                if steps[0] < 0: raise InterpreterError("step limit exceeded")
+                result = body(frame)
+                if result is not None: return result
+        return loop
+
+    def visit_ForNode(self, node: ast.ForNode):
+        self.scopes.append({})
+        init = self.visit(node.init) if node.init is not None else None
+        cond = self.visit(node.cond) if node.cond is not None else (lambda frame: 1)
+        update = self.visit(node.update) if node.update is not None else (lambda frame: None)
+        body, steps = self.visit(node.body), self.program.steps
+        self.scopes.pop()
+
+        def loop(frame):
+            if init is not None: init(frame)
+            while cond(frame):
+                steps[0] -= 1
+                if steps[0] < 0: raise InterpreterError("step limit exceeded")
+                result = body(frame)
+                if result is not None: return result
+                update(frame)
+        return loop
+
+    def visit_ReturnNode(self, node: ast.ReturnNode):
+        if node.expr is None: return lambda frame: (0,)
+        expr = self.visit(node.expr)
+        return lambda frame: (expr(frame),)
+
+    # --- Expressions: closures return the value.
+
+    def visit_IdNode(self, node: ast.IdNode):
+        kind, slot = self.resolve(node.name)
+        if kind == 'local': return lambda frame: frame[slot]
+        global_values = self.program.global_values
+        return lambda frame: global_values[slot]
+
+    def visit_ConstantNode(self, node: ast.ConstantNode):
+        value = constant_value(node)
+        return lambda frame: value
+
+    def visit_StringLiteralNode(self, node: ast.StringLiteralNode):
+        value = string_value(node)
+        return lambda frame: value
+
+    def visit_UnaryOpNode(self, node: ast.UnaryOpNode):
+        expr = self.visit(node.expr)
+        if node.op == '-': return lambda frame: ((SIGN32 - expr(frame)) & MASK32) - SIGN32
+        if node.op == '+': return expr
+        if node.op == '!': return lambda frame: 0 if expr(frame) else 1
+        if node.op == '~': return lambda frame: ~expr(frame)
+        raise InterpreterError(f"unsupported unary operator {node.op}")
+
+    def visit_BinaryOpNode(self, node: ast.BinaryOpNode):
+        left, right, op = self.visit(node.left), self.visit(node.right), node.op
+        if op == '+': return lambda frame: ((left(frame) + right(frame) + SIGN32) & MASK32) - SIGN32
+        if op == '-': return lambda frame: ((left(frame) - right(frame) + SIGN32) & MASK32) - SIGN32
+        if op == '*': return lambda frame: ((left(frame) * right(frame) + SIGN32) & MASK32) - SIGN32
+        if op == '<': return lambda frame: 1 if left(frame) < right(frame) else 0
+        if op == '>': return lambda frame: 1 if left(frame) > right(frame) else 0
+        if op == '<=': return lambda frame: 1 if left(frame) <= right(frame) else 0
+        if op == '>=': return lambda frame: 1 if left(frame) >= right(frame) else 0
+        if op == '==': return lambda frame: 1 if left(frame) == right(frame) else 0
+        if op == '!=': return lambda frame: 1 if left(frame) != right(frame) else 0
+        if op == '&&': return lambda frame: 1 if left(frame) and right(frame) else 0
+        if op == '||': return lambda frame: 1 if left(frame) or right(frame) else 0
+        if op in ('/', '%'):
+            remainder = op == '%'
+
+            def divide(frame):
+                dividend, divisor = left(frame), right(frame)
+                if divisor == 0: raise InterpreterError("division by zero")
+                quotient = abs(dividend) // abs(divisor)  # C truncates toward zero
+                if (dividend < 0) != (divisor < 0): quotient = -quotient
+                return wrap32(dividend - divisor * quotient if remainder else quotient)
+            return divide
+        raise InterpreterError(f"unsupported binary operator {op}")
+
+    def visit_AssignmentNode(self, node: ast.AssignmentNode):
+        if not isinstance(node.lvalue, ast.IdNode): raise InterpreterError("can only assign to variables")
+        rvalue = node.rvalue
+        if node.op != '=': rvalue = ast.BinaryOpNode(node.op[:-1], node.lvalue, node.rvalue)
+        value_of, (kind, slot) = self.visit(rvalue), self.resolve(node.lvalue.name)
+        if kind == 'global':
+            coerce, global_values = self.program.global_coercions.get(slot), self.program.global_values
+
+            def assign(frame):
+                value = value_of(frame)
+                global_values[slot] = value = coerce(value) if coerce else value
+                return value
+            return assign
+        coerce = self.slot_coercions.get(slot)
+
+        def assign(frame):
+            value = value_of(frame)
+            frame[slot] = value = coerce(value) if coerce else value
+            return value
+        return assign
+
+    def visit_FuncCallNode(self, node: ast.FuncCallNode):
+        if not isinstance(node.name_expr, ast.IdNode): raise InterpreterError("indirect calls are not supported")
+        name, args = node.name_expr.name, tuple(self.visit(arg) for arg in node.args)
+        builtin = self.program.builtins.get(name)
+        if builtin is not None and name not in self.program.functions:
+            return lambda frame: builtin([arg(frame) for arg in args])
+        function = self.program.functions.get(name)
+        if function is None: raise InterpreterError(f"call to undefined function {name}()")
+        return lambda frame: function.invoke([arg(frame) for arg in args])
+
+
+def _builtins(output):
+    def printf(args):
+        if not args or not isinstance(args[0], str): raise InterpreterError("printf needs a format string")
+        text = format_printf(args[0], args[1:])
+        output.append(text)
+        return len(text)
+
+    def putchar(args):
+        output.append(chr(args[0] & 0xFF))
+        return args[0] & 0xFF
+
+    def puts(args):
+        output.append(f"{args[0]}\n")
+        return 0
+
+    return {'printf': printf, 'putchar': putchar, 'puts': puts, 'getchar': lambda args: -1}
+
+
+class CompiledProgram:
+    """A ProgramNode compiled to closures; `run` can be called any number of times. Runs share
+    the program's global and output buffers, so one instance must not run in several threads."""
+
+    def __init__(self, ast_root: ast.ProgramNode):
+        self.output = []
+        self.builtins = _builtins(self.output)
+        self.steps = [0]
+        self.depth_left = [0]
+        self.max_nesting = 0
+        self.global_slots, self.global_coercions, self.global_values = {}, {}, []
+        self.functions = {decl.name: _Function(decl.name) for decl in ast_root.declarations
+                          if isinstance(decl, ast.FuncDefNode) and decl.body is not None}
+        # Globals are laid out before any function is compiled; their initializers run in
+        # declaration order at the start of each run.
+        global_compiler, initializers = FunctionCompiler(self), []
+        for decl in ast_root.declarations:
+            if isinstance(decl, ast.VarDeclNode):
+                slot = self.global_slots[decl.name] = len(self.global_values)
+                self.global_values.append(0)
+                coerce = _coercion(decl.type_node)
+                if coerce is not None: self.global_coercions[slot] = coerce
+                if decl.initializer is not None:
+                    initializers.append((slot, coerce, global_compiler.visit(decl.initializer)))
+        self.global_initializers = initializers
+        for decl in ast_root.declarations:
+            if isinstance(decl, ast.FuncDefNode) and decl.body is not None:
+                self.functions[decl.name].invoke = FunctionCompiler(self, decl).compile_function(decl)
+
+    def run(self, entry=ENTRY_POINT, args=(), max_steps=DEFAULT_MAX_STEPS, max_call_depth=DEFAULT_MAX_CALL_DEPTH):
+        """Runs `entry` and returns an ExecutionResult. Loop iterations and calls count as steps;
+        running out of steps, dividing by zero or nesting more than `max_call_depth` calls ends
+        the run with an error. The limit counts Mini-C calls, so a program and a transformed
+        version of it overflow at the same depth."""
+        outcome = []
+
+        def target():
+            try:
+                outcome.append(self._run(entry, args, max_steps, max_call_depth))
+            except BaseException as e:
+                outcome.append(e)
+        old_stack_size = threading.stack_size(RUN_STACK_SIZE)
+        try:
+            thread = threading.Thread(target=target, name="minic-interpreter")
+            thread.start()
+        finally:
+            threading.stack_size(old_stack_size)
+        thread.join()
+        if isinstance(outcome[0], BaseException): raise outcome[0]
+        return outcome[0]
+
+    def _run(self, entry, args, max_steps, max_call_depth):
+        self.output.clear()
+        self.steps[0] = max_steps
+        self.depth_left[0] = max_call_depth
+        self.global_values[:] = [0] * len(self.global_values)
+        # Well above the frames max_call_depth calls can use (plus builtins and the comprehension
+        # evaluating arguments), so the call depth limit is always what trips first.
+        old_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(old_limit, (max_call_depth + 1) * (self.max_nesting + 4) + 1000))
+        return_value, error = None, None
+        try:
+            for slot, coerce, initializer in self.global_initializers:
+                value = initializer(None)
+                self.global_values[slot] = coerce(value) if coerce else value
+            function = self.functions.get(entry)
+            if function is None: raise InterpreterError(f"no function {entry}()")
+            return_value = function.invoke(list(args))
+        except InterpreterError as e:
+            error = str(e)
+        except RecursionError:
+            error = "stack overflow"
+        finally:
+            sys.setrecursionlimit(old_limit)
+        return ExecutionResult(''.join(self.output), return_value, error)
+
+
+def compile_program(ast_root: ast.ProgramNode):
+    return CompiledProgram(ast_root)
+
+
+def compare_programs(original, transformed, entry=ENTRY_POINT, max_steps=DEFAULT_MAX_STEPS):
+    """Runs two ASTs (or CompiledPrograms) and compares their output, return value and error.
+
+    Returns a dict with `equivalent` and both results. A transformed program that fails to
+    compile counts as different; the original must compile.
+    """
+    if not isinstance(original, CompiledProgram): original = compile_program(original)
+    expected = original.run(entry, max_steps=max_steps)
+    try:
+        if not isinstance(transformed, CompiledProgram): transformed = compile_program(transformed)
+        actual = transformed.run(entry, max_steps=max_steps)
+    except InterpreterError as e:
+        actual = ExecutionResult('', None, f"compilation failed: {e}")
+    return {"equivalent": expected == actual, "original": expected.as_dict(), "transformed": actual.as_dict()}
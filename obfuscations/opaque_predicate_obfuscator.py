@@ -1,10 +1,17 @@
 import random
 from obfuscations import ast_nodes as ast
+from obfuscations.insertion_policy import InsertionPolicy
+
+DEFAULT_OPAQUE_PREDICATE_RATE = 0.2
 
 
 class OpaquePredicateInserterVisitor:
-    def __init__(self):
+    def __init__(self, policy=None):
         self.opaque_var_counter = 0
+        self.policy = policy or InsertionPolicy((DEFAULT_OPAQUE_PREDICATE_RATE,))
+        self.current_function = None
+        self.loop_depth = 0
+        self.hoisted = []
 
     def _generate_opaque_var_name(self):
         self.opaque_var_counter += 1
@@ -59,7 +66,34 @@ class OpaquePredicateInserterVisitor:
                         pass
         return node
 
+    def visit_FuncDefNode(self, node: ast.FuncDefNode):
+        outer_function, self.current_function = self.current_function, node
+        self.generic_visit(node)
+        self.current_function = outer_function
+        return node
+
+    def visit_WhileNode(self, node: ast.WhileNode):
+        self.loop_depth += 1
+        self.generic_visit(node)
+        self.loop_depth -= 1
+        return node
+
+    def visit_ForNode(self, node: ast.ForNode):
+        self.loop_depth += 1
+        self.generic_visit(node)
+        self.loop_depth -= 1
+        return node
+
+    def _insert_construct(self, items, opaque_constructs):
+        insert_pos = random.randint(0, len(items))
+        for i, construct_item in enumerate(reversed(opaque_constructs)):
+            items.insert(insert_pos, construct_item)
+
     def visit_CompoundStatementNode(self, node: ast.CompoundStatementNode):
+        # Blocks outside every loop receive the constructs hoisted out of the loops they contain.
+        is_hoist_target = self.loop_depth == 0
+        if is_hoist_target:
+            self.hoisted.append([])
         new_items = []
         for item in node.items:
             visited_item = self.visit(item)
@@ -69,14 +103,22 @@ class OpaquePredicateInserterVisitor:
                 new_items.append(visited_item)
         node.items = new_items
 
-        if random.random() < 0.2:
+        if self.policy.should_insert(self.current_function, self.loop_depth, node):
             opaque_constructs = self._create_opaque_predicate_construct()
-            insert_pos = random.randint(0, len(node.items))
-            for i, construct_item in enumerate(reversed(opaque_constructs)):
-                node.items.insert(insert_pos, construct_item)
+            if self.policy.should_hoist(self.loop_depth) and self.hoisted:
+                self.hoisted[-1].append(opaque_constructs)
+            else:
+                self._insert_construct(node.items, opaque_constructs)
+                ast.mark_changed(node, self.current_function)
+        if is_hoist_target:
+            hoisted_constructs = self.hoisted.pop()
+            for opaque_constructs in hoisted_constructs:
+                self._insert_construct(node.items, opaque_constructs)
+            if hoisted_constructs:
+                ast.mark_changed(node, self.current_function)
         return node
 
 
-def apply_opaque_predicates(ast_root: ast.ProgramNode):
-    inserter = OpaquePredicateInserterVisitor()
+def apply_opaque_predicates(ast_root: ast.ProgramNode, policy=None):
+    inserter = OpaquePredicateInserterVisitor(policy)
     return inserter.visit(ast_root)
\ No newline at end of file
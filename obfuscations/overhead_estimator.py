@@ -0,0 +1,177 @@
+from obfuscations import ast_nodes as ast
+
+# Abstract cost units for one execution of each construct.
+STATEMENT_COST = 1
+OPERATION_COST = 1
+BRANCH_COST = 2
+CALL_COST = 5
+# Assumed trip count of every loop; a construct nested d loops deep is weighted LOOP_WEIGHT ** d.
+LOOP_WEIGHT = 10
+# Each arm of an if/else is assumed to run half of the time.
+BRANCH_ARM_WEIGHT = 0.5
+
+
+def is_inserted_node(node):
+    """Obfuscation passes create nodes without source coordinates; the equivalent-expression
+    rewrite is recognisable as a unary minus that copied its operand's coordinate."""
+    if node.coord is None: return True
+    return isinstance(node, ast.UnaryOpNode) and node.expr is not None and node.coord == node.expr.coord
+
+
+class OverheadEstimatorVisitor:
+    """Static cost model comparing the inserted constructs of each function against its original code.
+
+    With an ExecutionProfile, functions and original blocks it has counts for are weighted by
+    those counts instead of the assumed loop trip counts and branch probabilities.
+    """
+
+    def __init__(self, profile=None):
+        self.profile = profile
+        self.functions = []
+        self.dummy_functions = 0
+        self.loop_depth = 0
+        self.weight = 1.0
+        self.inserted_depth = 0
+        self.stats = None
+
+    def visit(self, node):
+        if node is None: return
+        if self.stats is None or self.inserted_depth or not is_inserted_node(node):
+            self._dispatch(node)
+            return
+        self.inserted_depth += 1
+        self._dispatch(node)
+        self.inserted_depth -= 1
+
+    def _dispatch(self, node):
+        method_name = 'visit_' + node.__class__.__name__
+        visitor_method = getattr(self, method_name, self.generic_visit)
+        visitor_method(node)
+
+    def generic_visit(self, node):
+        for attr_name in dir(node):
+            if not attr_name.startswith('_') and attr_name != 'coord':
+                attr_value = getattr(node, attr_name)
+                if isinstance(attr_value, ast.Node):
+                    self.visit(attr_value)
+                elif isinstance(attr_value, list):
+                    for item in attr_value:
+                        if isinstance(item, ast.Node): self.visit(item)
+
+    def _count(self, kind, cost):
+        weighted = cost * self.weight
+        if self.inserted_depth:
+            self.stats["inserted_cost"] += weighted
+            self.stats[f"inserted_{kind}"] += 1
+            if self.loop_depth: self.stats["inserted_in_loops"] += 1
+        else:
+            self.stats["original_cost"] += weighted
+
+    def visit_ProgramNode(self, node: ast.ProgramNode):
+        for decl in node.declarations:
+            if isinstance(decl, ast.FuncDefNode): self.visit(decl)
+
+    def visit_FuncDefNode(self, node: ast.FuncDefNode):
+        if node.coord is None:
+            self.dummy_functions += 1
+            return
+        self.stats = {"function": node.original_name, "name": node.name, "coord": node.coord,
+                      "original_cost": 0.0, "inserted_cost": 0.0, "inserted_statements": 0,
+                      "inserted_branches": 0, "inserted_calls": 0, "inserted_operations": 0,
+                      "inserted_in_loops": 0, "max_loop_depth": 0}
+        function_count = self.profile.function_count(node) if self.profile else None
+        self.weight = 1.0 if function_count is None else function_count
+        self.visit(node.body)
+        self.weight = 1.0
+        original, inserted = self.stats["original_cost"], self.stats["inserted_cost"]
+        self.stats["overhead_factor"] = (original + inserted) / original if original else 1.0
+        self.functions.append(self.stats)
+        self.stats = None
+
+    def visit_CompoundStatementNode(self, node: ast.CompoundStatementNode):
+        counts = (self.profile.line_count(item.coord) for item in node.items) if self.profile else ()
+        count = next((c for c in counts if c is not None), None)
+        if count is None or self.inserted_depth:
+            self.generic_visit(node)
+            return
+        saved_weight, self.weight = self.weight, count
+        self.generic_visit(node)
+        self.weight = saved_weight
+
+    def visit_VarDeclNode(self, node: ast.VarDeclNode):
+        self._count("statements", STATEMENT_COST)
+        self.visit(node.initializer)
+
+    def visit_ExprStatementNode(self, node: ast.ExprStatementNode):
+        self._count("statements", STATEMENT_COST)
+        self.visit(node.expr)
+
+    def visit_ReturnNode(self, node: ast.ReturnNode):
+        self._count("statements", STATEMENT_COST)
+        self.visit(node.expr)
+
+    def visit_BinaryOpNode(self, node: ast.BinaryOpNode):
+        self._count("operations", OPERATION_COST)
+        self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_UnaryOpNode(self, node: ast.UnaryOpNode):
+        self._count("operations", OPERATION_COST)
+        self.visit(node.expr)
+
+    def visit_FuncCallNode(self, node: ast.FuncCallNode):
+        self._count("calls", CALL_COST)
+        for arg in node.args: self.visit(arg)
+
+    def visit_IfNode(self, node: ast.IfNode):
+        self._count("branches", BRANCH_COST)
+        self.visit(node.cond)
+        saved_weight = self.weight
+        self.weight = saved_weight * BRANCH_ARM_WEIGHT
+        self.visit(node.if_true_body)
+        self.visit(node.if_false_body)
+        self.weight = saved_weight
+
+    def _visit_loop(self, node, header_nodes):
+        self._count("branches", BRANCH_COST)
+        saved_weight = self.weight
+        self.loop_depth += 1
+        self.stats["max_loop_depth"] = max(self.stats["max_loop_depth"], self.loop_depth)
+        self.weight = saved_weight * LOOP_WEIGHT
+        for header_node in header_nodes: self.visit(header_node)
+        self.visit(node.body)
+        self.weight = saved_weight
+        self.loop_depth -= 1
+
+    def visit_WhileNode(self, node: ast.WhileNode):
+        self._visit_loop(node, [node.cond])
+
+    def visit_ForNode(self, node: ast.ForNode):
+        self.visit(node.init)
+        self._visit_loop(node, [node.cond, node.update])
+
+
+def estimate_overhead(ast_root: ast.ProgramNode, profile=None):
+    """Estimates the dynamic overhead factor the obfuscation passes added to each original function."""
+    estimator = OverheadEstimatorVisitor(profile)
+    estimator.visit(ast_root)
+    total_original = sum(f["original_cost"] for f in estimator.functions)
+    total_inserted = sum(f["inserted_cost"] for f in estimator.functions)
+    return {
+        "functions": estimator.functions,
+        "dummy_functions": estimator.dummy_functions,
+        "overhead_factor": (total_original + total_inserted) / total_original if total_original else 1.0,
+        "profiled": profile is not None,
+    }
+
+
+def format_overhead_report(report):
+    lines = ["--- Estimated Runtime Overhead" + (" (weighted by execution counts) ---" if report.get("profiled") else " ---")]
+    for f in report["functions"]:
+        lines.append(f"{f['function']}: x{f['overhead_factor']:.2f} "
+                     f"({f['inserted_statements']} statements, {f['inserted_branches']} branches, "
+                     f"{f['inserted_calls']} calls, {f['inserted_operations']} operations inserted; "
+                     f"{f['inserted_in_loops']} inside loops, max loop depth {f['max_loop_depth']})")
+    lines.append(f"Dummy functions: {report['dummy_functions']}")
+    lines.append(f"Whole program: x{report['overhead_factor']:.2f}")
+    return "\n".join(lines)
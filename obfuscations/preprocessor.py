@@ -1,21 +1,33 @@
 import re
 
-def preprocess_code(code_string):
-    code_string = re.sub(r'//.*', '', code_string)
-    code_string = re.sub(r'/\*.*?\*/', '', code_string, flags=re.DOTALL)
-    code_string = re.sub(r'^\s*#include\s*<[^>]*>\s*$', '', code_string, flags=re.MULTILINE)
-    code_string = re.sub(r'^\s*#include\s*"[^"]*"\s*$', '', code_string, flags=re.MULTILINE)
-    code_string = re.sub(r'^\s*#define\s+.*$', '', code_string, flags=re.MULTILINE)
-    code_string = re.sub(r'^\s*#if.*$', '', code_string, flags=re.MULTILINE)
-    code_string = re.sub(r'^\s*#else.*$', '', code_string, flags=re.MULTILINE)
-    code_string = re.sub(r'^\s*#elif.*$', '', code_string, flags=re.MULTILINE)
-    code_string = re.sub(r'^\s*#endif.*$', '', code_string, flags=re.MULTILINE)
-    code_string = re.sub(r'^\s*#pragma\s+.*$', '', code_string, flags=re.MULTILINE)
-    code_string = re.sub(r'__attribute__\s*\(\([^)]*\)\)', '', code_string)
-    code_string = re.sub(r'__restrict(?:__)?', '', code_string)
-    code_string = re.sub(r'__extension__', '', code_string)
-    code_string = re.sub(r'__asm__\s*\(\s*".*?"\s*\)', '', code_string)
-    code_string = re.sub(r'__asm\s*\(\s*".*?"\s*\)', '', code_string)
-    code_string = re.sub(r'__declspec\s*\([^)]*\)', '', code_string)
-    code_string = "\n".join(line for line in code_string.splitlines() if line.strip())
-    return code_string
\ No newline at end of file
+
+def _blank_out(match):
+    return re.sub(r'[^\n]', ' ', match.group())
+
+
+def preprocess_code(code_string, line_map=None):
+    """Strips comments, preprocessor lines and compiler extensions, then drops blank lines.
+
+    Removed text is replaced by spaces and keeps its line breaks until the blank lines go, so
+    columns are those of the original file and a list passed as `line_map` is filled with the
+    original line number of every output line.
+    """
+    code_string = re.sub(r'//.*', _blank_out, code_string)
+    code_string = re.sub(r'/\*.*?\*/', _blank_out, code_string, flags=re.DOTALL)
+    code_string = re.sub(r'^\s*#include\s*<[^>]*>\s*$', _blank_out, code_string, flags=re.MULTILINE)
+    code_string = re.sub(r'^\s*#include\s*"[^"]*"\s*$', _blank_out, code_string, flags=re.MULTILINE)
+    code_string = re.sub(r'^\s*#define\s+.*$', _blank_out, code_string, flags=re.MULTILINE)
+    code_string = re.sub(r'^\s*#if.*$', _blank_out, code_string, flags=re.MULTILINE)
+    code_string = re.sub(r'^\s*#else.*$', _blank_out, code_string, flags=re.MULTILINE)
+    code_string = re.sub(r'^\s*#elif.*$', _blank_out, code_string, flags=re.MULTILINE)
+    code_string = re.sub(r'^\s*#endif.*$', _blank_out, code_string, flags=re.MULTILINE)
+    code_string = re.sub(r'^\s*#pragma\s+.*$', _blank_out, code_string, flags=re.MULTILINE)
+    code_string = re.sub(r'__attribute__\s*\(\([^)]*\)\)', _blank_out, code_string)
+    code_string = re.sub(r'__restrict(?:__)?', _blank_out, code_string)
+    code_string = re.sub(r'__extension__', _blank_out, code_string)
+    code_string = re.sub(r'__asm__\s*\(\s*".*?"\s*\)', _blank_out, code_string)
+    code_string = re.sub(r'__asm\s*\(\s*".*?"\s*\)', _blank_out, code_string)
+    code_string = re.sub(r'__declspec\s*\([^)]*\)', _blank_out, code_string)
+    kept_lines = [(number, line) for number, line in enumerate(code_string.splitlines(), 1) if line.strip()]
+    if line_map is not None: line_map[:] = [number for number, _ in kept_lines]
+    return "\n".join(line for _, line in kept_lines)
\ No newline at end of file
@@ -0,0 +1,90 @@
+import json
+import re
+from collections import namedtuple
+
+RENAME_MAP_FORMAT = "minic-rename-map"
+RENAME_MAP_VERSION = 1
+
+# One entry per renamed declaration. `function` is the original name of the enclosing function
+# (None for globals and functions), `scope` the (line, col) of the declaring block in the
+# original source (None at file scope) and `coord` that of the declaration itself.
+RENAME_FIELDS = ('obfuscated', 'original', 'kind', 'function', 'scope', 'coord')
+RenameEntry = namedtuple('RenameEntry', RENAME_FIELDS)
+
+_IDENTIFIER = re.compile(r'\b[A-Za-z_][A-Za-z0-9_]*\b')
+
+
+def _coord(value):
+    return tuple(value) if value is not None else None
+
+
+class RenameMap:
+    """The renames an obfuscation run made, indexed by obfuscated name.
+
+    Saved as compact versioned JSON: a header plus one array per entry in RENAME_FIELDS order.
+    The renamer hands out names that are unique across the whole program, so the obfuscated
+    name alone identifies a declaration; function and scope coordinates are kept to tell the
+    original declarations apart and to place them in crash reports.
+    """
+
+    def __init__(self, entries=(), seed=None):
+        self.seed = seed
+        self.entries = []
+        self.by_obfuscated = {}
+        for entry in entries: self.add(*entry)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, obfuscated, original, kind, function=None, scope=None, coord=None):
+        entry = RenameEntry(obfuscated, original, kind, function, _coord(scope), _coord(coord))
+        self.entries.append(entry)
+        self.by_obfuscated[obfuscated] = entry
+        return entry
+
+    def lookup(self, obfuscated):
+        return self.by_obfuscated.get(obfuscated)
+
+    def original_name(self, obfuscated):
+        entry = self.by_obfuscated.get(obfuscated)
+        return entry.original if entry else obfuscated
+
+    def describe(self, obfuscated):
+        """Human-readable origin of an obfuscated name, e.g. "count (var in main, line 12)"."""
+        entry = self.by_obfuscated.get(obfuscated)
+        if entry is None: return obfuscated
+        where = f" in {entry.function}" if entry.function else ""
+        line = f", line {entry.coord[0]}" if entry.coord else ""
+        return f"{entry.original} ({entry.kind}{where}{line})"
+
+    def symbolicate(self, text, describe=False):
+        """Replaces every obfuscated identifier in `text` (e.g. a crash log) with its original name,
+        or with its describe() text."""
+        resolve = self.describe if describe else self.original_name
+        by_obfuscated = self.by_obfuscated
+        return _IDENTIFIER.sub(lambda m: resolve(m.group()) if m.group() in by_obfuscated else m.group(), text)
+
+    # --- Serialization ---------------------------------------------------------------------
+
+    def to_dict(self):
+        return {"format": RENAME_MAP_FORMAT, "version": RENAME_MAP_VERSION, "seed": self.seed,
+                "fields": list(RENAME_FIELDS), "entries": [list(entry) for entry in self.entries]}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("format") != RENAME_MAP_FORMAT: raise ValueError("Not a Mini-C rename map.")
+        if data.get("version", 0) > RENAME_MAP_VERSION:
+            raise ValueError(f"Rename map version {data['version']} is newer than supported ({RENAME_MAP_VERSION}).")
+        fields = data.get("fields", RENAME_FIELDS)
+        columns = [fields.index(name) if name in fields else None for name in RENAME_FIELDS]
+        entries = [[row[i] if i is not None else None for i in columns] for row in data.get("entries", [])]
+        return cls(entries, seed=data.get("seed"))
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
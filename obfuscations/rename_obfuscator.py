@@ -8,23 +8,43 @@ RESERVED_NAMES = {
 }
 
 
+def generate_name(category, counter, rng=random):
+    prefix = "vv" if category == 'var' else "ff"
+    suffix = ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 4)))
+    return f"{prefix}{suffix}{counter}"
+
+
 class RenamerVisitor:
-    def __init__(self):
+    def __init__(self, rename_map=None, global_names=None):
         self.rename_map_global_funcs = {}
+        # Fixed names for functions and globals shared between files (project mode); names
+        # generated here never collide with them.
+        self.global_names = global_names or {}
+        self.taken_names = set(self.global_names.values())
         self.scope_stack = [{}]
         self.name_counters = {'var': 0, 'func': 0}
+        # With a RenameMap, every rename is recorded with its function and scope coordinates.
+        self.rename_map = rename_map
+        self.scope_coords = [None]
+        self.current_function = None
 
     def _generate_new_name(self, category='var'):
-        self.name_counters[category] += 1
-        prefix = "vv" if category == 'var' else "ff"
-        suffix = ''.join(random.choices(string.ascii_lowercase, k=random.randint(2, 4)))
-        return f"{prefix}{suffix}{self.name_counters[category]}"
+        while True:
+            self.name_counters[category] += 1
+            new_name = generate_name(category, self.name_counters[category])
+            if new_name not in self.taken_names: return new_name
 
-    def enter_scope(self):
+    def enter_scope(self, coord=None):
         self.scope_stack.append({})
+        self.scope_coords.append(coord)
 
     def exit_scope(self):
         self.scope_stack.pop()
+        self.scope_coords.pop()
+
+    def _record(self, node, old_name, new_name, kind):
+        if self.rename_map is not None:
+            self.rename_map.add(new_name, old_name, kind, self.current_function, self.scope_coords[-1], node.coord)
 
     def declare_in_current_scope(self, old_name, new_name):
         if self.scope_stack: self.scope_stack[-1][old_name] = new_name
@@ -32,7 +52,7 @@ class RenamerVisitor:
     def lookup_name(self, old_name):
         for scope in reversed(self.scope_stack):
             if old_name in scope: return scope[old_name]
-        return self.rename_map_global_funcs.get(old_name)
+        return self.rename_map_global_funcs.get(old_name) or self.global_names.get(old_name)
 
     def visit(self, node):
         if node is None: return None
@@ -68,9 +88,10 @@ class RenamerVisitor:
         for decl in node.declarations:
             if isinstance(decl, ast.FuncDefNode) and decl.name not in RESERVED_NAMES:
                 if decl.name not in self.rename_map_global_funcs:
-                    new_name = self._generate_new_name('func')
+                    new_name = self.global_names.get(decl.name) or self._generate_new_name('func')
                     self.rename_map_global_funcs[decl.name] = new_name
                     self.declare_in_current_scope(decl.name, new_name)
+                    self._record(decl, decl.name, new_name, 'func')
 
         new_declarations = [self.visit(decl) for decl in node.declarations if decl is not None]
         node.declarations = [d for d in new_declarations if d is not None]
@@ -78,19 +99,23 @@ class RenamerVisitor:
         return node
 
     def visit_FuncDefNode(self, node: ast.FuncDefNode):
+        outer_function, self.current_function = self.current_function, node.name
         if node.name not in RESERVED_NAMES:
             node.name = self.lookup_name(node.name) or node.name
-        self.enter_scope()
+        ast.mark_changed(node)
+        self.enter_scope(node.coord)
         if node.params:
             for param in node.params: self.visit(param)
         if node.body: self.visit(node.body)
         self.exit_scope()
+        self.current_function = outer_function
         return node
 
     def visit_ParamNode(self, node: ast.ParamNode):
         if node.name not in RESERVED_NAMES:
             new_name = self._generate_new_name('var')
             self.declare_in_current_scope(node.name, new_name)
+            self._record(node, node.name, new_name, 'param')
             node.name = new_name
         if node.type_node: self.visit(node.type_node)
         return node
@@ -98,17 +123,18 @@ class RenamerVisitor:
     def visit_VarDeclNode(self, node: ast.VarDeclNode):
         if node.type_node: self.visit(node.type_node)
         if node.name not in RESERVED_NAMES:
-            is_global_var = len(self.scope_stack) == 1
-            if is_global_var:
-                if node.name not in self.scope_stack[0]:
-                    new_name = self._generate_new_name('var')
+            if self.current_function is None:
+                if node.name not in self.scope_stack[-1]:
+                    new_name = self.global_names.get(node.name) or self._generate_new_name('var')
                     self.declare_in_current_scope(node.name, new_name)
+                    self._record(node, node.name, new_name, 'global')
                     node.name = new_name
                 else:
-                    node.name = self.scope_stack[0][node.name]
+                    node.name = self.scope_stack[-1][node.name]
             else:
                 new_name = self._generate_new_name('var')
                 self.declare_in_current_scope(node.name, new_name)
+                self._record(node, node.name, new_name, 'var')
                 node.name = new_name
         if node.initializer: self.visit(node.initializer)
         return node
@@ -120,7 +146,7 @@ class RenamerVisitor:
         return node
 
     def visit_CompoundStatementNode(self, node: ast.CompoundStatementNode):
-        self.enter_scope()
+        self.enter_scope(node.coord)
         new_items = []
         for item in node.items:
             visited = self.visit(item)
@@ -133,6 +159,6 @@ class RenamerVisitor:
         return node
 
 
-def apply_renaming(ast_root: ast.ProgramNode):
-    renamer = RenamerVisitor()
+def apply_renaming(ast_root: ast.ProgramNode, rename_map=None, global_names=None):
+    renamer = RenamerVisitor(rename_map, global_names)
     return renamer.visit(ast_root)
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""Source maps from generated (obfuscated) C back to the original Mini-C source.
+
+SourceMapCCodeGenerator emits the same code as CCodeGenerator and records where each
+statement and expression with a `coord` starts in the output. Inserted code (dead code,
+opaque predicates, dummy functions) has no coord and maps to nothing. The map is written in
+the JavaScript source map v3 layout: `mappings` holds one group per generated line, each
+segment being the Base64-VLQ deltas of generated column, source, original line and column.
+
+    code, source_map = generate_with_source_map(ast_root, "out.c", "input.mc", line_map)
+    source_map.lookup(12, 4)     # -> (original line, column) or None for inserted code
+"""
+import json
+import re
+from bisect import bisect_right
+
+from obfuscations import ast_nodes as ast
+from obfuscations.c_generator_visitor import CCodeGenerator
+
+SOURCE_MAP_VERSION = 3
+_BASE64 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+_BASE64_VALUES = {char: value for value, char in enumerate(_BASE64)}
+_MARKER = re.compile('\x00(\\d+)\x01')
+
+# Nodes that get a mapping segment. Types and the program itself are left out: their text is
+# compared by the generator (e.g. `== "void"`) and carries no useful position.
+MAPPED_NODES = (ast.FuncDefNode, ast.ParamNode, ast.VarDeclNode, ast.CompoundStatementNode, ast.StatementNode,
+                ast.ExpressionNode)
+
+
+def encode_vlq(value):
+    value = (-value << 1) | 1 if value < 0 else value << 1
+    digits = []
+    while True:
+        digit, value = value & 31, value >> 5
+        digits.append(_BASE64[digit | 32 if value else digit])
+        if not value: return ''.join(digits)
+
+
+def decode_vlq(segment):
+    values, value, shift = [], 0, 0
+    for char in segment:
+        digit = _BASE64_VALUES[char]
+        value += (digit & 31) << shift
+        if digit & 32:
+            shift += 5
+        else:
+            values.append(-(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    return values
+
+
+class SourceMap:
+    """Segments (generated line, generated column, original coord or None), sorted by position.
+
+    Lines are 1-based and columns 0-based on both sides, like ANTLR coords. A segment holds
+    from its position up to the next segment, across line ends.
+    """
+
+    def __init__(self, segments, file=None, source=None):
+        self.file = file
+        self.source = source
+        self.segments = segments
+        self.positions = [(line, column) for line, column, _ in segments]
+
+    def lookup(self, line, column=0):
+        """Original (line, column) of a generated position, or None if it lies in inserted code."""
+        index = bisect_right(self.positions, (line, column)) - 1
+        return self.segments[index][2] if index >= 0 else None
+
+    def remap_diagnostics(self, text):
+        """Rewrites `<file>:<line>:<col>` references (e.g. compiler errors, 1-based columns) to the
+        original source; references into inserted code are marked "(inserted code)"."""
+        pattern = re.compile(re.escape(self.file or '') + r':(\d+):(\d+)')
+
+        def remap(match):
+            coord = self.lookup(int(match.group(1)), int(match.group(2)) - 1)
+            if coord is None: return f"{match.group()} (inserted code)"
+            return f"{self.source}:{coord[0]}:{coord[1] + 1}"
+        return pattern.sub(remap, text)
+
+    # --- v3 serialization ----------------------------------------------------------------
+
+    def encode_mappings(self):
+        by_line = {}
+        for segment in self.segments: by_line.setdefault(segment[0], []).append(segment)
+        groups, source_line, source_column = [], 0, 0
+        for line in range(1, max(by_line, default=0) + 1):
+            group, previous_column = [], 0
+            for _, column, coord in by_line.get(line, ()):
+                segment = encode_vlq(column - previous_column)
+                if coord is not None:
+                    segment += encode_vlq(0) + encode_vlq(coord[0] - 1 - source_line) + encode_vlq(coord[1] - source_column)
+                    source_line, source_column = coord[0] - 1, coord[1]
+                group.append(segment)
+                previous_column = column
+            groups.append(','.join(group))
+        return ';'.join(groups)
+
+    @classmethod
+    def decode_mappings(cls, mappings, file=None, source=None):
+        segments, source_line, source_column = [], 0, 0
+        for line, group in enumerate(mappings.split(';'), 1):
+            column = 0
+            for segment in filter(None, group.split(',')):
+                values = decode_vlq(segment)
+                column += values[0]
+                coord = None
+                if len(values) >= 4:
+                    source_line, source_column = source_line + values[2], source_column + values[3]
+                    coord = (source_line + 1, source_column)
+                segments.append((line, column, coord))
+        return cls(segments, file, source)
+
+    def to_dict(self):
+        return {"version": SOURCE_MAP_VERSION, "file": self.file, "sources": [self.source], "names": [],
+                "mappings": self.encode_mappings()}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != SOURCE_MAP_VERSION: raise ValueError("Unsupported source map version.")
+        return cls.decode_mappings(data["mappings"], data.get("file"), (data.get("sources") or [None])[0])
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+class SourceMapCCodeGenerator(CCodeGenerator):
+    """CCodeGenerator that tracks output positions of mapped nodes.
+
+    The generator builds its output from strings bottom-up, so positions are not known while a
+    node is emitted. Instead each mapped node's code is prefixed with an inline marker naming
+    its coord, and `generate` strips the markers from the final text, computing line and
+    column of each as it goes. Markers go after any indentation, and a second one before the
+    closing brace of a block returns to the block's coord once inserted statements end.
+    """
+
+    def __init__(self, minimal_parens=True, line_map=None):
+        super().__init__(minimal_parens)
+        # Original line of each line the coords refer to, as filled by preprocess_code(line_map=).
+        self.line_map = line_map
+        self.marks = []
+        self.coord_stack = [None]
+        self.marking = True
+
+    def _mark(self, coord):
+        self.marks.append(coord)
+        return f"\x00{len(self.marks) - 1}\x01"
+
+    def _original_coord(self, coord):
+        if coord is None or not self.line_map: return coord
+        line = coord[0]
+        return (self.line_map[line - 1], coord[1]) if 0 < line <= len(self.line_map) else coord
+
+    def visit(self, node):
+        if not self.marking or not isinstance(node, MAPPED_NODES): return super().visit(node)
+        coord = self._original_coord(node.coord)
+        # Inserted expressions and blocks belong to whatever statement holds them; inserted
+        # statements and functions map to nothing.
+        if coord is None and isinstance(node, (ast.ExpressionNode, ast.CompoundStatementNode)):
+            coord = self.coord_stack[-1]
+        self.coord_stack.append(coord)
+        code = super().visit(node)
+        self.coord_stack.pop()
+        if not code.strip(): return code
+        body = code.lstrip(' ')
+        indent = code[:len(code) - len(body)]
+        if isinstance(node, ast.CompoundStatementNode) and body.endswith('}'):
+            body = body[:-1] + self._mark(coord) + '}'
+        return indent + self._mark(coord) + body
+
+    def visit_UnaryOpNode(self, node: ast.UnaryOpNode):
+        # The operator spacing check looks at the operand's first character, so the operand
+        # must not start with a marker; the operand maps to the unary expression's coord.
+        marking, self.marking = self.marking, False
+        try:
+            return super().visit_UnaryOpNode(node)
+        finally:
+            self.marking = marking
+
+    def generate(self, ast_root, file=None, source=None):
+        """Returns (code, SourceMap) for the AST."""
+        self.marks, self.coord_stack = [], [None]
+        marked = self.visit(ast_root)
+        parts, segments = [], []
+        line, column, last_end = 1, 0, 0
+        for match in _MARKER.finditer(marked):
+            chunk = marked[last_end:match.start()]
+            parts.append(chunk)
+            newlines = chunk.count('\n')
+            if newlines: line, column = line + newlines, len(chunk) - chunk.rfind('\n') - 1
+            else: column += len(chunk)
+            last_end = match.end()
+            coord = self.marks[int(match.group(1))]
+            if segments and segments[-1][:2] == (line, column): segments.pop()
+            if not segments or segments[-1][2] != coord: segments.append((line, column, coord))
+        parts.append(marked[last_end:])
+        return ''.join(parts), SourceMap(segments, file, source)
+
+
+def generate_with_source_map(ast_root, file=None, source=None, line_map=None):
+    return SourceMapCCodeGenerator(line_map=line_map).generate(ast_root, file, source)
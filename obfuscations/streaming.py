@@ -0,0 +1,148 @@
+import random
+import re
+from collections import deque
+
+from obfuscations import ast_nodes as ast
+from obfuscations.preprocessor import preprocess_code
+from obfuscations.c_generator_visitor import CCodeGenerator
+from obfuscations.rename_obfuscator import RenamerVisitor, RESERVED_NAMES
+from obfuscations.dummy_function_obfuscator import DummyFunctionInjector
+
+_SPECIAL_CHARS = re.compile(r'[{};"\'/]')
+_QUOTED = {'"': re.compile(r'"(?:\\.|[^"\\\n])*"?'), "'": re.compile(r"'(?:\\.|[^'\\\n])*'?")}
+_FUNC_NAME = re.compile(r'(\w+)\s*\(')
+
+
+def _ends_function_header(parts):
+    text = ''.join(parts)
+    return text[:text.find('{')].rstrip().endswith(')')
+
+
+def iter_top_level_declarations(lines):
+    """Yields the source of each top-level declaration or function definition, one at a time.
+
+    `lines` is any iterable of source lines (e.g. an open file), so only the declaration
+    being scanned is held in memory. Comments and preprocessor lines are dropped.
+    """
+    parts, depth, in_block_comment = [], 0, False
+    for line in lines:
+        if not in_block_comment and line.lstrip().startswith('#'): continue
+        i, n = 0, len(line)
+        while i < n:
+            if in_block_comment:
+                end = line.find('*/', i)
+                if end < 0: break
+                in_block_comment, i = False, end + 2
+                parts.append(' ')
+                continue
+            m = _SPECIAL_CHARS.search(line, i)
+            if m is None:
+                parts.append(line[i:])
+                break
+            j, c = m.start(), m.group()
+            parts.append(line[i:j])
+            i = j + 1
+            if c == '/':
+                if line.startswith('//', j): break
+                if line.startswith('/*', j):
+                    in_block_comment, i = True, j + 2
+                    continue
+                parts.append(c)
+            elif c in _QUOTED:
+                literal = _QUOTED[c].match(line, j).group()
+                parts.append(literal)
+                i = j + len(literal)
+            elif c == '{':
+                depth += 1
+                parts.append(c)
+            elif c == '}':
+                depth -= 1
+                parts.append(c)
+                if depth == 0 and _ends_function_header(parts):
+                    yield ''.join(parts).strip()
+                    parts = []
+            else:  # ';'
+                parts.append(c)
+                if depth == 0:
+                    yield ''.join(parts).strip()
+                    parts = []
+        parts.append('\n')
+    rest = ''.join(parts).strip()
+    if rest: yield rest
+
+
+def collect_global_symbols(path):
+    """Light first pass: returns (function names defined in the file, number of top-level declarations)."""
+    func_names, count = [], 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for decl_source in iter_top_level_declarations(f):
+            count += 1
+            brace = decl_source.find('{')
+            if brace >= 0 and decl_source[:brace].rstrip().endswith(')'):
+                m = _FUNC_NAME.search(decl_source[:brace])
+                if m: func_names.append(m.group(1))
+    return func_names, count
+
+
+def obfuscate_stream(in_path, out_path, parse_processed_code, techniques, num_dummy_functions=1,
+                     decoy_call_rate=0.0):
+    """Obfuscates `in_path` one top-level declaration at a time, writing each result before parsing the next.
+
+    `techniques` maps technique names to apply functions as in pipeline.OBFUSCATION_TECHNIQUES.
+    "rename" and "dummy_function" are handled here so names and dummy placement stay
+    consistent across declarations; every other technique is applied to each declaration.
+    Returns statistics about the run.
+    """
+    func_names, decl_count = collect_global_symbols(in_path)
+
+    renamer = None
+    if "rename" in techniques:
+        # Mirrors RenamerVisitor.visit_ProgramNode: functions are registered before any body is renamed.
+        renamer = RenamerVisitor()
+        renamer.enter_scope()
+        for name in func_names:
+            if name not in RESERVED_NAMES and name not in renamer.rename_map_global_funcs:
+                new_name = renamer._generate_new_name('func')
+                renamer.rename_map_global_funcs[name] = new_name
+                renamer.declare_in_current_scope(name, new_name)
+
+    # Decoy calls only need the name and parameters of earlier dummies, so bodies are not kept.
+    dummy_injector, dummy_positions, dummy_signatures = None, deque(), []
+    if "dummy_function" in techniques and num_dummy_functions > 0:
+        dummy_injector = DummyFunctionInjector(decoy_call_rate)
+        dummy_positions = deque(sorted(random.randint(0, decl_count) for _ in range(num_dummy_functions)))
+    per_declaration = [func for name, func in techniques.items() if name not in ("rename", "dummy_function")]
+
+    stats = {"declarations": 0, "functions": len(func_names), "dummy_functions": 0, "largest_declaration": 0}
+    generator = CCodeGenerator()
+    first = True
+    with open(in_path, 'r', encoding='utf-8') as src, open(out_path, 'w', encoding='utf-8') as out:
+
+        def emit(program):
+            nonlocal first
+            code = generator.visit(program)
+            if not code: return
+            if not first: out.write("\n\n")
+            out.write(code)
+            first = False
+
+        def emit_dummies_before(index):
+            while dummy_positions and dummy_positions[0] <= index:
+                dummy_positions.popleft()
+                dummy = dummy_injector._create_dummy_function(dummy_signatures)
+                dummy_signatures.append(ast.FuncDefNode(dummy.return_type, dummy.name, dummy.params, None))
+                emit(ast.ProgramNode([dummy]))
+                stats["dummy_functions"] += 1
+
+        for index, decl_source in enumerate(iter_top_level_declarations(src)):
+            emit_dummies_before(index)
+            stats["largest_declaration"] = max(stats["largest_declaration"], len(decl_source))
+            chunk_ast = parse_processed_code(preprocess_code(decl_source))
+            if renamer is not None:
+                chunk_ast.declarations = [renamer.visit(decl) for decl in chunk_ast.declarations]
+            for apply_technique in per_declaration:
+                chunk_ast = apply_technique(chunk_ast)
+            emit(chunk_ast)
+            stats["declarations"] += 1
+        emit_dummies_before(decl_count)
+    return stats
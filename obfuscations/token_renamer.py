@@ -0,0 +1,136 @@
+import re
+
+from antlr4 import Token
+
+from grammer.MiniCLexer import MiniCLexer
+from obfuscations.rename_obfuscator import RenamerVisitor, RESERVED_NAMES
+
+TYPE_KEYWORDS = {'int', 'char', 'bool', 'void', 'float', 'double', 'long', 'short',
+                 'unsigned', 'signed', 'const', 'static', 'extern'}
+
+_NON_CODE = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|^[ \t]*#[^\n]*',
+                       re.DOTALL | re.MULTILINE)
+
+
+def mask_non_code(source):
+    """Blanks out comments and preprocessor lines while keeping every character offset and newline,
+    so tokens lexed from the result point straight back into `source`."""
+    def blank(m):
+        text = m.group()
+        if text[0] in '"\'': return text
+        return re.sub(r'[^\n]', ' ', text)
+    return _NON_CODE.sub(blank, source)
+
+
+def _function_definitions(tokens):
+    """Names of functions defined at top level, in source order (prototypes are skipped)."""
+    names, depth = [], 0
+    for i, tok in enumerate(tokens):
+        if tok.text == '{': depth += 1
+        elif tok.text == '}': depth -= 1
+        elif (depth == 0 and tok.type == MiniCLexer.Identifier and i + 1 < len(tokens)
+              and tokens[i + 1].text == '('):
+            close = _matching_paren(tokens, i + 1)
+            if close + 1 < len(tokens) and tokens[close + 1].text == '{': names.append(tok.text)
+    return names
+
+
+def _matching_paren(tokens, open_index):
+    level = 0
+    for j in range(open_index, len(tokens)):
+        if tokens[j].text == '(': level += 1
+        elif tokens[j].text == ')':
+            level -= 1
+            if level == 0: return j
+    return len(tokens) - 1
+
+
+class TokenRenamer:
+    """Renames identifiers straight from the token stream, following RenamerVisitor's scoping rules.
+
+    Declarations are recognised by the identifier that follows a type keyword (or a `,` in the
+    same declaration list); every other identifier is a use and is looked up in the scope stack.
+    Function bodies get a parameter scope plus a block scope, and each `{` opens a new scope.
+    """
+
+    def __init__(self, renamer=None):
+        self.renamer = renamer or RenamerVisitor()
+
+    def resolve(self, tokens):
+        """Returns a list of (token, new_name) for every identifier token that gets renamed."""
+        tokens = [t for t in tokens if t.type != Token.EOF]
+        renamer = self.renamer
+        renamer.enter_scope()
+        for name in _function_definitions(tokens):
+            if name not in RESERVED_NAMES and name not in renamer.rename_map_global_funcs:
+                new_name = renamer._generate_new_name('func')
+                renamer.rename_map_global_funcs[name] = new_name
+                renamer.declare_in_current_scope(name, new_name)
+
+        renames = []
+        brace_depth = paren_depth = 0
+        expect_declarator = False
+        decl_list_depth = None      # paren depth of the declaration list being scanned
+        header_close_depth = None   # paren depth that closes the current function header
+        body_braces = []            # True for braces that open a function body
+        pending_body = False
+        for i, tok in enumerate(tokens):
+            text = tok.text
+            if text in TYPE_KEYWORDS:
+                expect_declarator, decl_list_depth = True, paren_depth
+            elif tok.type == MiniCLexer.Identifier:
+                is_call_or_header = i + 1 < len(tokens) and tokens[i + 1].text == '('
+                if expect_declarator and not (is_call_or_header and brace_depth == 0 and paren_depth == 0):
+                    if text not in RESERVED_NAMES:
+                        new_name = renamer._generate_new_name('var')
+                        renamer.declare_in_current_scope(text, new_name)
+                        renames.append((tok, new_name))
+                else:
+                    renamed = None if text in RESERVED_NAMES else renamer.lookup_name(text)
+                    if renamed: renames.append((tok, renamed))
+                    if expect_declarator:  # function definition or prototype header
+                        renamer.enter_scope()
+                        header_close_depth = paren_depth
+                expect_declarator = False
+            elif text == '*':
+                pass
+            elif text == '(':
+                paren_depth += 1
+                expect_declarator = False
+            elif text == ')':
+                paren_depth -= 1
+                expect_declarator = False
+                if decl_list_depth is not None and paren_depth < decl_list_depth: decl_list_depth = None
+                if header_close_depth is not None and paren_depth == header_close_depth:
+                    header_close_depth = None
+                    if i + 1 < len(tokens) and tokens[i + 1].text == '{': pending_body = True
+                    else: renamer.exit_scope()
+            elif text == ',':
+                expect_declarator = decl_list_depth is not None and paren_depth == decl_list_depth
+            elif text == '{':
+                body_braces.append(pending_body)
+                pending_body, expect_declarator, decl_list_depth = False, False, None
+                brace_depth += 1
+                renamer.enter_scope()
+            elif text == '}':
+                brace_depth -= 1
+                renamer.exit_scope()
+                if body_braces and body_braces.pop(): renamer.exit_scope()
+            elif text == ';':
+                expect_declarator, decl_list_depth = False, None
+            else:
+                expect_declarator = False
+        renamer.exit_scope()
+        return renames
+
+
+def rewrite_identifiers(source, renames):
+    """Splices the new names into `source` at the renamed tokens' character offsets; everything
+    else is copied through unchanged."""
+    parts, last = [], 0
+    for tok, new_name in sorted(renames, key=lambda r: r[0].start):
+        parts.append(source[last:tok.start])
+        parts.append(new_name)
+        last = tok.stop + 1
+    parts.append(source[last:])
+    return ''.join(parts)
@@ -0,0 +1,164 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from antlr4 import CommonTokenStream, InputStream
+from antlr4.error.ErrorListener import ErrorListener
+
+from grammer.MiniCLexer import MiniCLexer
+from grammer.MiniCParser import MiniCParser
+
+from obfuscations.preprocessor import preprocess_code
+from obfuscations.ast_nodes import ProgramNode, clone_ast
+from obfuscations.ast_builder_listener import build_ast_while_parsing
+from obfuscations.c_generator_visitor import CCodeGenerator
+from obfuscations.token_renamer import TokenRenamer, mask_non_code, rewrite_identifiers
+
+from obfuscations.rename_obfuscator import apply_renaming
+from obfuscations.dead_code_obfuscator import apply_dead_code_insertion
+from obfuscations.equivalent_expr_obfuscator import apply_equivalent_expression
+from obfuscations.dummy_function_obfuscator import apply_dummy_function_insertion
+from obfuscations.opaque_predicate_obfuscator import apply_opaque_predicates
+
+from deobfuscations.semantic_renamer import apply_semantic_renaming
+from deobfuscations.rename_map_restorer import apply_rename_map
+from deobfuscations.unused_function_remover import apply_unused_function_removal
+from deobfuscations.dead_code_remover import apply_dead_code_removal
+from deobfuscations.expression_simplifier import apply_expression_simplification
+from deobfuscations.flow_reconstructor import apply_flow_reconstruction
+from deobfuscations.fixpoint_driver import CLEANUP_PASSES, DEFAULT_MAX_ITERATIONS, run_until_fixpoint
+
+# Pass order matches the GUIs and CLIs of main.py and deobfuscator_main.py.
+OBFUSCATION_TECHNIQUES = {
+    "rename": apply_renaming,
+    "dead_code": apply_dead_code_insertion,
+    "equivalent_expression": apply_equivalent_expression,
+    "dummy_function": apply_dummy_function_insertion,
+    "opaque_predicate": apply_opaque_predicates,
+}
+
+DEOBFUSCATION_TECHNIQUES = {
+    "name_restoration": apply_semantic_renaming,
+    "unused_function_removal": apply_unused_function_removal,
+    "dead_code_removal": apply_dead_code_removal,
+    "expression_simplification": apply_expression_simplification,
+    "control_flow_simplification": apply_flow_reconstruction,
+}
+
+
+class MiniCErrorListener(ErrorListener):
+    """Custom error listener to capture syntax errors during parsing."""
+
+    def __init__(self, error_messages_list):
+        super().__init__()
+        self.error_messages = error_messages_list
+
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        self.error_messages.append(f"ERROR - Line {line}:{column} : {msg}")
+
+
+def parse_processed_code(processed_code, error_msgs=None):
+    """Parses already preprocessed Mini-C source, returning the custom AST.
+
+    The AST is built declaration by declaration while the parser runs, so the full
+    ANTLR parse tree is never materialized.
+    """
+    error_msgs = [] if error_msgs is None else error_msgs
+    lexer = MiniCLexer(InputStream(processed_code))
+    lexer.removeErrorListeners()
+    err_listener = MiniCErrorListener(error_msgs)
+    lexer.addErrorListener(err_listener)
+    parser = MiniCParser(CommonTokenStream(lexer))
+    parser.removeErrorListeners()
+    parser.addErrorListener(err_listener)
+    custom_ast = build_ast_while_parsing(parser)
+    if error_msgs: raise SyntaxError("Parsing failed:\n" + "\n".join(error_msgs))
+    if custom_ast is None or not isinstance(custom_ast, ProgramNode): raise ValueError("AST construction failed.")
+    return custom_ast
+
+
+def parse_code(code, error_msgs=None):
+    """Preprocesses and parses Mini-C source, returning the custom AST."""
+    processed_code = preprocess_code(code)
+    if not processed_code.strip(): raise ValueError("Code is empty after preprocessing.")
+    return parse_processed_code(processed_code, error_msgs)
+
+
+def rename_source(code, seed=None, error_msgs=None):
+    """Rename-only fast path: renames identifiers directly in `code` using the token stream.
+
+    No AST is built and nothing is regenerated, so formatting, comments and preprocessor
+    lines are kept exactly as they were; only renamed identifiers differ.
+    """
+    if seed is not None: random.seed(seed)
+    error_msgs = [] if error_msgs is None else error_msgs
+    lexer = MiniCLexer(InputStream(mask_non_code(code)))
+    lexer.removeErrorListeners()
+    lexer.addErrorListener(MiniCErrorListener(error_msgs))
+    tokens = lexer.getAllTokens()
+    if error_msgs: raise SyntaxError("Lexing failed:\n" + "\n".join(error_msgs))
+    return rewrite_identifiers(code, TokenRenamer().resolve(tokens))
+
+
+def obfuscate_ast(ast_root, techniques=None, seed=None, rename_map=None):
+    """Applies the selected obfuscation passes (all by default), optionally seeding `random` first.
+
+    A RenameMap passed as `rename_map` is filled with the renames made.
+    """
+    if seed is not None: random.seed(seed)
+    for name, func in OBFUSCATION_TECHNIQUES.items():
+        if techniques is not None and name not in techniques: continue
+        ast_root = apply_renaming(ast_root, rename_map) if name == "rename" else func(ast_root)
+    return ast_root
+
+
+# Per-process state of obfuscate_variants workers: the parsed program and the passes to run.
+_variant_base = None
+
+
+def _init_variant_worker(base_ast, techniques):
+    global _variant_base
+    _variant_base = (base_ast, techniques)
+
+
+def _obfuscate_variant(seed):
+    base_ast, techniques = _variant_base
+    random.seed(seed)
+    ast_root = clone_ast(base_ast)
+    for func in techniques.values(): ast_root = func(ast_root)
+    return seed, generate_code(ast_root)
+
+
+def obfuscate_variants(ast_root, seeds, techniques=None, jobs=1):
+    """Yields (seed, obfuscated code) for every seed, transforming a clone of one parsed AST each time.
+
+    `techniques` maps names to apply functions (default: OBFUSCATION_TECHNIQUES). With
+    `jobs` > 1 the runs are spread over a process pool; the AST is shipped to each worker
+    once and cloned there per seed. Results come back in seed order either way.
+    """
+    techniques = OBFUSCATION_TECHNIQUES if techniques is None else techniques
+    if jobs is not None and jobs <= 1:
+        _init_variant_worker(ast_root, techniques)
+        yield from map(_obfuscate_variant, seeds)
+        return
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_variant_worker,
+                             initargs=(ast_root, techniques)) as executor:
+        yield from executor.map(_obfuscate_variant, seeds)
+
+
+def deobfuscate_ast(ast_root, techniques=None, max_iterations=DEFAULT_MAX_ITERATIONS, rename_map=None):
+    """Applies the selected de-obfuscation passes (all by default).
+
+    Name restoration runs once, exactly from `rename_map` if the obfuscator's RenameMap is
+    available and heuristically otherwise; the cleanup passes are iterated until they converge.
+    """
+    if techniques is None or "name_restoration" in techniques:
+        if rename_map is not None: ast_root = apply_rename_map(ast_root, rename_map)
+        else: ast_root = apply_semantic_renaming(ast_root)
+    cleanup_passes = {name: pass_func for name, pass_func in CLEANUP_PASSES.items()
+                      if techniques is None or name in techniques}
+    ast_root, _ = run_until_fixpoint(ast_root, cleanup_passes, max_iterations)
+    return ast_root
+
+
+def generate_code(ast_root):
+    return CCodeGenerator().visit(ast_root)
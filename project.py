@@ -0,0 +1,245 @@
+"""Project mode: obfuscating several Mini-C files that are linked together.
+
+Every file renamed on its own would give a shared function a different name in each
+translation unit. Instead the run works in three phases:
+
+1. map: worker processes parse the files and return small symbol summaries (defined
+   functions and globals, called functions defined elsewhere);
+2. reduce: the summaries are merged into one global rename table;
+3. transform: workers parse the files again and obfuscate each against that table.
+
+Only summaries and the table cross process boundaries, never ASTs.
+"""
+import functools
+import json
+import os
+import random
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from checkpoint import CheckpointManifest, content_hash
+from obfuscations import ast_nodes as ast
+from obfuscations.preprocessor import preprocess_code
+from obfuscations.rename_obfuscator import RESERVED_NAMES, apply_renaming, generate_name
+from pipeline import OBFUSCATION_TECHNIQUES, parse_processed_code, generate_code
+from sharding import assign_shards, shard_manifest_path, format_timings
+
+SOURCE_EXTENSIONS = ('.mc', '.c')
+MANIFEST_NAME = ".minic-checkpoint.jsonl"
+
+
+def find_project_files(root):
+    """Source files under `root`, as paths relative to it in a stable order."""
+    found = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        found.extend(os.path.relpath(os.path.join(directory, name), root)
+                     for name in sorted(files) if name.endswith(SOURCE_EXTENSIONS))
+    return found
+
+
+def _parse_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        processed_code = preprocess_code(f.read())
+    if not processed_code.strip(): raise ValueError(f"{path}: code is empty after preprocessing.")
+    error_msgs = []
+    try:
+        return parse_processed_code(processed_code, error_msgs)
+    except SyntaxError:
+        raise SyntaxError(f"{path}:\n" + "\n".join(error_msgs)) from None
+
+
+def extract_symbols(ast_root):
+    """Summary of what a file defines at file scope and which functions it calls but does not define."""
+    functions = [d.name for d in ast_root.declarations if isinstance(d, ast.FuncDefNode)]
+    global_vars = [d.name for d in ast_root.declarations if isinstance(d, ast.VarDeclNode)]
+    called, stack = set(), [ast_root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.FuncCallNode) and isinstance(node.name_expr, ast.IdNode):
+            called.add(node.name_expr.name)
+        for field in ast.CHILD_FIELDS.get(node.__class__, ()):
+            value = getattr(node, field, None)
+            if isinstance(value, ast.Node): stack.append(value)
+            elif isinstance(value, list): stack.extend(item for item in value if isinstance(item, ast.Node))
+    defined = set(functions) | set(global_vars)
+    return {"functions": sorted(set(functions) - RESERVED_NAMES), "globals": sorted(set(global_vars) - RESERVED_NAMES),
+            "external": sorted(called - defined - RESERVED_NAMES)}
+
+
+def _summarize(task):
+    root, relative_path = task
+    try:
+        return relative_path, extract_symbols(_parse_file(os.path.join(root, relative_path))), None
+    except (OSError, SyntaxError, ValueError) as e:
+        return relative_path, None, str(e)
+
+
+def build_global_rename_table(summaries, seed=None):
+    """Reduce step: one new name per function and global defined anywhere in the project.
+
+    `summaries` maps file -> summary. A symbol defined in two files is an error (it would not
+    link either); calls to functions no file defines (library functions) keep their names.
+    Returns (table, unresolved) with `unresolved` mapping such names to the files calling them.
+    The table depends only on the summaries and `seed` (None counts as 0).
+    """
+    owners = {}
+    for path, summary in sorted(summaries.items()):
+        for name in summary["functions"] + summary["globals"]:
+            if name in owners: raise ValueError(f"'{name}' is defined in both {owners[name]} and {path}.")
+            owners[name] = path
+    unresolved = {}
+    for path, summary in sorted(summaries.items()):
+        for name in summary["external"]:
+            if name not in owners: unresolved.setdefault(name, []).append(path)
+
+    # Seeded like the files (`seed or 0`), so every run and every shard derives the same table.
+    rng, table, counters = random.Random(seed or 0), {}, {'func': 0, 'var': 0}
+    for path, summary in sorted(summaries.items()):
+        for category, names in (('func', summary["functions"]), ('var', summary["globals"])):
+            for name in names:
+                counters[category] += 1
+                table[name] = generate_name(category, counters[category], rng)
+    return table, unresolved
+
+
+# Per-process state of transform workers: the global rename table, the passes and the seed.
+_project_state = None
+
+
+def _init_transform_worker(table, techniques, seed):
+    global _project_state
+    _project_state = (table, techniques, seed)
+
+
+def _file_seed(seed, relative_path):
+    return zlib.crc32(relative_path.replace(os.sep, '/').encode('utf-8')) ^ (seed or 0)
+
+
+def _transform(task):
+    index, source_root, output_root, relative_path = task
+    table, techniques, seed = _project_state
+    random.seed(_file_seed(seed, relative_path))
+    timings = {}
+    try:
+        start = time.perf_counter()
+        ast_root = _parse_file(os.path.join(source_root, relative_path))
+        timings["parse"] = time.perf_counter() - start
+        for name, func in techniques.items():
+            if name == "rename": func = functools.partial(apply_renaming, global_names=table)
+            elif name == "dummy_function": func = functools.partial(func, name_prefix=f"dummy_fn_f{index}_")
+            start = time.perf_counter()
+            ast_root = func(ast_root)
+            timings[name] = time.perf_counter() - start
+        start = time.perf_counter()
+        code = generate_code(ast_root)
+        out_path = os.path.join(output_root, relative_path)
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        with open(out_path, 'w', encoding='utf-8') as f:
+            f.write(code)
+        timings["generate"] = time.perf_counter() - start
+    except (OSError, SyntaxError, ValueError) as e:
+        return relative_path, None, None, timings, str(e)
+    return relative_path, len(code.encode('utf-8')), content_hash(code), timings, None
+
+
+def _settings_hash(techniques, seed, options, table):
+    """Everything besides the input itself that determines a file's output (no seed runs as seed 0)."""
+    return content_hash(json.dumps({"techniques": list(techniques), "seed": seed or 0, "options": options, "table": table},
+                                   sort_keys=True))
+
+
+def obfuscate_project(source_root, output_root, techniques=None, seed=None, jobs=None, manifest_path=None,
+                      resume=False, options=None, shard=None):
+    """Obfuscates every source file under `source_root` into the same layout under `output_root`.
+
+    Every finished file is appended to a checkpoint manifest (default: .minic-checkpoint.jsonl
+    in `output_root`). With `resume`, files whose input, seed, techniques, `options` (any
+    JSON-able description of the pass configuration) and global rename table are unchanged
+    since their last successful record are skipped; recorded symbol summaries spare parsing
+    unchanged files, so an unchanged tree is done without starting a single worker.
+
+    With `shard` = (i, N) only the files sharding.assign_shards gives to shard i are written,
+    into a per-shard manifest. All files are still summarized, since the rename table covers
+    the whole project; the summaries of other shards' files are recorded as "indexed".
+    Returns a stats dict with the files written (with their sizes), skipped and failed files,
+    per-pass timings, the rename table and the unresolved external names.
+    """
+    techniques = OBFUSCATION_TECHNIQUES if techniques is None else techniques
+    files = find_project_files(source_root)
+    if not files: raise ValueError(f"No {'/'.join(SOURCE_EXTENSIONS)} files under {source_root}.")
+    if shard is not None:
+        sizes = {path: os.path.getsize(os.path.join(source_root, path)) for path in files}
+        assignment = assign_shards(sizes, shard[1])
+        owned = {path for path in files if assignment[path] == shard[0]}
+        manifest_path = manifest_path or shard_manifest_path(output_root, shard)
+    else:
+        owned = set(files)
+    manifest_path = manifest_path or os.path.join(output_root, MANIFEST_NAME)
+    manifest = CheckpointManifest.load(manifest_path) if resume else CheckpointManifest(manifest_path)
+    inputs = {path: manifest.input_hash(path, os.path.join(source_root, path)) for path in files}
+
+    summaries, failed, indexed = {}, {}, []
+    for path in files:
+        record = manifest.records.get(path)
+        if record is not None and record.get("input_hash") == inputs[path][0] and record.get("summary") is not None:
+            summaries[path] = record["summary"]
+    to_summarize = [(source_root, path) for path in files if path not in summaries]
+    if to_summarize:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for path, summary, error in executor.map(_summarize, to_summarize):
+                if error is None:
+                    summaries[path] = summary
+                    if path not in owned: indexed.append(path)
+                elif path in owned:
+                    failed[path] = error
+    table, unresolved = build_global_rename_table(summaries, seed)
+    if "rename" not in techniques: table = {}
+    settings = _settings_hash(techniques, seed, options, table)
+
+    def record(path, status, error=None, output_size=None, output_hash=None, timings=None):
+        manifest.append({"input": path, "stat": inputs[path][1], "input_hash": inputs[path][0], "seed": seed,
+                         "techniques": list(techniques), "settings": settings, "summary": summaries.get(path),
+                         "output": path, "output_size": output_size, "output_hash": output_hash,
+                         "status": status, "error": error, "timings": timings})
+
+    pending = [(index, source_root, output_root, path) for index, path in enumerate(files)
+               if path in owned and path not in failed
+               and not manifest.is_complete(path, inputs[path][0], settings, os.path.join(output_root, path))]
+    pending_paths = {task[3] for task in pending}
+    # Skipped files that were touched but not changed get their new (size, mtime) recorded, so
+    # the next run does not read them again.
+    touched = [path for path in files if path in manifest.records and path not in pending_paths
+               and path not in failed and manifest.records[path].get("stat") != inputs[path][1]]
+    written, timings = {}, defaultdict(float)
+    stats = {"files": written, "skipped": len(owned) - len(pending) - len(failed), "failed": failed,
+             "timings": timings, "table": table, "unresolved": unresolved}
+    if resume and not pending and not failed and not touched and not indexed: return stats
+    with manifest.open(resume):
+        for path in touched: manifest.append(dict(manifest.records[path], stat=inputs[path][1]))
+        for path in indexed: record(path, "indexed")
+        for path, error in failed.items(): record(path, "failed", error)
+        if pending:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_transform_worker,
+                                     initargs=(table, techniques, seed)) as executor:
+                for path, output_size, output_hash, file_timings, error in executor.map(_transform, pending):
+                    for name, seconds in file_timings.items(): timings[name] += seconds
+                    if error is None:
+                        written[path] = output_size
+                        record(path, "ok", output_size=output_size, output_hash=output_hash, timings=file_timings)
+                    else:
+                        failed[path] = error
+                        record(path, "failed", error, timings=file_timings)
+    return stats
+
+
+def format_project_report(stats):
+    lines = [f"Project: {len(stats['files'])} file(s) written, {stats['skipped']} unchanged, {len(stats['failed'])} "
+             f"failed; {len(stats['table'])} shared symbol(s) renamed consistently"]
+    for path, error in sorted(stats["failed"].items()): lines.append(f"  failed: {path}: {error}")
+    if stats["timings"]: lines.append(f"  pass time: {format_timings(stats['timings'])}")
+    for name, paths in sorted(stats["unresolved"].items()):
+        lines.append(f"  not defined in the project (kept): {name} (called from {', '.join(paths)})")
+    return "\n".join(lines)
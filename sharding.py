@@ -0,0 +1,106 @@
+"""Deterministic sharding of project runs across machines, and merging the shard results.
+
+Every shard lists the whole tree and computes the same assignment on its own, so no
+coordinator is needed: files are taken largest first (ties broken by a hash of the path)
+and each goes to the shard with the least total size so far. Each shard writes its own
+checkpoint manifest; `merge_shard_manifests` combines them into the project manifest.
+"""
+import glob
+import os
+import re
+import zlib
+from collections import defaultdict
+
+from checkpoint import CheckpointManifest
+
+SHARD_MANIFEST_PATTERN = ".minic-checkpoint.shard-{index}-of-{count}.jsonl"
+_SHARD_MANIFEST_NAME = re.compile(r"\.minic-checkpoint\.shard-(\d+)-of-(\d+)\.jsonl$")
+
+
+def parse_shard_spec(spec):
+    """"2/4" -> (2, 4): the second of four shards (1-based)."""
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", spec or "")
+    if not match: raise ValueError(f"Invalid shard '{spec}', expected i/N such as 1/4.")
+    index, count = int(match.group(1)), int(match.group(2))
+    if not 1 <= index <= count: raise ValueError(f"Shard index must be between 1 and {count}, got {index}.")
+    return index, count
+
+
+def _path_hash(relative_path):
+    return zlib.crc32(relative_path.replace(os.sep, '/').encode('utf-8'))
+
+
+def assign_shards(sizes, count):
+    """Maps each path in `sizes` (path -> size in bytes) to a shard 1..count, balancing total size."""
+    loads = [0] * count
+    assignment = {}
+    for path in sorted(sizes, key=lambda p: (-sizes[p], _path_hash(p), p)):
+        shard = min(range(count), key=lambda i: (loads[i], i))
+        loads[shard] += sizes[path]
+        assignment[path] = shard + 1
+    return assignment
+
+
+def shard_manifest_path(output_root, shard):
+    return os.path.join(output_root, SHARD_MANIFEST_PATTERN.format(index=shard[0], count=shard[1]))
+
+
+def merge_shard_manifests(output_root, manifest_path):
+    """Combines the shard manifests found in `output_root` into one manifest at `manifest_path`.
+
+    Only each shard's own files are taken (not the summaries it recorded for other shards'
+    files). Returns a stats dict: shards found and missing, files per status, files claimed by
+    more than one shard, shards whose settings (which include the global rename table) differ
+    from those of the first shard, and the pass timings summed over all files and per shard.
+    """
+    shard_paths = {}
+    for path in glob.glob(os.path.join(output_root, ".minic-checkpoint.shard-*-of-*.jsonl")):
+        match = _SHARD_MANIFEST_NAME.search(path)
+        if match: shard_paths[int(match.group(1)), int(match.group(2))] = path
+    if not shard_paths: raise ValueError(f"No shard manifests in {output_root}.")
+    counts = {count for _, count in shard_paths}
+    if len(counts) > 1: raise ValueError(f"Shard manifests of different shard counts in {output_root}: {sorted(counts)}.")
+    count = counts.pop()
+
+    merged, owners, conflicts = CheckpointManifest(manifest_path).open(), {}, []
+    statuses, timings, shard_timings, shard_settings = defaultdict(int), defaultdict(float), {}, {}
+    with merged:
+        for shard in sorted(shard_paths):
+            shard_timings[shard[0]] = shard_total = defaultdict(float)
+            for path, record in sorted(CheckpointManifest.load(shard_paths[shard]).records.items()):
+                if record.get("status") not in ("ok", "failed"): continue
+                if path in owners:
+                    conflicts.append((path, owners[path], shard[0]))
+                    continue
+                owners[path] = shard[0]
+                shard_settings.setdefault(shard[0], set()).add(record.get("settings"))
+                statuses[record["status"]] += 1
+                for name, seconds in (record.get("timings") or {}).items():
+                    timings[name] += seconds
+                    shard_total[name] += seconds
+                merged.append(record)
+    reference = min(shard_settings, default=None)
+    mismatched = sorted(index for index, settings in shard_settings.items() if settings != shard_settings[reference])
+    return {"shards": sorted(index for index, _ in shard_paths), "count": count,
+            "reference": reference, "mismatched": mismatched,
+            "missing": sorted(set(range(1, count + 1)) - {index for index, _ in shard_paths}),
+            "statuses": dict(statuses), "conflicts": conflicts, "timings": dict(timings),
+            "shard_timings": {index: dict(values) for index, values in shard_timings.items()}}
+
+
+def format_timings(timings):
+    return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+
+
+def format_merge_report(stats, manifest_path):
+    lines = [f"Merged {len(stats['shards'])} of {stats['count']} shard(s) into {manifest_path}: "
+             f"{stats['statuses'].get('ok', 0)} file(s) ok, {stats['statuses'].get('failed', 0)} failed"]
+    if stats["missing"]: lines.append(f"  missing shards: {', '.join(map(str, stats['missing']))}")
+    if stats["mismatched"]:
+        lines.append(f"  shard(s) {', '.join(map(str, stats['mismatched']))} ran with other settings or another rename "
+                     f"table than shard {stats['reference']}: their output does not link with the rest")
+    for path, first, second in stats["conflicts"]: lines.append(f"  {path} done by shards {first} and {second}; kept {first}")
+    lines.append(f"Pass time (all shards): {format_timings(stats['timings'])}")
+    for index, timings in sorted(stats["shard_timings"].items()):
+        lines.append(f"  shard {index}: {sum(timings.values()):.2f}s ({format_timings(timings)})")
+    return "\n".join(lines)
@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import parse_code, obfuscate_ast, deobfuscate_ast, generate_code
+from obfuscations.ast_nodes import clone_ast
+from obfuscations.interpreter import compile_program, compare_programs, DEFAULT_MAX_STEPS
+
+# Mini-C sources have their #includes stripped by the preprocessor, so the headers
+# the generated code relies on are force-included instead.
+DEFAULT_CFLAGS = ['-x', 'c', '-w', '-include', 'stdio.h', '-include', 'string.h', '-include', 'stdbool.h']
+
+
+def find_c_compiler(preferred=None):
+    """Returns the path of the C compiler to use: `preferred`, $CC, gcc or cc, in that order."""
+    for candidate in (preferred, os.environ.get('CC'), 'gcc', 'cc'):
+        if candidate:
+            path = shutil.which(candidate)
+            if path: return path
+    return None
+
+
+def parse_seed_spec(spec):
+    """Parses a seed list such as "1-5,10,42" into a sorted list of non-negative ints."""
+    seeds = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part: continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            seeds.update(range(int(start), int(end) + 1))
+        else:
+            seeds.add(int(part))
+    return sorted(seeds)
+
+
+def compile_source(compiler, source_path, exe_path, cflags=None):
+    """Compiles one C/Mini-C file. Returns (binary_size, None) or (None, error message)."""
+    cmd = [compiler] + list(DEFAULT_CFLAGS if cflags is None else cflags) + [source_path, '-o', exe_path]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+    except subprocess.CalledProcessError as e:
+        return None, f"Compilation failed: {e.stderr.strip()}"
+    except OSError as e:
+        return None, f"Compiler could not be started: {e}"
+    return os.path.getsize(exe_path), None
+
+
+def run_binary(exe_path, runs, timeout=10.0):
+    """Runs a binary `runs` times, timing each run with perf_counter.
+
+    Returns a dict with the first run's stdout/exit code, all run times, and whether
+    the output changed between runs.
+    """
+    times, stdout, exit_code, stable = [], None, None, True
+    for _ in range(max(1, runs)):
+        start = time.perf_counter()
+        try:
+            result = subprocess.run([exe_path], capture_output=True, text=True, stdin=subprocess.DEVNULL,
+                                    timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return {"stdout": stdout, "exit_code": None, "times": times, "stable": stable,
+                    "error": f"Timed out after {timeout} seconds"}
+        times.append(time.perf_counter() - start)
+        if stdout is None:
+            stdout, exit_code = result.stdout, result.returncode
+        elif (result.stdout, result.returncode) != (stdout, exit_code):
+            stable = False
+    return {"stdout": stdout, "exit_code": exit_code, "times": times, "stable": stable, "error": None}
+
+
+def summarize_times(times):
+    if not times: return None
+    ordered = sorted(times)
+    p95_index = max(0, -(-95 * len(ordered) // 100) - 1)  # nearest-rank percentile
+    return {"median": statistics.median(ordered), "p95": ordered[p95_index], "min": ordered[0],
+            "max": ordered[-1], "runs": len(ordered)}
+
+
+def build_variants(original_code, seeds, modes, techniques=None):
+    """Produces the (name, kind, seed, code) variants to check for every seed.
+
+    "obfuscate" checks the obfuscated program, "deobfuscate" checks the result of
+    de-obfuscating that obfuscated program again (round trip).
+    """
+    variants = []
+    try:
+        original_ast = parse_code(original_code)
+    except Exception as e:
+        return [(f"seed-{seed}", 'transform', seed, None, f"Transformation failed: {e}") for seed in seeds]
+    for seed in seeds:
+        try:
+            obf_code = generate_code(obfuscate_ast(clone_ast(original_ast), techniques, seed=seed))
+            if 'obfuscate' in modes: variants.append((f"obf-s{seed}", 'obfuscate', seed, obf_code, None))
+            if 'deobfuscate' in modes:
+                deobf_code = generate_code(deobfuscate_ast(parse_code(obf_code)))
+                variants.append((f"deobf-s{seed}", 'deobfuscate', seed, deobf_code, None))
+        except Exception as e:
+            variants.append((f"seed-{seed}", 'transform', seed, None, f"Transformation failed: {e}"))
+    return variants
+
+
+def verify_source(original_path, seeds, modes=('obfuscate', 'deobfuscate'), runs=10, jobs=None,
+                  compiler=None, cflags=None, timeout=10.0, techniques=None, keep_dir=None):
+    """Builds, runs and compares every seeded variant of `original_path` against the original.
+
+    Compilation is spread over a thread pool of `jobs` workers. Timing runs happen
+    one binary at a time afterwards, so that concurrent builds do not skew them.
+    """
+    compiler_path = find_c_compiler(compiler)
+    if compiler_path is None: raise FileNotFoundError("No C compiler found (tried $CC, gcc and cc).")
+    with open(original_path, 'r', encoding='utf-8') as f:
+        original_code = f.read()
+
+    variants = build_variants(original_code, seeds, modes, techniques)
+    work_dir = keep_dir or tempfile.mkdtemp(prefix="minic_verify_")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        entries = [{"name": "original", "kind": "original", "seed": None, "source_path": original_path,
+                    "source_size": len(original_code.encode('utf-8')), "error": None}]
+        for name, kind, seed, code, error in variants:
+            entry = {"name": name, "kind": kind, "seed": seed, "source_path": None, "source_size": None,
+                     "error": error}
+            if code is not None:
+                entry["source_path"] = os.path.join(work_dir, f"{name}.c")
+                with open(entry["source_path"], 'w', encoding='utf-8') as f:
+                    f.write(code)
+                entry["source_size"] = len(code.encode('utf-8'))
+            entries.append(entry)
+
+        def build(entry):
+            if entry["error"] is not None: return
+            entry["exe_path"] = os.path.join(work_dir, entry["name"] + (".exe" if os.name == 'nt' else ""))
+            entry["binary_size"], entry["error"] = compile_source(compiler_path, entry["source_path"],
+                                                                  entry["exe_path"], cflags)
+
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+            list(pool.map(build, entries))
+
+        for entry in entries:
+            if entry["error"] is not None: continue
+            result = run_binary(entry["exe_path"], runs, timeout)
+            entry.update(stdout=result["stdout"], exit_code=result["exit_code"], stable=result["stable"],
+                         runtime=summarize_times(result["times"]), error=result["error"])
+
+        return _build_report(original_path, compiler_path, runs, entries)
+    finally:
+        if keep_dir is None: shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def verify_interpreted(original_path, seeds, modes=('obfuscate', 'deobfuscate'), techniques=None,
+                       max_steps=DEFAULT_MAX_STEPS):
+    """Compiler-free counterpart of verify_source: the original and every variant run in-process
+    on the closure-compiled Mini-C interpreter, comparing output, return value and errors.
+
+    The original is parsed and compiled once. Variants are checked straight from the passes, without
+    generating and re-parsing code, so thousands of seeds fit in a minute; the generated C text
+    itself is only covered by verify_source.
+    """
+    with open(original_path, 'r', encoding='utf-8') as f:
+        original_ast = parse_code(f.read())
+    original_program = compile_program(original_ast)
+    start, variants_out, failed = time.perf_counter(), [], []
+    for seed in seeds:
+        try:
+            obf_ast = obfuscate_ast(clone_ast(original_ast), techniques, seed=seed)
+            candidates = []
+            if 'obfuscate' in modes: candidates.append((f"obf-s{seed}", 'obfuscate', obf_ast))
+            if 'deobfuscate' in modes:
+                candidates.append((f"deobf-s{seed}", 'deobfuscate', deobfuscate_ast(clone_ast(obf_ast))))
+        except Exception as e:
+            candidates = [(f"seed-{seed}", 'transform', e)]
+        for name, kind, variant in candidates:
+            item = {"name": name, "kind": kind, "seed": seed, "error": None}
+            if isinstance(variant, Exception):
+                item["error"], item["equivalent"] = f"Transformation failed: {variant}", False
+            else:
+                comparison = compare_programs(original_program, variant, max_steps=max_steps)
+                item["equivalent"] = comparison["equivalent"]
+                if not item["equivalent"]: item["result"] = comparison["transformed"]
+            if not item["equivalent"]: failed.append(name)
+            variants_out.append(item)
+    return {
+        "source": original_path,
+        "executor": "interpreter",
+        "original": original_program.run(max_steps=max_steps).as_dict(),
+        "elapsed": time.perf_counter() - start,
+        "variants": variants_out,
+        "summary": {"variants": len(variants_out), "equivalent": len(variants_out) - len(failed), "failed": failed},
+    }
+
+
+def _build_report(original_path, compiler_path, runs, entries):
+    original, variants_out, failed = entries[0], [], []
+    if original["error"] is not None:
+        raise RuntimeError(f"Original program could not be built or run: {original['error']}")
+    orig_median = original["runtime"]["median"]
+
+    for entry in entries[1:]:
+        item = {"name": entry["name"], "kind": entry["kind"], "seed": entry["seed"], "error": entry["error"],
+                "source_size": entry["source_size"], "binary_size": entry.get("binary_size")}
+        if entry["source_size"] is not None: item["source_size_delta"] = entry["source_size"] - original["source_size"]
+        if item["binary_size"] is not None: item["binary_size_delta"] = item["binary_size"] - original["binary_size"]
+        if entry["error"] is None:
+            item["stdout_match"] = entry["stdout"] == original["stdout"]
+            item["exit_code_match"] = entry["exit_code"] == original["exit_code"]
+            item["stable"] = entry["stable"]
+            item["runtime"] = entry["runtime"]
+            item["runtime_ratio"] = entry["runtime"]["median"] / orig_median if orig_median else None
+            if not item["stdout_match"]: item["stdout"] = entry["stdout"]
+            if not item["exit_code_match"]: item["exit_code"] = entry["exit_code"]
+        item["equivalent"] = entry["error"] is None and item["stdout_match"] and item["exit_code_match"]
+        if not item["equivalent"]: failed.append(entry["name"])
+        variants_out.append(item)
+
+    return {
+        "source": original_path,
+        "compiler": compiler_path,
+        "runs_per_binary": runs,
+        "original": {"source_size": original["source_size"], "binary_size": original["binary_size"],
+                     "exit_code": original["exit_code"], "stable": original["stable"],
+                     "runtime": original["runtime"]},
+        "variants": variants_out,
+        "summary": {"variants": len(variants_out), "equivalent": len(variants_out) - len(failed), "failed": failed},
+    }
+
+
+def run_cli_mode(argv=None):
+    """Runs the verifier from the command line and prints/saves the JSON report."""
+    arg_parser = argparse.ArgumentParser(
+        description="Checks that obfuscated/de-obfuscated variants of a Mini-C program behave like the original.")
+    arg_parser.add_argument("input_file", help="original Mini-C source")
+    arg_parser.add_argument("--seeds", default="1", help='seeds to check, e.g. "1-20" or "1,7,42" (default: 1)')
+    arg_parser.add_argument("--mode", choices=["obfuscate", "deobfuscate", "both"], default="both",
+                            help="which variants to check (default: both)")
+    arg_parser.add_argument("--runs", type=int, default=10, help="timed runs per binary (default: 10)")
+    arg_parser.add_argument("--jobs", type=int, default=None, help="parallel compile jobs (default: CPU count)")
+    arg_parser.add_argument("--cc", default=None, help="C compiler (default: $CC, gcc, then cc)")
+    arg_parser.add_argument("--timeout", type=float, default=10.0, help="per-run timeout in seconds")
+    arg_parser.add_argument("--keep", metavar="DIR", default=None, help="keep generated sources/binaries in DIR")
+    arg_parser.add_argument("--interpret", action="store_true",
+                            help="run the variants in-process on the Mini-C interpreter instead of compiling "
+                                 "them (no C compiler needed, much faster; --runs/--jobs/--cc are ignored)")
+    arg_parser.add_argument("--max-steps", type=int, default=DEFAULT_MAX_STEPS,
+                            help="loop iterations and calls allowed per interpreted run")
+    arg_parser.add_argument("-o", "--output", default=None, help="write the JSON report here instead of stdout")
+    args = arg_parser.parse_args(argv)
+
+    if not os.path.exists(args.input_file):
+        print(f"Error: Input file '{args.input_file}' not found.", file=sys.stderr)
+        sys.exit(1)
+    modes = ('obfuscate', 'deobfuscate') if args.mode == 'both' else (args.mode,)
+    try:
+        if args.interpret:
+            report = verify_interpreted(args.input_file, parse_seed_spec(args.seeds), modes, max_steps=args.max_steps)
+        else:
+            report = verify_source(args.input_file, parse_seed_spec(args.seeds), modes, args.runs, args.jobs, args.cc,
+                                   timeout=args.timeout, keep_dir=args.keep)
+    except Exception as e:
+        print(f"Verifier Error: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    report_json = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report_json)
+    else:
+        print(report_json)
+    summary = report["summary"]
+    print(f"{summary['equivalent']}/{summary['variants']} variants equivalent to the original.", file=sys.stderr)
+    sys.exit(0 if not summary["failed"] else 1)
+
+
+if __name__ == "__main__":
+    run_cli_mode()